@@ -1,15 +1,23 @@
 # main.py (raíz)
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi import FastAPI
 import uvicorn
 
-from src.config.database import inicializar_conexiones
+from src.config.database import (
+    inicializar_conexiones, calentar_conexiones_async, cerrar_conexiones_async, cerrar_conexiones,
+)
+from src.config.indexes import ensure_mongo_indexes, explain_query_shapes
+from src.api.dependencies import get_graph_repository
 from src.api.routes.people_routes import router as people_router
 from src.api.routes.company_routes import router as company_router
 from src.api.routes.job_routes import router as job_router
 from src.api.routes.auth_routes import router as auth_router
 from src.api.middleware.session_middleware import session_middleware
+from src.api.middleware.session_resolver import session_resolver
+from src.utils.view_buffer import view_buffer
+from src.utils.security import shutdown_hash_pool
 from src.api.routes.course_routes import router as course_router
 from src.api.routes.enrollment_routes import router as enrollment_router
 from src.api.routes.application_routes import router as application_router
@@ -23,8 +31,45 @@ try:
 except Exception as e:
     print(f"⚠️ Error inicializando conexiones: {e}")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up de los pools compartidos (tamaños por env, ver src/config/database.py)
+    await calentar_conexiones_async()
+    # Escuchar revocaciones de sesión para invalidar la caché en memoria
+    session_resolver.start()
+    # Contadores de vistas en memoria, volcados a Redis en lotes
+    view_buffer.start()
+    # Índices de MongoDB (registro central en src/config/indexes.py)
+    try:
+        await ensure_mongo_indexes()
+        # Diagnóstico opcional: explain() de cada forma de consulta, avisa COLLSCAN
+        if os.getenv("MONGO_EXPLAIN_ON_STARTUP", "false").lower() in ("1", "true", "yes"):
+            await explain_query_shapes()
+    except Exception as e:
+        print(f"⚠️ Error verificando índices de MongoDB: {e}")
+    # Constraints de unicidad en Neo4j (Person/Job/Company/Course.id, Skill.nombre)
+    try:
+        graph_repo = get_graph_repository()
+        await graph_repo.ensure_schema()
+        if os.getenv("NEO4J_EXPLAIN_ON_STARTUP", "false").lower() in ("1", "true", "yes"):
+            await graph_repo.explain_lookups()
+    except Exception as e:
+        print(f"⚠️ Error verificando el esquema de Neo4j: {e}")
+
+    yield
+
+    # Shutdown ordenado: primero dejar de escuchar, después cerrar los pools
+    await session_resolver.stop()
+    await view_buffer.stop()
+    await cerrar_conexiones_async()
+    cerrar_conexiones()
+    shutdown_hash_pool()
+
+
 app = FastAPI(title="Talentum+ Polyglot API", version="1.0.0",
-              description="Plataforma Integral de Gestión de Talento IT.")
+              description="Plataforma Integral de Gestión de Talento IT.",
+              lifespan=lifespan)
 
 # Registrar middleware de sesión (lee X-Session-Id y resuelve userId en Redis)
 app.middleware("http")(session_middleware)
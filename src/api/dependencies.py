@@ -0,0 +1,135 @@
+# src/api/dependencies.py
+"""
+Proveedores para `Depends` de FastAPI.
+
+Servicios y repositorios se construyen una sola vez por proceso (lru_cache)
+y comparten los pools de src/config/database.py: ningún request crea
+objetos ni conexiones nuevas.
+
+    @router.get("/")
+    async def list_jobs(svc: JobService = Depends(get_job_service)): ...
+
+La persona de la sesión se resuelve una sola vez por request con
+get_current_person / get_current_person_ref y se pasa a los servicios.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request
+
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository
+from src.repositories.async_redis_repository import AsyncRedisRepository
+from src.repositories.async_user_repository import AsyncUserRepository
+from src.services.application_service import ApplicationService
+from src.services.company_service import CompanyService
+from src.services.enrollment_service import EnrollmentService
+from src.services.job_service import JobService
+from src.services.people_service import PeopleService
+from src.services.recommendation_service import RecommendationService
+
+
+# ===============================================================
+# 🗄️ Repositorios
+# ===============================================================
+@lru_cache(maxsize=None)
+def get_user_repository() -> AsyncUserRepository:
+    return AsyncUserRepository()
+
+
+@lru_cache(maxsize=None)
+def get_outbox_repository() -> AsyncOutboxRepository:
+    return AsyncOutboxRepository()
+
+
+@lru_cache(maxsize=None)
+def get_redis_repository() -> AsyncRedisRepository:
+    return AsyncRedisRepository()
+
+
+@lru_cache(maxsize=None)
+def get_graph_repository() -> AsyncNeo4jRepository:
+    return AsyncNeo4jRepository()
+
+
+# ===============================================================
+# 🧩 Servicios
+# ===============================================================
+@lru_cache(maxsize=None)
+def get_people_service() -> PeopleService:
+    return PeopleService()
+
+
+@lru_cache(maxsize=None)
+def get_job_service() -> JobService:
+    return JobService(people=get_people_service())
+
+
+@lru_cache(maxsize=None)
+def get_company_service() -> CompanyService:
+    return CompanyService()
+
+
+@lru_cache(maxsize=None)
+def get_application_service() -> ApplicationService:
+    return ApplicationService()
+
+
+@lru_cache(maxsize=None)
+def get_enrollment_service() -> EnrollmentService:
+    return EnrollmentService()
+
+
+@lru_cache(maxsize=None)
+def get_recommendation_service() -> RecommendationService:
+    return RecommendationService()
+
+
+# ===============================================================
+# 👤 Persona de la sesión
+# ===============================================================
+# Campos que necesitan los servicios para referenciar a la persona
+# (id de nodo en Neo4j, nombre y rol): evitan traer el documento completo.
+PERSON_REF_FIELDS = ("userId", "datosPersonales.nombre", "rol")
+
+
+async def resolve_current_person(request: Request, people: PeopleService,
+                                 fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """
+    Persona vinculada a la sesión, resuelta una vez por request (memo en
+    request.state) vía caché Redis → Mongo por _id de la sesión. 401 sin
+    sesión, 404 si el usuario no tiene persona.
+    """
+    user_id = getattr(request.state, "user_id", None)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    memo = getattr(request.state, "current_person", None)
+    if memo is None:
+        memo = request.state.current_person = {}
+    # el documento completo sirve para cualquier proyección
+    for key in (None, fields):
+        if key in memo:
+            return memo[key]
+
+    projection = {f: 1 for f in fields} if fields else None
+    person = await people.get_current(user_id, getattr(request.state, "person_id", None), projection)
+    if not person:
+        raise HTTPException(status_code=404, detail="Persona no encontrada")
+    memo[fields] = person
+    return person
+
+
+async def get_current_person(request: Request,
+                             people: PeopleService = Depends(get_people_service)) -> Dict[str, Any]:
+    return await resolve_current_person(request, people)
+
+
+async def get_current_person_ref(request: Request,
+                                 people: PeopleService = Depends(get_people_service)) -> Dict[str, Any]:
+    return await resolve_current_person(request, people, PERSON_REF_FIELDS)
+
+
+def person_node_id(person: Dict[str, Any]) -> str:
+    """Id del nodo Person en Neo4j: userId (personas del registro) o el _id de Mongo."""
+    return person.get("userId") or str(person.get("_id"))
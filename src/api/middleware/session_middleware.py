@@ -1,7 +1,7 @@
 from fastapi import Request
 from fastapi.responses import JSONResponse
 import logging
-from src.config.database import get_redis_client
+from src.api.middleware.session_resolver import session_resolver
 
 
 async def session_middleware(request: Request, call_next):
@@ -10,10 +10,13 @@ async def session_middleware(request: Request, call_next):
     - Excluye rutas públicas (/auth, /docs, /openapi, /)
     - Requiere token válido (Authorization: Bearer o X-Session-Id) para las demás
     - Si el token no existe o expiró, responde 401
+    - token → sesión se resuelve con session_resolver (caché en memoria + Redis async);
+      deja `request.state.user_id` y `request.state.person_id` (_id Mongo, si hay persona)
     """
 
     path = request.url.path
     request.state.user_id = None
+    request.state.person_id = None
 
     # ✅ Excepciones: rutas públicas
     if (
@@ -37,24 +40,17 @@ async def session_middleware(request: Request, call_next):
         return JSONResponse(status_code=401, content={"detail": "Missing or invalid session token"})
 
     try:
-        r = get_redis_client()
-        user_id = r.get(session_id)
+        session = await session_resolver.resolve_session(session_id)
     except Exception as e:
         logging.error(f"🔴 Error conectando a Redis desde session_middleware: {e}")
         return JSONResponse(status_code=500, content={"detail": "Redis connection error"})
 
     # 🚫 Si no existe en Redis → sesión expirada o inválida
-    if not user_id:
+    if not session:
         return JSONResponse(status_code=401, content={"detail": "Session invalid or expired"})
 
-    # ✅ Decodificar user_id si es necesario
-    if isinstance(user_id, bytes):
-        try:
-            user_id = user_id.decode("utf-8")
-        except Exception:
-            pass
-
-    request.state.user_id = user_id
+    request.state.user_id = session["userId"]
+    request.state.person_id = session["personId"]
 
     # ✅ Pasar la request al siguiente handler
     return await call_next(request)
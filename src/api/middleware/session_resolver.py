@@ -0,0 +1,261 @@
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.config.database import get_async_redis_client
+
+# Canal pub/sub por el que se avisa que un token fue revocado
+SESSION_INVALIDATION_CHANNEL = "session:invalidate"
+
+# Layout en Redis:
+#   sess:{token}       HASH {u: userId, p: _id Mongo de la persona, r: último refresco (epoch s)}
+#   sess:user:{userId} SET de tokens del usuario (logout-all)
+# Expiración deslizante: cada uso extiende el TTL, pero como mucho una vez
+# cada SESSION_REFRESH_MINUTES por token (el campo `r` lo garantiza entre workers).
+SESSION_PREFIX = "sess:"
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 3600))
+SESSION_REFRESH_SECONDS = int(os.getenv("SESSION_REFRESH_MINUTES", 5)) * 60
+
+# KEYS[1]=sess:{token}, KEYS[2]=sess:user:{userId}; ARGV: ttl, ahora, intervalo.
+# Devuelve -1 si la sesión ya no existe (no la recrea) y 0 si otro worker ya refrescó.
+TOUCH_SESSION_LUA = """
+local r = redis.call('HGET', KEYS[1], 'r')
+if not r then return -1 end
+if tonumber(ARGV[2]) - tonumber(r) < tonumber(ARGV[3]) then return 0 end
+redis.call('HSET', KEYS[1], 'r', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Reescribe `p` en las sesiones vivas del usuario (no recrea las ya expiradas).
+# KEYS: sess:{token}...; ARGV[1]: _id de la persona ("" = sin persona)
+SET_SESSION_PERSON_LUA = """
+local n = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('HSET', key, 'p', ARGV[1])
+        n = n + 1
+    end
+end
+return n
+"""
+
+
+def session_key(token: str) -> str:
+    return f"{SESSION_PREFIX}{token}"
+
+
+def user_sessions_key(user_id: str) -> str:
+    return f"{SESSION_PREFIX}user:{user_id}"
+
+
+class SessionResolver:
+    """
+    Resuelve token → sesión {"userId", "personId"} con una caché LRU en memoria acotada.
+    - Cada entrada vive como máximo `ttl_seconds`, y nunca más que el TTL
+      restante de la clave en Redis (se lee con PTTL en el mismo round trip).
+    - Expiración deslizante: si el último refresco tiene más de
+      SESSION_REFRESH_SECONDS, se extiende el TTL (una escritura por intervalo).
+    - Las revocaciones (revoke / revoke_all) se publican en un canal propio,
+      para que ningún worker siga aceptando un token borrado.
+    - `p` no queda congelado: PeopleService.create/delete lo reescriben con
+      set_person, que también invalida las cachés por el mismo canal.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 30.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        # token → (sesión, vence_en monotonic, último refresco epoch)
+        self._cache: "OrderedDict[str, tuple[Dict[str, Optional[str]], float, float]]" = OrderedDict()
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+
+    # ===============================================================
+    # 🆕 Alta
+    # ===============================================================
+    async def create(self, user_id: str, person_id: Optional[str] = None) -> str:
+        """Crea una sesión para `user_id` (y su persona, si existe) y devuelve el token."""
+        token = uuid.uuid4().hex
+        r = get_async_redis_client()
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.hset(session_key(token), mapping={"u": user_id, "p": person_id or "", "r": int(time.time())})
+            pipe.expire(session_key(token), SESSION_TTL_SECONDS)
+            pipe.sadd(user_sessions_key(user_id), token)
+            # ninguna sesión vive más que SESSION_TTL_SECONDS: el índice tampoco
+            pipe.expire(user_sessions_key(user_id), SESSION_TTL_SECONDS)
+            await pipe.execute()
+        return token
+
+    async def set_person(self, user_id: str, person_id: Optional[str]) -> int:
+        """
+        Actualiza la persona (`p`) de todas las sesiones del usuario, p. ej. al
+        crear o borrar su persona. Devuelve cuántas sesiones vivas se tocaron.
+        """
+        r = get_async_redis_client()
+        tokens = list(await r.smembers(user_sessions_key(user_id)))
+        if not tokens:
+            return 0
+        script = r.register_script(SET_SESSION_PERSON_LUA)
+        updated = await script(keys=[session_key(t) for t in tokens], args=[person_id or ""])
+        # las cachés en memoria (este y los demás workers) tienen el `p` anterior
+        async with r.pipeline(transaction=False) as pipe:
+            for token in tokens:
+                self.invalidate(token)
+                pipe.publish(SESSION_INVALIDATION_CHANNEL, token)
+            await pipe.execute()
+        return int(updated)
+
+    # ===============================================================
+    # 🔎 Resolución
+    # ===============================================================
+    async def resolve(self, token: str) -> Optional[str]:
+        """Devuelve el userId de la sesión o None si no existe / expiró."""
+        session = await self.resolve_session(token)
+        return session["userId"] if session else None
+
+    async def resolve_session(self, token: str) -> Optional[Dict[str, Optional[str]]]:
+        """Devuelve {"userId", "personId"} de la sesión o None si no existe / expiró."""
+        cached = self._cache.get(token)
+        if cached:
+            session, expires_at, refreshed_at = cached
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(token)
+                self.hits += 1
+                if time.time() - refreshed_at >= SESSION_REFRESH_SECONDS:
+                    if not await self._touch(token, session):
+                        return None
+                return session
+            self._cache.pop(token, None)
+
+        self.misses += 1
+        r = get_async_redis_client()
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.hgetall(session_key(token))
+            pipe.pttl(session_key(token))
+            record, pttl = await pipe.execute()
+
+        if not record or not record.get("u"):
+            return None
+        session = {"userId": record["u"], "personId": record.get("p") or None}
+
+        refreshed_at = float(record.get("r") or 0)
+        if time.time() - refreshed_at >= SESSION_REFRESH_SECONDS:
+            return session if await self._touch(token, session) else None
+
+        ttl = self.ttl_seconds
+        if pttl is not None and pttl > 0:
+            ttl = min(ttl, pttl / 1000.0)
+        self._put(token, session, ttl, refreshed_at)
+        return session
+
+    async def _touch(self, token: str, session: Dict[str, Optional[str]]) -> bool:
+        """Extiende el TTL de la sesión (expiración deslizante). False si ya no existe."""
+        now = int(time.time())
+        r = get_async_redis_client()
+        touch = r.register_script(TOUCH_SESSION_LUA)
+        result = await touch(keys=[session_key(token), user_sessions_key(session["userId"])],
+                             args=[SESSION_TTL_SECONDS, now, SESSION_REFRESH_SECONDS])
+        if int(result) < 0:
+            self.invalidate(token)
+            return False
+        # refrescada por nosotros o por otro worker: no reintentar hasta el próximo intervalo
+        self._put(token, session, self.ttl_seconds, now)
+        return True
+
+    def _put(self, token: str, session: Dict[str, Optional[str]], ttl: float, refreshed_at: float):
+        self._cache[token] = (session, time.monotonic() + ttl, refreshed_at)
+        self._cache.move_to_end(token)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def invalidate(self, token: str):
+        self._cache.pop(token, None)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    # ===============================================================
+    # 📣 Invalidación (pub/sub)
+    # ===============================================================
+    async def revoke(self, token: str) -> int:
+        """Borra la sesión en Redis y avisa al resto de los procesos."""
+        r = get_async_redis_client()
+        user_id = await r.hget(session_key(token), "u")
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.delete(session_key(token))
+            if user_id:
+                pipe.srem(user_sessions_key(user_id), token)
+            deleted = (await pipe.execute())[0]
+        self.invalidate(token)
+        await r.publish(SESSION_INVALIDATION_CHANNEL, token)
+        return deleted
+
+    async def revoke_all(self, user_id: str) -> int:
+        """Logout-all: borra todas las sesiones del usuario. Devuelve cuántas seguían vivas."""
+        r = get_async_redis_client()
+        tokens = list(await r.smembers(user_sessions_key(user_id)))
+        if not tokens:
+            return 0
+        async with r.pipeline(transaction=True) as pipe:
+            pipe.delete(*[session_key(t) for t in tokens])
+            pipe.delete(user_sessions_key(user_id))
+            for token in tokens:
+                pipe.publish(SESSION_INVALIDATION_CHANNEL, token)
+            deleted = (await pipe.execute())[0]
+        for token in tokens:
+            self.invalidate(token)
+        return deleted
+
+    async def _listen(self):
+        r = get_async_redis_client()
+        while True:
+            pubsub = r.pubsub()
+            try:
+                await pubsub.subscribe(SESSION_INVALIDATION_CHANNEL)
+                # Pudimos perder avisos mientras no estábamos suscriptos
+                self.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        token = message.get("data")
+                        if isinstance(token, bytes):
+                            token = token.decode("utf-8")
+                        self.invalidate(token)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"⚠️ Listener de invalidación de sesiones caído, reintentando: {e}")
+                self.clear()
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    def start(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+session_resolver = SessionResolver(
+    max_size=int(os.getenv("SESSION_CACHE_MAX_SIZE", 10000)),
+    ttl_seconds=float(os.getenv("SESSION_CACHE_TTL_SECONDS", 30)),
+)
@@ -1,30 +1,45 @@
-from fastapi import APIRouter, HTTPException, Request
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from typing import Dict, Any, Optional
 from src.services.application_service import ApplicationService
 from src.services.people_service import PeopleService
+from src.api.dependencies import (get_application_service, get_people_service,
+                                  resolve_current_person, person_node_id, PERSON_REF_FIELDS)
+from src.utils.ndjson import ndjson_response, parse_fields
 
 router = APIRouter(prefix="/applications", tags=["Applications"])
-svc = ApplicationService()
 
 # ===============================================================
 # 📋 GET
 # ===============================================================
+@router.get("/export")
+async def export_applications(request: Request,
+                              fields: Optional[str] = Query(None, description="Proyección: campos separados por coma"),
+                              batch_size: int = Query(1000, ge=1, le=10000),
+                              svc: ApplicationService = Depends(get_application_service)):
+    """
+    Exporta toda la colección applications como NDJSON (un documento por línea),
+    en streaming desde el cursor de Mongo: memoria constante y primer byte inmediato.
+    """
+    if not getattr(request, "state", None) or not request.state.user_id:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    docs = svc.export(projection=parse_fields(fields), batch_size=batch_size)
+    return ndjson_response(docs, filename="applications.ndjson", chunk_size=min(batch_size, 500))
+
+
 @router.get("/person/{person_id}")
-def get_applications_by_person(person_id: str, request: Request):
+async def get_applications_by_person(person_id: str, request: Request,
+                                     svc: ApplicationService = Depends(get_application_service),
+                                     people_svc: PeopleService = Depends(get_people_service)):
     if not getattr(request, "state", None) or not request.state.user_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
     try:
         if person_id == "me":
-            people_svc = PeopleService()
-            found = people_svc.list({"userId": request.state.user_id})
-            if not found:
-                raise HTTPException(status_code=404, detail="Persona no encontrada")
-            person_doc = found[0]
-            node_id = person_doc.get("userId") or person_doc.get("_id")
-            person_id = node_id
-
-        return svc.get_by_person(person_id)
+            person = await resolve_current_person(request, people_svc, PERSON_REF_FIELDS)
+            person_id = person_node_id(person)
+
+        return await svc.get_by_person(person_id)
     except HTTPException:
         raise
     except Exception as e:
@@ -32,12 +47,13 @@ def get_applications_by_person(person_id: str, request: Request):
 
 
 @router.get("/job/{job_id}")
-def get_applications_by_job(job_id: str, request: Request):
+async def get_applications_by_job(job_id: str, request: Request,
+                                  svc: ApplicationService = Depends(get_application_service)):
     if not getattr(request, "state", None) or not request.state.user_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
     try:
-        return svc.get_by_job(job_id)
+        return await svc.get_by_job(job_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -45,14 +61,15 @@ def get_applications_by_job(job_id: str, request: Request):
 # 🔁 ESTADO
 # ===============================================================
 @router.put("/{application_id}/estado")
-def update_estado(application_id: str, body: Dict[str, Any], request: Request):
+async def update_estado(application_id: str, body: Dict[str, Any], request: Request,
+                        svc: ApplicationService = Depends(get_application_service)):
     if not getattr(request, "state", None) or not request.state.user_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
     try:
         if not body.get("estado"):
             raise HTTPException(status_code=400, detail="Campo 'estado' requerido")
-        return svc.update_estado(application_id, body)
+        return await svc.update_estado(application_id, body)
     except HTTPException:
         raise
     except Exception as e:
@@ -62,12 +79,13 @@ def update_estado(application_id: str, body: Dict[str, Any], request: Request):
 # 💬 FEEDBACK
 # ===============================================================
 @router.post("/{application_id}/feedback")
-def agregar_feedback(application_id: str, feedback: Dict[str, Any], request: Request):
+async def agregar_feedback(application_id: str, feedback: Dict[str, Any], request: Request,
+                           svc: ApplicationService = Depends(get_application_service)):
     if not getattr(request, "state", None) or not request.state.user_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
     try:
-        return svc.agregar_feedback(application_id, feedback)
+        return await svc.agregar_feedback(application_id, feedback)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -75,11 +93,12 @@ def agregar_feedback(application_id: str, feedback: Dict[str, Any], request: Req
 # 💼 OFERTA
 # ===============================================================
 @router.post("/{application_id}/oferta")
-def enviar_oferta(application_id: str, datos_oferta: Dict[str, Any], request: Request):
+async def enviar_oferta(application_id: str, datos_oferta: Dict[str, Any], request: Request,
+                        svc: ApplicationService = Depends(get_application_service)):
     if not getattr(request, "state", None) or not request.state.user_id:
         raise HTTPException(status_code=401, detail="Authentication required")
 
     try:
-        return svc.enviar_oferta(application_id, datos_oferta)
+        return await svc.enviar_oferta(application_id, datos_oferta)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,54 +1,49 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import Dict
-import uuid
 from datetime import datetime
 import logging
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
-from src.utils.security import hash_password, verify_password
-from src.repositories.user_repository import UserRepository
-from src.repositories.mongo_repository import MongoRepository
-from src.repositories.neo4j_repository import Neo4jRepository
-from src.config.database import get_redis_client, get_mongo_db
+from src.utils.security import hash_password_async, verify_and_update_async, PasswordHashBusy
+from src.repositories.async_user_repository import AsyncUserRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, graph_op
+from src.config.database import get_async_mongo_db
+from src.api.dependencies import get_outbox_repository, get_user_repository
 from src.models.user_model import UserIn
+from src.api.middleware.session_resolver import session_resolver, SESSION_TTL_SECONDS
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-user_repo = UserRepository()
-graph_repo = Neo4jRepository()
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 
 @router.post("/register")
-def register(payload: UserIn):
-    db = get_mongo_db()
+async def register(payload: UserIn, outbox: AsyncOutboxRepository = Depends(get_outbox_repository)):
+    db = get_async_mongo_db()
     users = db.get_collection("users")
     people = db.get_collection("people")
 
     logging.info(f"🟦 Intentando registrar usuario: {payload.username}")
 
     # 🔒 Verificar usuario existente
-    if users.find_one({"username": payload.username}):
+    if await users.find_one({"username": payload.username}):
         logging.warning("⚠️ Usuario ya existe en MongoDB.")
         raise HTTPException(status_code=400, detail="Username already exists")
 
     try:
         # 👤 Crear usuario
-        pwd_hash = hash_password(payload.password)
+        # hashing es CPU-bound: se ejecuta en el pool dedicado (src/utils/security.py)
+        pwd_hash = await hash_password_async(payload.password)
         user_doc = {
             "username": payload.username,
             "password_hash": pwd_hash,
             "created_at": datetime.utcnow(),
         }
 
-        res = users.insert_one(user_doc)
-        logging.info(f"✅ Usuario creado con _id={res.inserted_id}")
-        user_id = str(res.inserted_id)
-
-        # 👥 Crear persona vinculada
+        # 👥 Persona vinculada (el userId se completa dentro de la transacción)
         person_doc = {
-            "userId": user_id,
             "correo": f"{payload.username}@talentum.local",
             "rol": "Usuario",
             "datosPersonales": {"nombre": payload.username},
@@ -62,30 +57,40 @@ def register(payload: UserIn):
             "actualizadoEn": datetime.utcnow(),
         }
 
-        logging.info("🟨 Intentando insertar en colección 'people'...")
-        result_people = people.insert_one(person_doc)
-        logging.info(f"✅ Resultado insert_one: acknowledged={result_people.acknowledged}, id={result_people.inserted_id}")
+        # users + people + outbox en una sola transacción de Mongo
+        async def _write(session):
+            res = await users.insert_one(user_doc, session=session)
+            user_id = str(res.inserted_id)
+            person_doc["userId"] = user_id
 
-        # 🌐 Crear nodo en Neo4j
-        try:
-            logging.info("🌍 Intentando crear nodo en Neo4j...")
-            graph_repo.create_person_node(
-                person_id=user_id,
-                nombre=payload.username,
-                rol="Usuario"
-            )
-            logging.info("✅ Nodo creado correctamente en Neo4j.")
-        except Exception as neo_err:
-            logging.error(f"⚠️ Error creando nodo en Neo4j: {neo_err}")
+            logging.info("🟨 Intentando insertar en colección 'people'...")
+            result_people = await people.insert_one(person_doc, session=session)
+            logging.info(f"✅ Resultado insert_one: acknowledged={result_people.acknowledged}, id={result_people.inserted_id}")
+
+            # 🌐 Encolar el nodo en Neo4j (lo proyecta src/workers/graph_projector.py)
+            await outbox.append([
+                graph_op("create_person_node", person_id=user_id, nombre=payload.username, rol="Usuario")
+            ], clave=f"person:{user_id}", session=session)
+            return user_id
+
+        user_id = await outbox.transaction(_write)
+        logging.info(f"✅ Usuario creado con _id={user_id}")
 
         return {"id": user_id, "username": payload.username}
 
+    except PasswordHashBusy:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, reintente",
+                            headers={"Retry-After": "1"})
+    except DuplicateKeyError:
+        # carrera entre dos registros con el mismo username: lo resuelve el índice único
+        logging.warning("⚠️ Usuario ya existe en MongoDB.")
+        raise HTTPException(status_code=400, detail="Username already exists")
     except Exception as e:
         logging.error(f"❌ Error creando usuario o persona: {e}")
         raise HTTPException(status_code=500, detail=f"Error creando usuario o persona: {e}")
 
 @router.post("/login")
-def login(payload: Dict[str, str]):
+async def login(payload: Dict[str, str], user_repo: AsyncUserRepository = Depends(get_user_repository)):
     """
     Login con credenciales: { "username": "..", "password": ".." }
     Devuelve token con sessionId en Redis.
@@ -96,17 +101,34 @@ def login(payload: Dict[str, str]):
     if not username or not password:
         raise HTTPException(status_code=400, detail="username and password required")
 
-    user = user_repo.find_by_username(username)
-    if not user or not verify_password(password, user.get("password_hash", "")):
+    user = await user_repo.find_by_username(username)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    stored_hash = user.get("password_hash", "")
+    try:
+        valid, new_hash = await verify_and_update_async(password, stored_hash)
+    except PasswordHashBusy:
+        raise HTTPException(status_code=503, detail="Servidor ocupado, reintente",
+                            headers={"Retry-After": "1"})
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # 🔁 Hash con rondas por debajo de PBKDF2_ROUNDS: se regenera con la contraseña en claro
+    if new_hash:
+        try:
+            await user_repo.update_password_hash(user["_id"], stored_hash, new_hash)
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo actualizar el hash de {username}: {e}")
+
     user_id = str(user["_id"])
-    session_id = uuid.uuid4().hex
-    ttl_seconds = 3600
+
+    # La sesión guarda el _id de la persona: las rutas /me no necesitan buscarla por userId
+    person = await get_async_mongo_db().get_collection("people").find_one({"userId": user_id}, {"_id": 1})
+    person_id = str(person["_id"]) if person else None
 
     try:
-        r = get_redis_client()
-        r.set(session_id, user_id, ex=ttl_seconds)
+        session_id = await session_resolver.create(user_id, person_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Redis error: {e}")
 
@@ -114,5 +136,53 @@ def login(payload: Dict[str, str]):
         "sessionId": session_id,
         "token": session_id,
         "auth_header": f"Bearer {session_id}",
-        "expires_in": ttl_seconds,
+        "expires_in": SESSION_TTL_SECONDS,
     }
+
+
+def _session_token(request: Request) -> str:
+    auth_header = request.headers.get("authorization")
+    if auth_header and auth_header.lower().startswith("bearer "):
+        session_id = auth_header.split(" ", 1)[1].strip()
+    else:
+        session_id = request.headers.get("x-session-id")
+
+    if not session_id:
+        raise HTTPException(status_code=401, detail="Missing or invalid session token")
+    return session_id
+
+
+@router.post("/logout")
+async def logout(request: Request):
+    """
+    Revoca la sesión actual (Authorization: Bearer o X-Session-Id).
+    La revocación se propaga por pub/sub para invalidar las cachés de sesión de todos los workers.
+    """
+    session_id = _session_token(request)
+
+    try:
+        deleted = await session_resolver.revoke(session_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Redis error: {e}")
+
+    return {"message": "Sesión cerrada", "revoked": bool(deleted)}
+
+
+@router.post("/logout-all")
+async def logout_all(request: Request):
+    """
+    Revoca todas las sesiones del usuario dueño del token actual (todos los dispositivos).
+    """
+    session_id = _session_token(request)
+
+    try:
+        user_id = await session_resolver.resolve(session_id)
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Session invalid or expired")
+        revoked = await session_resolver.revoke_all(user_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Redis error: {e}")
+
+    return {"message": "Sesiones cerradas", "revoked": revoked}
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, Request
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from typing import List, Dict, Any, Optional
 from bson import ObjectId
 
 from src.models.company_model import CompanyIn, CompanyOut
 from src.services.company_service import CompanyService
+from src.api.dependencies import get_company_service, get_current_person_ref, person_node_id
+from src.repositories.mongo_repository import next_cursor
 
 router = APIRouter(prefix="/companies", tags=["Companies"])
-svc = CompanyService()
 
 
 # ==============================
@@ -33,7 +34,8 @@ def _serialize(doc: Dict[str, Any]) -> Dict[str, Any]:
 # ==============================
 
 @router.post("/", response_model=CompanyOut)
-def create_company(company: CompanyIn, request: Request):
+async def create_company(company: CompanyIn, request: Request,
+                         svc: CompanyService = Depends(get_company_service)):
     """Crea una empresa y la vincula al usuario autenticado."""
     user_id = _require_auth(request)
 
@@ -42,39 +44,49 @@ def create_company(company: CompanyIn, request: Request):
     data["created_by"] = str(user_id)
 
     try:
-        created = svc.create(data)
+        created = await svc.create(data)
         return _serialize(created)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating company: {e}")
 
 
 @router.get("/", response_model=List[CompanyOut])
-def list_companies(request: Request):
-    """Lista las empresas del usuario autenticado."""
+async def list_companies(request: Request, response: Response,
+                         limit: int = Query(100, ge=1, le=1000),
+                         after: Optional[str] = Query(None, description="Bookmark (_id) devuelto en X-Next-Cursor"),
+                         svc: CompanyService = Depends(get_company_service)):
+    """Lista las empresas del usuario autenticado (paginado con limit/after)."""
     user_id = _require_auth(request)
     try:
-        items = svc.list(user_id)
+        items = await svc.list(user_id, limit=limit + 1, after=after)
+        cursor = next_cursor(items, limit)
+        items = items[:limit]
+        if cursor:
+            response.headers["X-Next-Cursor"] = cursor
         return [_serialize(doc) for doc in items]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing companies: {e}")
 
 
 @router.get("/{company_id}", response_model=CompanyOut)
-def get_company(company_id: str, request: Request):
+async def get_company(company_id: str, request: Request, svc: CompanyService = Depends(get_company_service)):
     """Obtiene una empresa si pertenece al usuario."""
     user_id = _require_auth(request)
-    company = svc.get(company_id, user_id)
+    company = await svc.get(company_id, user_id)
     if not company:
         raise HTTPException(status_code=404, detail="Empresa no encontrada")
     return _serialize(company)
 
 
 @router.put("/{company_id}", response_model=CompanyOut)
-def update_company(company_id: str, updates: Dict[str, Any], request: Request):
+async def update_company(company_id: str, updates: Dict[str, Any], request: Request,
+                         svc: CompanyService = Depends(get_company_service)):
     """Actualiza una empresa si es del usuario autenticado."""
     user_id = _require_auth(request)
     try:
-        updated = svc.update(company_id, updates, user_id)
+        updated = await svc.update(company_id, updates, user_id)
         if not updated:
             raise HTTPException(status_code=404, detail="Empresa no encontrada o sin permisos")
         return _serialize(updated)
@@ -85,11 +97,12 @@ def update_company(company_id: str, updates: Dict[str, Any], request: Request):
 
 
 @router.delete("/{company_id}")
-def delete_company(company_id: str, request: Request):
+async def delete_company(company_id: str, request: Request,
+                         svc: CompanyService = Depends(get_company_service)):
     """Elimina una empresa si es del usuario autenticado."""
     user_id = _require_auth(request)
     try:
-        deleted = svc.delete(company_id, user_id)
+        deleted = await svc.delete(company_id, user_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Empresa no encontrada o sin permisos")
         return {"message": "Empresa eliminada correctamente"}
@@ -99,7 +112,8 @@ def delete_company(company_id: str, request: Request):
         raise HTTPException(status_code=500, detail=f"Error deleting company: {e}")
     
 @router.post("/{company_a}/partners/{company_b}")
-def link_companies(company_a: str, company_b: str, body: Dict[str, str]):
+async def link_companies(company_a: str, company_b: str, body: Dict[str, str],
+                         svc: CompanyService = Depends(get_company_service)):
     """
     Crea una relación de partnership siempre en ambos sentidos entre company_a y company_b.
     Esto fuerza que exista (A)-[:TYPE]->(B) y (B)-[:TYPE]->(A).
@@ -110,13 +124,13 @@ def link_companies(company_a: str, company_b: str, body: Dict[str, str]):
         res_ab = None
         res_ba = None
         try:
-            res_ab = svc.link_partner(company_a, company_b, tipo)
+            res_ab = await svc.link_partner(company_a, company_b, tipo)
         except Exception as e:
             # registrar y continuar
             res_ab = {"warning": f"Could not link {company_a} -> {company_b}: {e}"}
 
         try:
-            res_ba = svc.link_partner(company_b, company_a, tipo)
+            res_ba = await svc.link_partner(company_b, company_a, tipo)
         except Exception as e:
             res_ba = {"warning": f"Could not link {company_b} -> {company_a}: {e}"}
 
@@ -125,17 +139,15 @@ def link_companies(company_a: str, company_b: str, body: Dict[str, str]):
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{company_id}/employees/me")
-def link_employee(company_id: str, body: Dict[str, str], request: Request):
+async def link_employee(company_id: str, body: Dict[str, str],
+                        person: Dict[str, Any] = Depends(get_current_person_ref),
+                        svc: CompanyService = Depends(get_company_service)):
     """
-    Vincula al usuario autenticado como empleado de la empresa.
-    Usa el user_id obtenido por el middleware (request.state.user_id) en lugar
-    de recibir un person_id en la URL.
+    Vincula a la persona de la sesión como empleada de la empresa
+    (en lugar de recibir un person_id en la URL).
     """
-    # Requiere sesión
-    user_id = _require_auth(request)
-
     try:
         role = body.get("role", "TRABAJA_EN")
-        return svc.link_person(user_id, company_id, role)
+        return await svc.link_person(person_node_id(person), company_id, role)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,39 +1,69 @@
-from fastapi import APIRouter, HTTPException, Request
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from typing import List, Dict, Any, Optional
 from src.models.job_model import JobIn, JobOut
 from src.services.job_service import JobService
-from src.utils.redis_stats import record_job_view
+from src.services.recommendation_service import RecommendationService, CANDIDATES_TOP_K
+from src.api.dependencies import (get_job_service, get_recommendation_service,
+                                  get_current_person_ref, person_node_id)
+from src.repositories.mongo_repository import next_cursor
+from src.utils.ndjson import ndjson_response, parse_fields
+from src.utils.async_redis_stats import record_job_view
 
 router = APIRouter(prefix="/jobs", tags=["Jobs"])
-svc = JobService()
 
 # =============================
 # CRUD
 # =============================
 
 @router.post("/", response_model=JobOut)
-def create_job(job: JobIn):
+async def create_job(job: JobIn, svc: JobService = Depends(get_job_service)):
     try:
-        return svc.create(job.model_dump())
+        return await svc.create(job.model_dump())
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/", response_model=List[JobOut])
-def list_jobs():
+async def list_jobs(response: Response,
+                    limit: int = Query(100, ge=1, le=1000),
+                    after: Optional[str] = Query(None, description="Bookmark (_id) devuelto en X-Next-Cursor"),
+                    svc: JobService = Depends(get_job_service)):
     try:
-        return svc.list({})
+        items = await svc.list({}, limit=limit + 1, after=after)
+        cursor = next_cursor(items, limit)
+        items = items[:limit]
+        if cursor:
+            response.headers["X-Next-Cursor"] = cursor
+        return items
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/export")
+async def export_jobs(request: Request,
+                      fields: Optional[str] = Query(None, description="Proyección: campos separados por coma"),
+                      batch_size: int = Query(1000, ge=1, le=10000),
+                      svc: JobService = Depends(get_job_service)):
+    """
+    Exporta toda la colección jobs como NDJSON (un documento por línea),
+    en streaming desde el cursor de Mongo: memoria constante y primer byte inmediato.
+    """
+    if not getattr(request, "state", None) or not request.state.user_id:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    docs = svc.export(projection=parse_fields(fields), batch_size=batch_size)
+    return ndjson_response(docs, filename="jobs.ndjson", chunk_size=min(batch_size, 500))
+
+
 @router.get("/{job_id}", response_model=JobOut)
-def get_job(job_id: str):
-    job = svc.get(job_id)
+async def get_job(job_id: str, request: Request, svc: JobService = Depends(get_job_service)):
+    job = await svc.get(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job no encontrado")
     
-    # Registrar la vista del trabajo
+    # Registrar la vista del trabajo (y el viewer único si hay sesión)
     try:
-        record_job_view(job_id)
+        await record_job_view(job_id, getattr(request.state, "user_id", None))
     except Exception:
         # Si falla el registro de la vista, no interrumpimos la operación principal
         pass
@@ -41,53 +71,53 @@ def get_job(job_id: str):
     return job
 
 @router.put("/{job_id}", response_model=JobOut)
-def update_job(job_id: str, updates: Dict[str, Any]):
-    updated = svc.update(job_id, updates)
+async def update_job(job_id: str, updates: Dict[str, Any], svc: JobService = Depends(get_job_service)):
+    updated = await svc.update(job_id, updates)
     if not updated:
         raise HTTPException(status_code=404, detail="Job no encontrado")
     return updated
 
 @router.delete("/{job_id}")
-def delete_job(job_id: str):
+async def delete_job(job_id: str, svc: JobService = Depends(get_job_service)):
     try:
-        svc.delete(job_id)
+        await svc.delete(job_id)
         return {"message": "Job eliminado correctamente"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/{job_id}/apply/me")
-def apply_to_job(job_id: str, request: Request):
+async def apply_to_job(job_id: str,
+                       person: Dict[str, Any] = Depends(get_current_person_ref),
+                       svc: JobService = Depends(get_job_service)):
     """
-    Crea una postulación (Person -> Job). Requiere sesión válida y que el
-    person_id en la URL coincida con la sesión.
+    Crea una postulación (Person -> Job) para la persona de la sesión.
+    La persona ya resuelta se pasa al servicio, que no vuelve a buscarla.
     """
-    if not getattr(request, "state", None) or not request.state.user_id:
-        raise HTTPException(status_code=401, detail="Authentication required")
-
-    # Buscar la persona vinculada al user en sesión y usar su Mongo _id
-    from src.services.people_service import PeopleService
-    people_svc = PeopleService()
-    found = people_svc.list({"userId": request.state.user_id})
-    if not found:
-        raise HTTPException(status_code=404, detail="Persona no encontrada")
-    # Para sincronizar con Neo4j usamos el id que se usó como id del nodo.
-    # Las personas creadas en el registro tienen `userId` como id del nodo en Neo4j;
-    # si no existe, usamos el _id de Mongo.
-    person_doc = found[0]
-    target_person_id = person_doc.get("userId") or person_doc.get("_id")
-
     try:
-        return svc.apply(target_person_id, job_id)
+        return await svc.apply(person_node_id(person), job_id, person_doc=person)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{job_id}/applicants")
-def get_applicants(job_id: str):
+async def get_applicants(job_id: str, svc: JobService = Depends(get_job_service)):
     """
     Lista todas las personas que se postularon a un Job.
     """
     try:
-        return svc.get_applicants(job_id)
+        return await svc.get_applicants(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/{job_id}/candidates")
+async def get_candidates(job_id: str,
+                         top: int = Query(10, ge=1, le=CANDIDATES_TOP_K),
+                         recs: RecommendationService = Depends(get_recommendation_service)):
+    """
+    Ranking de candidatos para un Job según afinidad de skills
+    (POSEE_HABILIDAD vs. requisitos obligatorios/deseables), servido desde Redis.
+    """
+    try:
+        return {"jobId": job_id, "candidates": await recs.get_job_candidates(job_id, top)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
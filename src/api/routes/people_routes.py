@@ -1,18 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query, Request
-from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Dict, Any, Optional
 from src.models.person_model import PersonIn, PersonOut
 from src.models.connection_model import ConnectionIn
 from src.services.people_service import PeopleService
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.api.dependencies import get_graph_repository, get_people_service, get_current_person
+from src.repositories.mongo_repository import next_cursor
+from src.utils.ndjson import ndjson_response, parse_fields
 
 router = APIRouter(prefix="/people", tags=["People"])
-svc = PeopleService()
 
 # ===============================================
 # 👤 CRUD
 # ===============================================
 
 @router.post("/", response_model=PersonOut)
-def create_person(person: PersonIn, request: Request):
+async def create_person(person: PersonIn, request: Request, svc: PeopleService = Depends(get_people_service)):
     """
     Crea una persona vinculada al usuario en sesión.
     El middleware asigna `request.state.user_id` y aquí lo usamos como `userId`.
@@ -28,70 +31,63 @@ def create_person(person: PersonIn, request: Request):
 
         # Si ya existe una persona vinculada a este userId (se crea en /auth/register),
         # actualizamos ese documento en lugar de crear uno nuevo.
-        existing = svc.list({"userId": request.state.user_id})
+        existing = await svc.get_by_user(request.state.user_id)
         if existing:
-            # actualizar el primer documento encontrado
-            existing_id = existing[0].get("_id")
-            updated = svc.update(existing_id, person_data)
+            # actualizar el documento encontrado
+            existing_id = existing.get("_id")
+            updated = await svc.update(existing_id, person_data)
             return updated
 
-        created = svc.create(person_data)
+        created = await svc.create(person_data)
         return created
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/", response_model=List[PersonOut])
-def list_people():
+async def list_people(response: Response,
+                      limit: int = Query(100, ge=1, le=1000),
+                      after: Optional[str] = Query(None, description="Bookmark (_id) devuelto en X-Next-Cursor"),
+                      svc: PeopleService = Depends(get_people_service)):
     try:
-        return svc.list({})
+        items = await svc.list({}, limit=limit + 1, after=after)
+        cursor = next_cursor(items, limit)
+        items = items[:limit]
+        if cursor:
+            response.headers["X-Next-Cursor"] = cursor
+        return items
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/me", response_model=PersonOut)
-def get_person(request: Request):
-    # Devuelve la persona vinculada al usuario en sesión
-    if not getattr(request, "state", None) or not request.state.user_id:
-        raise HTTPException(status_code=401, detail="Authentication required")
-
-    found = svc.list({"userId": request.state.user_id})
-    if not found:
-        raise HTTPException(status_code=404, detail="Persona no encontrada")
-    return found[0]
+async def get_person(person: Dict[str, Any] = Depends(get_current_person)):
+    # Devuelve la persona vinculada al usuario en sesión (401/404 los resuelve la dependencia)
+    return person
 
 
 @router.put("/me", response_model=PersonOut)
-def update_person(updates: Dict[str, Any], request: Request):
-    # Requiere sesión
-    if not getattr(request, "state", None) or not request.state.user_id:
-        raise HTTPException(status_code=401, detail="Authentication required")
-
-    found = svc.list({"userId": request.state.user_id})
-    if not found:
-        raise HTTPException(status_code=404, detail="Persona no encontrada")
-    target_id = found[0].get("_id")
+async def update_person(updates: Dict[str, Any],
+                        person: Dict[str, Any] = Depends(get_current_person),
+                        svc: PeopleService = Depends(get_people_service)):
+    target_id = person.get("_id")
 
-    updated = svc.update(target_id, updates)
+    updated = await svc.update(target_id, updates)
     if not updated:
         raise HTTPException(status_code=404, detail="Persona no encontrada")
     return updated
 
 
 @router.delete("/me")
-def delete_person(request: Request):
-    # Requiere sesión
-    if not getattr(request, "state", None) or not request.state.user_id:
-        raise HTTPException(status_code=401, detail="Authentication required")
-
-    found = svc.list({"userId": request.state.user_id})
-    if not found:
-        raise HTTPException(status_code=404, detail="Persona no encontrada")
-    target_id = found[0].get("_id")
+async def delete_person(person: Dict[str, Any] = Depends(get_current_person),
+                        svc: PeopleService = Depends(get_people_service)):
+    target_id = person.get("_id")
 
     try:
         if hasattr(svc, "delete"):
-            svc.delete(target_id)
+            await svc.delete(target_id)
             return {"message": "Persona eliminada correctamente"}
         else:
             raise Exception("Delete operation not implemented on PeopleService")
@@ -104,11 +100,12 @@ def delete_person(request: Request):
 # ===============================================
 
 @router.post("/me/connections/{target_id}")
-def connect_people(
+async def connect_people(
     target_id: str,
     body: Dict[str, str],
     direction: str = Query("two-way", description="Tipo de conexión: one-way o two-way"),
     request: Request = None,
+    svc: PeopleService = Depends(get_people_service),
 ):
     """
     Crea una conexión entre dos personas.
@@ -122,14 +119,14 @@ def connect_people(
     try:
         tipo = body.get("type", "amistad")
         source_id = request.state.user_id
-        result = svc.connect(source_id, target_id, tipo, direction)
+        result = await svc.connect(source_id, target_id, tipo, direction)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/me/recommendations")
-def get_recommendations(request: Request = None):
+async def get_recommendations(request: Request = None, svc: PeopleService = Depends(get_people_service)):
     """
     Obtiene empleos recomendados para una persona según sus habilidades.
     """
@@ -138,13 +135,13 @@ def get_recommendations(request: Request = None):
 
     try:
         pid = request.state.user_id
-        recs = svc.get_recommendations(pid)
+        recs = await svc.get_recommendations(pid)
         return {"personId": pid, "recommendations": recs}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/me/network")
-def get_network(request: Request = None):
+async def get_network(request: Request = None, svc: PeopleService = Depends(get_people_service)):
     """
     Devuelve la red (conexiones) de una persona.
     """
@@ -153,13 +150,14 @@ def get_network(request: Request = None):
 
     try:
         pid = request.state.user_id
-        network = svc.get_network(pid)
+        network = await svc.get_network(pid)
         return {"personId": pid, "connections": network}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/me/connections/common/{other_id}")
-def get_common_connections(other_id: str, request: Request = None):
+async def get_common_connections(other_id: str, request: Request = None,
+                                 svc: PeopleService = Depends(get_people_service)):
     """
     Devuelve las conexiones en común entre dos personas.
     """
@@ -171,13 +169,14 @@ def get_common_connections(other_id: str, request: Request = None):
         # if other_id == 'me', map to session user id
         if other_id == "me":
             other_id = request.state.user_id
-        commons = svc.get_common_connections(pid, other_id)
+        commons = await svc.get_common_connections(pid, other_id)
         return {"person1": pid, "person2": other_id, "commonConnections": commons}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/me/connections/suggested")
-def get_suggested_connections(request: Request = None):
+async def get_suggested_connections(request: Request = None,
+                                    svc: PeopleService = Depends(get_people_service)):
     """
     Devuelve sugerencias de conexión (segundo grado de relación).
     """
@@ -186,13 +185,14 @@ def get_suggested_connections(request: Request = None):
 
     try:
         pid = request.state.user_id
-        suggested = svc.get_suggested_connections(pid)
+        suggested = await svc.get_suggested_connections(pid)
         return {"personId": pid, "suggestedConnections": suggested}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.delete("/me/connections/{target_id}")
-def delete_connection(target_id: str, type: str = Query(None, description="Tipo de conexión opcional"), request: Request = None):
+async def delete_connection(target_id: str, type: str = Query(None, description="Tipo de conexión opcional"), request: Request = None,
+                            svc: PeopleService = Depends(get_people_service)):
     """
     Elimina una conexión entre dos personas.
     - Si se pasa ?type=MENTORSHIP → elimina solo ese tipo.
@@ -203,13 +203,13 @@ def delete_connection(target_id: str, type: str = Query(None, description="Tipo
 
     try:
         pid = request.state.user_id
-        result = svc.delete_connection(pid, target_id, type)
+        result = await svc.delete_connection(pid, target_id, type)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/me/applications")
-def get_applications(request: Request = None):
+async def get_applications(request: Request = None, svc: PeopleService = Depends(get_people_service)):
     """
     Devuelve los empleos a los que una persona se postuló.
     """
@@ -218,31 +218,32 @@ def get_applications(request: Request = None):
 
     try:
         pid = request.state.user_id
-        apps = svc.get_applications(pid)
+        apps = await svc.get_applications(pid)
         return {"personId": pid, "applications": apps}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/me/skills")
-def get_person_skills(request: Request):
+async def get_person_skills(request: Request, svc: PeopleService = Depends(get_people_service)):
     """
     Obtiene todas las habilidades de una persona (con su nivel) desde Neo4j.
     """
     try:
         pid = request.state.user_id
-        skills = svc.get_skills(pid)
+        skills = await svc.get_skills(pid)
         return {"personId": pid, "skills": skills}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/skills/{skill_name}/people")
-def get_people_by_skill(skill_name: str, min_level: int = Query(1, ge=1, le=5, description="Nivel mínimo (1-5)")):
+async def get_people_by_skill(skill_name: str, min_level: int = Query(1, ge=1, le=5, description="Nivel mínimo (1-5)"),
+                              svc: PeopleService = Depends(get_people_service)):
     """
     Devuelve todas las personas que poseen la habilidad indicada con un nivel mínimo.
     Ejemplo: /api/v1/people/skills/Python/people?min_level=3
     """
     try:
-        people = svc.get_people_by_skill(skill_name, min_level)
+        people = await svc.get_people_by_skill(skill_name, min_level)
         return {
             "skill": skill_name,
             "min_level": min_level,
@@ -252,8 +253,25 @@ def get_people_by_skill(skill_name: str, min_level: int = Query(1, ge=1, le=5, d
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/export")
+async def export_people(request: Request,
+                        fields: Optional[str] = Query(None, description="Proyección: campos separados por coma"),
+                        batch_size: int = Query(1000, ge=1, le=10000),
+                        svc: PeopleService = Depends(get_people_service)):
+    """
+    Exporta toda la colección people como NDJSON (un documento por línea),
+    en streaming desde el cursor de Mongo: memoria constante y primer byte inmediato.
+    """
+    if not getattr(request, "state", None) or not request.state.user_id:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    docs = svc.export(projection=parse_fields(fields), batch_size=batch_size)
+    return ndjson_response(docs, filename="people.ndjson", chunk_size=min(batch_size, 500))
+
+
 @router.get("/{person_id}", response_model=PersonOut)
-def get_person_by_id(person_id: str, request: Request):
+async def get_person_by_id(person_id: str, request: Request,
+                           svc: PeopleService = Depends(get_people_service)):
     """
     Devuelve la información de una persona por su ID (similar a /me).
     Requiere autenticación. Cada vez que se consulta esta ruta se incrementa
@@ -264,7 +282,7 @@ def get_person_by_id(person_id: str, request: Request):
         raise HTTPException(status_code=401, detail="Authentication required")
 
     try:
-        person = svc.get(person_id)
+        person = await svc.get(person_id, viewer_id=request.state.user_id)
         if not person:
             raise HTTPException(status_code=404, detail="Persona no encontrada")
         return person
@@ -279,7 +297,9 @@ def get_person_by_id(person_id: str, request: Request):
 # ===============================================
 
 @router.post("/sync-names-to-neo4j")
-def sync_names_to_neo4j(request: Request):
+async def sync_names_to_neo4j(request: Request,
+                              svc: PeopleService = Depends(get_people_service),
+                              neo_repo: AsyncNeo4jRepository = Depends(get_graph_repository)):
     """
     Sincroniza los nombres de todas las personas desde MongoDB a Neo4j.
     Útil para actualizar los nodos existentes con sus nombres.
@@ -290,12 +310,10 @@ def sync_names_to_neo4j(request: Request):
     
     try:
         # Obtener todas las personas de MongoDB
-        all_people = svc.list({})
+        all_people = await svc.list({})
         
         # Sincronizar en Neo4j
-        from src.repositories.neo4j_repository import Neo4jRepository
-        neo_repo = Neo4jRepository()
-        neo_repo.sync_all_person_names(all_people)
+        await neo_repo.sync_all_person_names(all_people)
         
         return {
             "message": "Nombres sincronizados exitosamente",
@@ -1,14 +1,21 @@
-from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from typing import List, Dict, Any
-from src.utils.redis_stats import person_stats, job_stats
+from src.utils.async_redis_stats import person_stats, job_stats, stats_many, STATS_KINDS
 from src.repositories.mongo_repository import MongoRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, OUTBOX_METRICS_KEY
+from src.repositories.async_redis_repository import AsyncRedisRepository
+from src.api.middleware.session_resolver import session_resolver
+from src.utils.view_buffer import view_buffer
+from src.utils.leaderboard import leaderboard
+from src.config.database import get_async_redis_client
+from src.api.dependencies import get_outbox_repository
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
 
 
 
 @router.get("/me")
-def get_my_stats(request: Request):
+async def get_my_stats(request: Request):
     """
     Obtiene las estadísticas del usuario autenticado:
     - Número de postulaciones
@@ -21,19 +28,91 @@ def get_my_stats(request: Request):
 
     try:
         # Todos los contadores se guardan bajo userId; por lo tanto consultamos por userId
-        return person_stats(request.state.user_id)
+        return await person_stats(request.state.user_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/job/{job_id}")
-def get_job_stats(job_id: str):
+async def get_job_stats(job_id: str):
     """
     Obtiene las estadísticas de un trabajo específico:
     - Número de postulaciones
     - Número de vistas
     """
     try:
-        return job_stats(job_id)
+        return await job_stats(job_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/bulk/{kind}")
+async def get_stats_many(kind: str,
+                         ids: str = Query(..., description="ids separados por coma (máx. 500)")):
+    """
+    Estadísticas de muchas personas (kind=person) o trabajos (kind=job)
+    en una sola consulta a Redis, para dashboards y listados.
+    """
+    if kind not in STATS_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind debe ser uno de {sorted(STATS_KINDS)}")
+    id_list = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if len(id_list) > 500:
+        raise HTTPException(status_code=400, detail="Máximo 500 ids por consulta")
+    try:
+        return await stats_many(id_list, kind)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/leaderboard/{metric}")
+async def get_leaderboard(metric: str,
+                          top: int = Query(10, ge=1, le=100),
+                          window: str = Query("24h", description="'all' o ventana móvil: '24h', '7d'...")):
+    """
+    Top-K (aproximado, por buckets horarios) de uno de los ZSETs de estadísticas:
+    applications_by_job, applications_by_person, job_views, profile_views, connections_count.
+    """
+    try:
+        return {"metric": metric, "window": window, "top": await leaderboard(metric, top, window)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/outbox")
+async def get_outbox_stats(outbox: AsyncOutboxRepository = Depends(get_outbox_repository)):
+    """
+    Estado de la proyección Mongo → Neo4j:
+    - pendientes / fallidos y lag del evento pendiente más antiguo (Mongo)
+    - métricas publicadas por el worker (Redis `outbox:metrics`)
+    """
+    try:
+        stats = await outbox.stats()
+        stats["worker"] = await get_async_redis_client().hgetall(OUTBOX_METRICS_KEY)
+        return stats
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """
+    Contadores hit/miss (por proceso) de las cachés:
+    - perfiles de personas en Redis (cache:person:*)
+    - sesiones en memoria (session_resolver)
+    """
+    return {
+        "person": AsyncRedisRepository.person_cache_stats(),
+        "session": session_resolver.stats(),
+    }
+
+
+@router.get("/views-buffer")
+async def get_view_buffer_stats():
+    """
+    Estado (por proceso) del buffer write-behind de vistas:
+    pendientes, volcadas, cantidad de flushes y vistas descartadas.
+    """
+    return view_buffer.stats()
+
@@ -0,0 +1,187 @@
+# src/benchmarks/job_recommendations.py
+"""
+Benchmark de get_job_recommendations: consulta anterior (recorre todos los Job
+y filtra con EXISTS) vs. la actual anclada en skills (JOB_RECOMMENDATIONS_QUERY).
+
+Usar contra una base Neo4j dedicada: el grafo sintético ocupa varios GB.
+
+    python -m src.benchmarks.job_recommendations --seed --jobs 100000 --persons 1000000
+    python -m src.benchmarks.job_recommendations --runs 50
+    python -m src.benchmarks.job_recommendations --cleanup
+
+Para cada consulta reporta db hits (PROFILE, sumados sobre todo el plan) y
+latencia p50/p95 (ms) sobre `--runs` personas al azar del grafo sintético.
+"""
+import sys
+import time
+import random
+import argparse
+import statistics
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+from src.config.database import get_neo4j_driver, cerrar_conexiones
+from src.repositories.neo4j_repository import GRAPH_SCHEMA, JOB_RECOMMENDATIONS_QUERY
+
+PREFIX = "bench-"
+
+# Versión previa de JOB_RECOMMENDATIONS_QUERY (línea base de la comparación).
+# Neo4j 5 ya no acepta exists(patrón): se usa EXISTS { } con la misma semántica.
+LEGACY_JOB_RECOMMENDATIONS_QUERY = """
+    MATCH (p:Person {id: $pid})-[r:POSEE_HABILIDAD]->(s:Skill)
+    MATCH (job:Job)
+    WHERE EXISTS { (job)-[:REQUERIMIENTO_DE|DESEA]->(s) }
+    WITH p, job, s,
+         COALESCE(r.nivel, 1) AS nivelPersona,
+         EXISTS { (job)-[:REQUERIMIENTO_DE]->(s) } AS esRequerida,
+         EXISTS { (job)-[:DESEA]->(s) } AS esDeseada
+    WITH job,
+         COLLECT(DISTINCT s.nombre) AS habilidadesCoincidentes,
+         SUM(
+             nivelPersona * CASE
+                 WHEN esRequerida THEN 2.0
+                 WHEN esDeseada THEN 1.0
+                 ELSE 0
+             END
+         ) AS afinidad,
+         COUNT(DISTINCT s) as cantidadSkills
+    WHERE cantidadSkills > 0
+    RETURN job.id AS jobId,
+           job.titulo AS titulo,
+           job.descripcion AS descripcion,
+           habilidadesCoincidentes,
+           ROUND(afinidad * (1.0 + cantidadSkills/10.0), 2) AS score
+    ORDER BY score DESC
+    LIMIT $limit
+    """
+
+QUERIES = {
+    "antes (todos los Job + EXISTS)": LEGACY_JOB_RECOMMENDATIONS_QUERY,
+    "ahora (anclada en skills)": JOB_RECOMMENDATIONS_QUERY,
+}
+
+# ===============================================================
+# 🌱 Grafo sintético
+# ===============================================================
+SEED_SKILLS = """
+UNWIND range(0, $skills - 1) AS i
+MERGE (:Skill {nombre: $prefix + 'skill-' + i})
+"""
+
+SEED_JOBS = """
+UNWIND range($desde, $hasta - 1) AS i
+CREATE (job:Job {id: $prefix + 'job-' + i, titulo: 'Bench job ' + i, descripcion: 'sintético'})
+WITH job
+UNWIND range(1, 3 + toInteger(rand() * 6)) AS k
+WITH job, k, $prefix + 'skill-' + toInteger(rand() * $skills) AS nombre
+MATCH (s:Skill {nombre: nombre})
+FOREACH (_ IN CASE WHEN k <= 5 THEN [1] ELSE [] END | MERGE (job)-[:REQUERIMIENTO_DE]->(s))
+FOREACH (_ IN CASE WHEN k > 5 THEN [1] ELSE [] END | MERGE (job)-[:DESEA]->(s))
+"""
+
+SEED_PERSONS = """
+UNWIND range($desde, $hasta - 1) AS i
+CREATE (p:Person {id: $prefix + 'person-' + i, nombre: 'Bench ' + i, rol: 'Dev'})
+WITH p
+UNWIND range(1, 3 + toInteger(rand() * 8)) AS k
+WITH p, $prefix + 'skill-' + toInteger(rand() * $skills) AS nombre
+MATCH (s:Skill {nombre: nombre})
+MERGE (p)-[r:POSEE_HABILIDAD]->(s)
+SET r.nivel = 1 + toInteger(rand() * 5)
+"""
+
+CLEANUP = """
+MATCH (n) WHERE (n:Job OR n:Person OR n:Skill) AND coalesce(n.id, n.nombre) STARTS WITH $prefix
+CALL { WITH n DETACH DELETE n } IN TRANSACTIONS OF 10000 ROWS
+"""
+
+
+def _run_batches(session, query: str, total: int, batch: int, skills: int, label: str):
+    for desde in range(0, total, batch):
+        hasta = min(desde + batch, total)
+        session.run(query, desde=desde, hasta=hasta, skills=skills, prefix=PREFIX).consume()
+        print(f"  {label}: {hasta}/{total}", end="\r")
+    print()
+
+
+def seed(driver, jobs: int, persons: int, skills: int, batch: int):
+    with driver.session() as session:
+        for statement in GRAPH_SCHEMA:
+            session.run(statement).consume()
+        session.run(SEED_SKILLS, skills=skills, prefix=PREFIX).consume()
+        _run_batches(session, SEED_JOBS, jobs, batch, skills, "jobs")
+        _run_batches(session, SEED_PERSONS, persons, batch, skills, "persons")
+
+
+def cleanup(driver):
+    with driver.session() as session:
+        session.run(CLEANUP, prefix=PREFIX).consume()
+
+
+# ===============================================================
+# ⏱️ Medición
+# ===============================================================
+def profile_db_hits(plan: Dict[str, Any]) -> int:
+    """Suma dbHits de todo el árbol de PROFILE (summary.profile)."""
+    if not plan:
+        return 0
+    return plan.get("dbHits", 0) + sum(profile_db_hits(c) for c in plan.get("children", []))
+
+
+def measure(driver, query: str, person_ids: List[str], limit: int) -> Dict[str, Any]:
+    latencias, hits = [], []
+    with driver.session() as session:
+        for pid in person_ids:
+            start = time.perf_counter()
+            session.run(query, pid=pid, limit=limit).consume()
+            latencias.append((time.perf_counter() - start) * 1000)
+            summary = session.run("PROFILE " + query, pid=pid, limit=limit).consume()
+            hits.append(profile_db_hits(summary.profile))
+    latencias.sort()
+    return {
+        "db_hits_prom": round(statistics.mean(hits)),
+        "p50_ms": round(statistics.median(latencias), 1),
+        "p95_ms": round(latencias[max(0, round(len(latencias) * 0.95) - 1)], 1),
+    }
+
+
+def benchmark(driver, runs: int, persons: int, limit: int):
+    person_ids = [f"{PREFIX}person-{random.randrange(persons)}" for _ in range(runs)]
+    with driver.session() as session:
+        # calentar caché de páginas/planes para no medir el primer compilado
+        for query in QUERIES.values():
+            session.run(query, pid=person_ids[0], limit=limit).consume()
+    print(f"{'consulta':34} {'db hits':>12} {'p50 ms':>10} {'p95 ms':>10}")
+    for name, query in QUERIES.items():
+        r = measure(driver, query, person_ids, limit)
+        print(f"{name:34} {r['db_hits_prom']:>12} {r['p50_ms']:>10} {r['p95_ms']:>10}")
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="crear el grafo sintético antes de medir")
+    parser.add_argument("--cleanup", action="store_true", help="borrar el grafo sintético y salir")
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--persons", type=int, default=1_000_000)
+    parser.add_argument("--skills", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    driver = get_neo4j_driver()
+    try:
+        if args.cleanup:
+            cleanup(driver)
+            return
+        if args.seed:
+            seed(driver, args.jobs, args.persons, args.skills, args.batch)
+        benchmark(driver, args.runs, args.persons, args.limit)
+    finally:
+        cerrar_conexiones()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,105 @@
+# src/benchmarks/login_throughput.py
+"""
+Benchmark del coste de /auth/login: verificación pbkdf2_sha256 en el pool
+dedicado de src/utils/security.py, para uno o más factores de trabajo.
+
+No necesita Mongo ni Redis: mide solo la parte CPU-bound del login, que es la
+que satura el servidor en una tormenta de logins.
+
+    python -m src.benchmarks.login_throughput
+    python -m src.benchmarks.login_throughput --rounds 29000,100000,600000 --seconds 5
+    python -m src.benchmarks.login_throughput --workers 4 --concurrency 64
+
+Para cada número de rondas reporta logins/s totales, logins/s por core
+(repartidos entre min(workers, cores)) y latencia p50/p95 (ms) por login
+con `--concurrency` logins simultáneos.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from typing import List
+
+from dotenv import load_dotenv
+from passlib.context import CryptContext
+
+from src.utils import security
+
+PASSWORD = "bench-Password-123"
+
+
+async def _login_loop(stored_hash: str, deadline: float, latencies: List[float]):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        valid, _ = await security.verify_and_update_async(PASSWORD, stored_hash)
+        if not valid:
+            raise RuntimeError("verificación fallida en el benchmark")
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+
+async def measure(rounds: int, seconds: float, concurrency: int) -> dict:
+    # contexto con `rounds` como factor configurado: el login mide solo el verify,
+    # sin el rehash que dispararía un hash por debajo de PBKDF2_ROUNDS
+    security.pwd_context = CryptContext(schemes=["pbkdf2_sha256"],
+                                        pbkdf2_sha256__default_rounds=rounds,
+                                        pbkdf2_sha256__min_rounds=rounds)
+    stored_hash = security.pwd_context.hash(PASSWORD)
+    # calentar el pool (crea los hilos) antes de medir
+    await security.verify_and_update_async(PASSWORD, stored_hash)
+
+    latencies: List[float] = []
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(_login_loop(stored_hash, deadline, latencies) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    cores = min(security.PASSWORD_HASH_WORKERS, os.cpu_count() or 1)
+    latencies.sort()
+    per_sec = len(latencies) / elapsed
+    return {
+        "logins": len(latencies),
+        "logins_s": round(per_sec, 1),
+        "logins_s_core": round(per_sec / cores, 1),
+        "p50_ms": round(statistics.median(latencies), 1),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 1),
+    }
+
+
+async def benchmark(rounds_list: List[int], seconds: float, concurrency: int):
+    print(f"workers={security.PASSWORD_HASH_WORKERS} cores={os.cpu_count()} "
+          f"concurrencia={concurrency} rondas configuradas={security.PBKDF2_ROUNDS}")
+    print(f"{'rondas':>10} {'logins':>8} {'logins/s':>10} {'/s/core':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for rounds in rounds_list:
+        r = await measure(rounds, seconds, concurrency)
+        print(f"{rounds:>10} {r['logins']:>8} {r['logins_s']:>10} {r['logins_s_core']:>10} "
+              f"{r['p50_ms']:>10} {r['p95_ms']:>10}")
+
+
+def main(argv: List[str]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", default=None,
+                        help="rondas a medir separadas por coma (por defecto PBKDF2_ROUNDS)")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=None,
+                        help="logins simultáneos (por defecto 2 × workers)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="hilos del pool (por defecto PASSWORD_HASH_WORKERS)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    if args.workers:
+        security.PASSWORD_HASH_WORKERS = args.workers
+    concurrency = args.concurrency or security.PASSWORD_HASH_WORKERS * 2
+    # el benchmark no debe chocar con el límite de operaciones en curso
+    security.PASSWORD_HASH_MAX_PENDING = max(security.PASSWORD_HASH_MAX_PENDING, concurrency)
+    rounds_list = [int(x) for x in args.rounds.split(",")] if args.rounds else [security.PBKDF2_ROUNDS]
+    try:
+        asyncio.run(benchmark(rounds_list, args.seconds, concurrency))
+    finally:
+        security.shutdown_hash_pool()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,230 @@
+import os
+import logging
+from pymongo import MongoClient
+import redis
+from neo4j import GraphDatabase
+import redis.asyncio as aioredis
+from motor.motor_asyncio import AsyncIOMotorClient
+from neo4j import AsyncGraphDatabase
+
+# ==============================
+# POOLS (configurables por env)
+# ==============================
+# Los clientes (sync y async) se crean una sola vez por proceso y comparten
+# su pool entre requests/repositorios. Tamaños por variable de entorno:
+#   MONGO_MAX_POOL_SIZE / MONGO_MIN_POOL_SIZE / MONGO_MAX_IDLE_TIME_MS
+#   REDIS_MAX_CONNECTIONS / REDIS_POOL_TIMEOUT_SECONDS
+#   NEO4J_MAX_POOL_SIZE / NEO4J_ACQUISITION_TIMEOUT_SECONDS
+def _mongo_pool_options() -> dict:
+    return {
+        "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+        "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+        "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000)),
+    }
+
+
+def _redis_pool_options() -> dict:
+    # BlockingConnectionPool: al agotarse el pool se espera `timeout` en vez de fallar
+    return {
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", 50)),
+        "timeout": float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", 5)),
+        "decode_responses": True,
+    }
+
+
+def _neo4j_pool_options() -> dict:
+    return {
+        "max_connection_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", 100)),
+        "connection_acquisition_timeout": float(os.getenv("NEO4J_ACQUISITION_TIMEOUT_SECONDS", 60)),
+    }
+
+
+def _neo4j_settings() -> tuple:
+    uri = os.getenv("NEO4J_URI", "bolt://neo4j:7687")
+    user = os.getenv("NEO4J_USER", "neo4j")
+    password = os.getenv("NEO4J_PASSWORD", "password")
+    return uri, (user, password)
+
+
+# ==============================
+# MONGODB
+# ==============================
+_mongo_client = None
+
+
+def get_mongo_db():
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = MongoClient(os.getenv("MONGO_URI"), **_mongo_pool_options())
+    return _mongo_client[os.getenv("MONGO_DATABASE", "tpo_database")]
+
+def probar_mongo():
+    """Prueba de conexión a MongoDB"""
+    try:
+        db = get_mongo_db()
+        db.command("ping")
+        print(f"🟢 Conectado a MongoDB → Base: {db.name}")
+        return db
+    except Exception as e:
+        print(f"❌ Error al conectar a MongoDB: {e}")
+        return None
+
+
+# ==============================
+# NEO4J
+# ==============================
+_neo4j_driver = None
+
+
+def get_neo4j_driver():
+    """
+    Devuelve el driver de Neo4j (compartido por proceso).
+    URI de ejemplo (Docker): bolt://neo4j:7687
+    """
+    global _neo4j_driver
+    if _neo4j_driver is None:
+        uri, auth = _neo4j_settings()
+        _neo4j_driver = GraphDatabase.driver(uri, auth=auth, **_neo4j_pool_options())
+    return _neo4j_driver
+
+def probar_neo4j():
+    """Prueba la conexión a Neo4j"""
+    try:
+        driver = get_neo4j_driver()
+        with driver.session() as session:
+            session.run("RETURN 1")
+        print("🕸️ Conectado correctamente a Neo4j.")
+        return driver
+    except Exception as e:
+        print(f"❌ Error al conectar a Neo4j: {e}")
+        return None
+
+
+# ==============================
+# REDIS
+# ==============================
+_redis_client = None
+
+
+def get_redis_client():
+    """
+    Devuelve el cliente Redis (compartido por proceso).
+    URI típica en Docker: redis://redis:6379/
+    """
+    global _redis_client
+    if _redis_client is None:
+        uri = os.getenv("REDIS_URI", "redis://redis:6379/")
+        pool = redis.BlockingConnectionPool.from_url(uri, **_redis_pool_options())
+        _redis_client = redis.Redis(connection_pool=pool)
+    return _redis_client
+
+def probar_redis():
+    """Prueba de conexión a Redis"""
+    try:
+        r = get_redis_client()
+        r.ping()
+        valor = r.get("saludo")
+        if valor:
+            print(f"⚡ Redis conectado. Valor guardado (saludo): {valor}")
+        else:
+            print("⚡ Redis conectado correctamente.")
+        return r
+    except Exception as e:
+        print(f"❌ Error al conectar a Redis: {e}")
+        return None
+
+
+# ==============================
+# INICIALIZACIÓN
+# ==============================
+def inicializar_conexiones():
+    """Llama a todas las funciones de prueba de conexión."""
+    print("\n--- Probando Conexiones a Bases de Datos ---")
+    probar_mongo()
+    probar_neo4j()
+    probar_redis()
+    print("--------------------------------------------\n")
+
+
+# ==============================
+# CLIENTES ASYNC (motor / redis.asyncio / neo4j AsyncDriver)
+# ==============================
+# Igual que los getters sync, los clientes async se crean una sola vez por
+# proceso: cada uno mantiene su propio pool y se comparte entre requests.
+_async_mongo_client = None
+_async_redis_client = None
+_async_neo4j_driver = None
+
+
+def get_async_mongo_db():
+    global _async_mongo_client
+    if _async_mongo_client is None:
+        _async_mongo_client = AsyncIOMotorClient(os.getenv("MONGO_URI"), **_mongo_pool_options())
+    return _async_mongo_client[os.getenv("MONGO_DATABASE", "tpo_database")]
+
+
+def get_async_redis_client():
+    global _async_redis_client
+    if _async_redis_client is None:
+        uri = os.getenv("REDIS_URI", "redis://redis:6379/")
+        pool = aioredis.BlockingConnectionPool.from_url(uri, **_redis_pool_options())
+        _async_redis_client = aioredis.Redis(connection_pool=pool)
+    return _async_redis_client
+
+
+def get_async_neo4j_driver():
+    global _async_neo4j_driver
+    if _async_neo4j_driver is None:
+        uri, auth = _neo4j_settings()
+        _async_neo4j_driver = AsyncGraphDatabase.driver(uri, auth=auth, **_neo4j_pool_options())
+    return _async_neo4j_driver
+
+
+async def calentar_conexiones_async():
+    """
+    Warm-up de los clientes async (usar en el startup de la app): abre las
+    primeras conexiones de cada pool para que el primer request no pague el
+    handshake. Un store caído se loguea y no impide arrancar.
+    """
+    checks = {
+        "MongoDB": lambda: get_async_mongo_db().command("ping"),
+        "Redis": lambda: get_async_redis_client().ping(),
+        "Neo4j": lambda: get_async_neo4j_driver().verify_connectivity(),
+    }
+    for name, check in checks.items():
+        try:
+            await check()
+            logging.info(f"🔥 Pool de {name} listo")
+        except Exception as e:
+            logging.warning(f"⚠️ Warm-up de {name} falló: {e}")
+
+
+async def cerrar_conexiones_async():
+    """Cierra los clientes async compartidos (usar en el shutdown de la app)."""
+    global _async_mongo_client, _async_redis_client, _async_neo4j_driver
+    if _async_mongo_client is not None:
+        _async_mongo_client.close()
+        _async_mongo_client = None
+    if _async_redis_client is not None:
+        # el pool se pasó explícitamente: aclose() no lo cierra solo
+        await _async_redis_client.aclose()
+        await _async_redis_client.connection_pool.disconnect()
+        _async_redis_client = None
+    if _async_neo4j_driver is not None:
+        await _async_neo4j_driver.close()
+        _async_neo4j_driver = None
+
+
+def cerrar_conexiones():
+    """Cierra los clientes sync compartidos (scripts/CLI y shutdown de la app)."""
+    global _mongo_client, _redis_client, _neo4j_driver
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
+    if _redis_client is not None:
+        _redis_client.close()
+        _redis_client.connection_pool.disconnect()
+        _redis_client = None
+    if _neo4j_driver is not None:
+        _neo4j_driver.close()
+        _neo4j_driver = None
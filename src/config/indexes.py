@@ -0,0 +1,140 @@
+# src/config/indexes.py
+"""
+Registro central de índices de MongoDB.
+
+- ensure_mongo_indexes(): crea (idempotente) todos los índices que usan las
+  consultas de los repositorios/servicios. Se llama en el startup de la app.
+- explain_query_shapes(): corre explain() sobre cada forma de consulta
+  registrada y reporta las que terminan en COLLSCAN.
+
+    python -m src.config.indexes            # crear índices
+    python -m src.config.indexes --explain  # crear índices + diagnóstico
+"""
+import sys
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+
+from src.config.database import get_async_mongo_db
+
+# ===============================================================
+# 📇 Índices requeridos por colección
+# ===============================================================
+MONGO_INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], unique=True),
+    ],
+    "people": [
+        IndexModel([("userId", ASCENDING)]),
+    ],
+    "applications": [
+        IndexModel([("person_id", ASCENDING)]),
+        IndexModel([("person_user_id", ASCENDING)]),
+        IndexModel([("job_id", ASCENDING)]),
+    ],
+    "companies": [
+        # filtro + orden del keyset (_id) de GET /companies
+        IndexModel([("created_by", ASCENDING), ("_id", ASCENDING)]),
+    ],
+    "courses": [
+        IndexModel([("slug", ASCENDING)], unique=True),
+        IndexModel([("skillsOtorgadas.nombre", ASCENDING)]),
+    ],
+    "enrollments": [
+        # el prefijo personId también cubre list_by_person
+        IndexModel([("personId", ASCENDING), ("courseId", ASCENDING)], unique=True),
+    ],
+    "outbox": [
+        IndexModel([("estado", ASCENDING), ("_id", ASCENDING)]),
+    ],
+}
+
+# ===============================================================
+# 🔎 Formas de consulta a verificar con explain()
+# (colección, filtro, sort) — los valores son de ejemplo, importa la forma
+# ===============================================================
+QUERY_SHAPES: List[tuple] = [
+    ("users", {"username": "diagnostico"}, None),
+    ("people", {"userId": "diagnostico"}, None),
+    ("applications", {"$or": [{"person_id": "diagnostico"}, {"person_user_id": "diagnostico"}]}, None),
+    ("applications", {"job_id": "diagnostico"}, None),
+    ("companies", {"created_by": "diagnostico"}, [("_id", ASCENDING)]),
+    ("courses", {"slug": "diagnostico"}, None),
+    ("courses", {"skillsOtorgadas.nombre": "diagnostico"}, None),
+    ("enrollments", {"personId": "diagnostico"}, None),
+    ("enrollments", {"personId": "diagnostico", "courseId": "diagnostico"}, None),
+    ("outbox", {"estado": "pendiente"}, [("_id", ASCENDING)]),
+]
+
+
+async def ensure_mongo_indexes(collections: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Crea los índices registrados (create_indexes es idempotente).
+    Un fallo en una colección (p. ej. duplicados que impiden un índice único)
+    se loguea y no impide crear el resto.
+    """
+    db = get_async_mongo_db()
+    created: Dict[str, List[str]] = {}
+    for name, indexes in MONGO_INDEXES.items():
+        if collections and name not in collections:
+            continue
+        try:
+            created[name] = await db[name].create_indexes(indexes)
+        except Exception as e:
+            logging.error(f"❌ No se pudieron crear los índices de '{name}': {e}")
+    logging.info(f"📇 Índices de MongoDB verificados: {created}")
+    return created
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """Recorre un plan de explain() y devuelve todos los stages."""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+async def explain_query_shapes() -> List[Dict[str, Any]]:
+    """
+    Corre explain() sobre cada forma de consulta registrada.
+    Devuelve un reporte por consulta y loguea un warning por cada COLLSCAN.
+    """
+    db = get_async_mongo_db()
+    report: List[Dict[str, Any]] = []
+    for name, query, sort in QUERY_SHAPES:
+        cursor = db[name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            plan = await cursor.explain()
+        except Exception as e:
+            logging.warning(f"⚠️ explain() falló para {name} {query}: {e}")
+            continue
+        stages = _plan_stages(plan.get("queryPlanner", {}).get("winningPlan", {}))
+        collscan = "COLLSCAN" in stages
+        report.append({"collection": name, "query": query, "stages": stages, "collscan": collscan})
+        if collscan:
+            logging.warning(f"🐢 COLLSCAN en {name}: {query}")
+    return report
+
+
+async def _main(argv: List[str]):
+    from dotenv import load_dotenv
+    load_dotenv()
+    await ensure_mongo_indexes()
+    if "--explain" in argv:
+        for row in await explain_query_shapes():
+            estado = "COLLSCAN" if row["collscan"] else "ok"
+            print(f"{estado:8} {row['collection']:13} {row['query']} → {' > '.join(row['stages'])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
@@ -0,0 +1,151 @@
+from src.config.database import get_async_mongo_db
+from src.repositories.mongo_repository import keyset_query
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from bson import ObjectId
+from pymongo import ReturnDocument
+from datetime import datetime
+
+
+class AsyncMongoRepository:
+    """
+    Contraparte async (motor) de MongoRepository. Misma interfaz, pero cada
+    operación es una corrutina y no bloquea el event loop.
+    Las escrituras aceptan `session` para participar de una transacción
+    (ver AsyncOutboxRepository.transaction).
+    """
+
+    def __init__(self, collection_name: str):
+        # 🔗 Cliente motor compartido (ver config/database.py)
+        db = get_async_mongo_db()
+        self.col = db[collection_name]
+
+    @staticmethod
+    def _stringify_id(doc: Dict[str, Any]) -> Dict[str, Any]:
+        if not doc:
+            return doc
+        if "_id" in doc and isinstance(doc["_id"], ObjectId):
+            doc["_id"] = str(doc["_id"])
+        return doc
+
+    async def create(self, data: Dict[str, Any], session=None) -> Dict[str, Any]:
+        # timestamps por defecto
+        now = datetime.utcnow()
+        data.setdefault("versionActual", 1)
+        data.setdefault("creadoEn", now)
+        data.setdefault("actualizadoEn", now)
+
+        # 👇 Si vino _id, upsert con ese _id (conversión a ObjectId si corresponde)
+        _id = data.get("_id")
+        if _id is not None:
+            if isinstance(_id, str) and len(_id) == 24:
+                try:
+                    _id = ObjectId(_id)
+                    data["_id"] = _id
+                except Exception:
+                    pass
+
+            await self.col.replace_one({"_id": _id}, data, upsert=True, session=session)
+            # el documento guardado es exactamente `data`: no hace falta releerlo
+            return self._stringify_id(dict(data))
+
+        # 👇 Sin _id → insert normal (insert_one completa data["_id"])
+        await self.col.insert_one(data, session=session)
+        return self._stringify_id(dict(data))
+
+    async def find_one(self, _id: str, session=None) -> Optional[Dict[str, Any]]:
+        doc = await self.col.find_one({"_id": ObjectId(_id)}, session=session)
+        return self._stringify_id(doc) if doc else None
+
+    async def find(self, query: Dict[str, Any], limit: Optional[int] = None,
+                   sort: Optional[List[Tuple[str, int]]] = None,
+                   projection: Optional[Dict[str, Any]] = None,
+                   after: Optional[str] = None, sort_field: str = "_id",
+                   skip: int = 0) -> List[Dict[str, Any]]:
+        """
+        Busca documentos. Sin parámetros extra se comporta como antes.
+        - limit/skip/projection/sort: se pasan al cursor de Mongo
+        - after: bookmark de keyset (ver mongo_repository.keyset_query); ordena por sort_field
+        """
+        if after and sort:
+            raise ValueError("after (keyset) no se combina con sort: el orden lo fija sort_field")
+        if after or (limit and not sort):
+            query, sort = keyset_query(query, after, sort_field)
+        cursor = self.col.find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [self._stringify_id(d) async for d in cursor]
+
+    async def stream(self, query: Dict[str, Any], projection: Optional[Dict[str, Any]] = None,
+                     batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Itera el cursor sin materializarlo: memoria constante sin importar el tamaño
+        de la colección. batch_size = documentos por round trip a Mongo.
+        """
+        cursor = self.col.find(query, projection).sort("_id", 1).batch_size(batch_size)
+        async for doc in cursor:
+            yield self._stringify_id(doc)
+
+    async def update_by_id(self, _id: str, change: Dict[str, Any], return_doc: bool = True,
+                           extra_filter: Optional[Dict[str, Any]] = None, session=None) -> Any:
+        """
+        Aplica un update con operadores ($set/$push/$addToSet...) en un round trip.
+        `extra_filter` condiciona el update (p. ej. evitar duplicados en un arreglo).
+        Devuelve el documento resultante, o matched_count con return_doc=False.
+        """
+        filtro = {"_id": ObjectId(_id), **(extra_filter or {})}
+        if not return_doc:
+            res = await self.col.update_one(filtro, change, session=session)
+            return res.matched_count
+        doc = await self.col.find_one_and_update(filtro, change, return_document=ReturnDocument.AFTER,
+                                                 session=session)
+        return self._stringify_id(doc)
+
+    async def update(self, _id: str, updates: Dict[str, Any], return_doc: bool = True, session=None) -> Any:
+        """
+        $set de `updates` en un solo round trip (find_one_and_update, AFTER).
+        Con return_doc=False no se transfiere el documento: devuelve matched_count.
+        """
+        updates["actualizadoEn"] = datetime.utcnow()
+        if not return_doc:
+            res = await self.col.update_one({"_id": ObjectId(_id)}, {"$set": updates}, session=session)
+            return res.matched_count
+        doc = await self.col.find_one_and_update(
+            {"_id": ObjectId(_id)}, {"$set": updates}, return_document=ReturnDocument.AFTER, session=session
+        )
+        return self._stringify_id(doc)
+
+    async def delete(self, _id: str, session=None) -> int:
+        """
+        Elimina un documento por _id. Devuelve deleted_count (0 o 1).
+        """
+        try:
+            filtro = {"_id": ObjectId(_id)}
+        except Exception:
+            filtro = {"_id": _id}
+        res = await self.col.delete_one(filtro, session=session)
+        return getattr(res, "deleted_count", 0)
+
+    async def add_to_array(self, _id: str, field: str, value: Any, return_doc: bool = True,
+                           session=None) -> Any:
+        """
+        Agrega un elemento a un arreglo en el documento identificado por _id.
+        Devuelve el documento actualizado (stringificando _id) o None si no existe;
+        con return_doc=False devuelve matched_count.
+        """
+        updates = {"actualizadoEn": datetime.utcnow()}
+        try:
+            filtro = {"_id": ObjectId(_id)}
+        except Exception:
+            filtro = {"_id": _id}
+        change = {"$push": {field: value}, "$set": updates}
+
+        if not return_doc:
+            res = await self.col.update_one(filtro, change, session=session)
+            return res.matched_count
+        doc = await self.col.find_one_and_update(filtro, change, return_document=ReturnDocument.AFTER,
+                                                 session=session)
+        return self._stringify_id(doc) if doc else None
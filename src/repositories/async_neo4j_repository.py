@@ -0,0 +1,873 @@
+import copy
+import logging
+from contextlib import asynccontextmanager
+from src.config.database import get_async_neo4j_driver
+from src.repositories.neo4j_repository import (
+    GRAPH_SCHEMA, EXPLAIN_CHECKS, JOB_RECOMMENDATIONS_QUERY, JOB_CANDIDATES_QUERY, SUGGESTED_CONNECTIONS_QUERY,
+    check_plan, relationship_query, labelled_relationship_query, labelled_delete_query, _normalize_rel,
+)
+
+# Configuración global de logs
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class _TxSession:
+    """Sesión que delega `run`/`execute_write` en una transacción explícita ya abierta."""
+
+    def __init__(self, tx):
+        self._tx = tx
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query, parameters=None, **kwargs):
+        return await self._tx.run(query, parameters, **kwargs)
+
+    async def execute_write(self, work, *args, **kwargs):
+        return await work(self._tx, *args, **kwargs)
+
+
+class _TxDriver:
+    """Driver mínimo: cada `session()` reutiliza la misma transacción."""
+
+    def __init__(self, tx):
+        self._tx = tx
+
+    def session(self, **kwargs):
+        return _TxSession(self._tx)
+
+
+class AsyncNeo4jRepository:
+    """
+    Contraparte async (neo4j AsyncDriver) de Neo4jRepository.
+    Mismas consultas Cypher; cada método es una corrutina.
+    """
+
+    def __init__(self):
+        self.driver = get_async_neo4j_driver()
+
+    @asynccontextmanager
+    async def batch(self):
+        """
+        Vista del repositorio cuyos métodos escriben todos en UNA transacción:
+
+            async with graph.batch() as tx_graph:
+                await tx_graph.create_job_node(...)
+                await tx_graph.link_job_to_skills(...)
+
+        Commit al salir del bloque; rollback si algo falla.
+        """
+        async with self.driver.session() as session:
+            tx = await session.begin_transaction()
+            view = copy.copy(self)
+            view.driver = _TxDriver(tx)
+            try:
+                yield view
+                await tx.commit()
+            except BaseException:
+                if not tx.closed():
+                    await tx.rollback()
+                raise
+
+    # ===============================================================
+    # 🗂️ Esquema: constraints + verificación de planes
+    # ===============================================================
+    async def ensure_schema(self):
+        """Crea las constraints de GRAPH_SCHEMA (idempotente: IF NOT EXISTS)."""
+        async with self.driver.session() as session:
+            for statement in GRAPH_SCHEMA:
+                try:
+                    result = await session.run(statement)
+                    await result.consume()
+                except Exception as e:
+                    # p. ej. nodos duplicados previos impiden crear la constraint
+                    logging.error(f"❌ No se pudo aplicar '{statement}': {e}")
+        logging.info("🗂️ Esquema de Neo4j verificado")
+
+    async def explain_lookups(self) -> list[dict]:
+        """Corre EXPLAIN sobre EXPLAIN_CHECKS e informa si usan index seeks."""
+        report = []
+        async with self.driver.session() as session:
+            for name, (query, params) in EXPLAIN_CHECKS.items():
+                result = await session.run("EXPLAIN " + query, **params)
+                summary = await result.consume()
+                report.append(check_plan(name, summary.plan))
+        return report
+
+    # ===============================================================
+    # 👤 Crear nodo Person y vincular habilidades
+    # ===============================================================
+    async def create_person_node(self, person_id: str, nombre: str, rol: str):
+        """
+        Crea (si no existe) el nodo de Persona en Neo4j.
+        El id es único, pero establecemos nombre y rol inmediatamente.
+        """
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MERGE (p:Person {id: $pid})
+                ON CREATE SET p.nombre = $nombre, p.rol = $rol
+                ON MATCH SET p.nombre = $nombre, p.rol = $rol
+                """,
+                pid=person_id,
+                nombre=nombre,
+                rol=rol
+            )
+            await result.consume()
+
+    async def link_person_to_skill(self, person_id: str, skill_name: str, nivel: int = 1):
+        """
+        Crea un nodo Skill si no existe y vincula la persona con un nivel.
+        Ejemplo: (p)-[:POSEE_HABILIDAD {nivel: 4}]->(s)
+        """
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MERGE (s:Skill {nombre: $skill})
+                WITH s
+                MATCH (p:Person {id: $pid})
+                MERGE (p)-[r:POSEE_HABILIDAD]->(s)
+                SET r.nivel = $nivel
+                """,
+                pid=person_id,
+                skill=skill_name,
+                nivel=nivel
+            )
+            await result.consume()
+            print(f"🔗 Vinculada habilidad '{skill_name}' (nivel {nivel}) con persona {person_id}")
+
+    async def link_person_to_skills(self, person_id: str, skills: list[dict], replace: bool = False):
+        """
+        Vincula varias habilidades a una persona en una sola sentencia (UNWIND).
+        skills = [{"nombre": "Python", "nivel": 5}, ...]
+        Si replace=True, primero elimina las relaciones POSEE_HABILIDAD previas
+        dentro de la misma transacción.
+        """
+        query = """
+        MATCH (p:Person {id: $pid})
+        OPTIONAL MATCH (p)-[old:POSEE_HABILIDAD]->(:Skill)
+        WITH p, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH p
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre: skill.nombre})
+        MERGE (p)-[r:POSEE_HABILIDAD]->(s)
+        SET r.nivel = skill.nivel
+        """
+        async with self.driver.session() as session:
+            result = await session.run(query, pid=person_id, skills=skills, replace=replace)
+            await result.consume()
+        logging.info(f"🔗 Vinculadas {len(skills)} habilidades con persona {person_id} (replace={replace})")
+
+    async def upsert_person_graph(self, person_id: str, nombre: str | None, rol: str | None,
+                                  skills: list[dict], replace_skills: bool = False):
+        """
+        Proyecta una persona completa en una sola transacción de escritura:
+        MERGE del nodo Person (nombre/rol), borrado opcional de POSEE_HABILIDAD
+        previas y vinculación de `skills` ([{"nombre", "nivel"}]) con UNWIND.
+        Si nombre/rol vienen en None se conservan los valores actuales del nodo.
+        """
+        query = """
+        MERGE (p:Person {id: $pid})
+        SET p.nombre = coalesce($nombre, p.nombre, 'Desconocido'),
+            p.rol = coalesce($rol, p.rol, 'Sin Rol')
+        WITH p
+        OPTIONAL MATCH (p)-[old:POSEE_HABILIDAD]->(:Skill)
+        WITH p, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH p
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre: skill.nombre})
+        MERGE (p)-[r:POSEE_HABILIDAD]->(s)
+        SET r.nivel = skill.nivel
+        """
+
+        async def _write(tx):
+            result = await tx.run(query, pid=person_id, nombre=nombre, rol=rol,
+                                  skills=skills, replace=replace_skills)
+            await result.consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(_write)
+        logging.info(f"👤 Persona {person_id} sincronizada en Neo4j ({len(skills)} skills, replace={replace_skills})")
+
+    async def delete_person_skills(self, person_id: str):
+        """
+        Elimina todas las relaciones POSEE_HABILIDAD de una persona.
+        """
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MATCH (p:Person {id: $pid})-[r:POSEE_HABILIDAD]->(s)
+                DELETE r
+                """,
+                pid=person_id
+            )
+            await result.consume()
+            logging.info(f"🧹 Eliminadas relaciones POSEE_HABILIDAD para persona {person_id}")
+
+
+
+    # ===============================================================
+    # 🔗 CONEXIÓN UNIDIRECCIONAL
+    # ===============================================================
+    async def create_connection_one_way(self, source_id: str, target_id: str, tipo: str = "SIGUE_A"):
+        """
+        Crea una relación unidireccional del tipo especificado.
+        Ejemplo: (A)-[:SIGUE_A]->(B)
+        """
+        rel_type = tipo.upper().replace(" ", "_")  # ej: "mentorship" -> "MENTORSHIP"
+        logging.info(f"➡️ Creando conexión unidireccional: {source_id} -[{rel_type}]-> {target_id}")
+
+        query = f"""
+        MATCH (a:Person {{id: $src}}), (b:Person {{id: $tgt}})
+        MERGE (a)-[r:{rel_type}]->(b)
+        RETURN COUNT(r) AS total
+        """
+
+        async with self.driver.session() as session:
+            result = await session.run(query, src=source_id, tgt=target_id)
+            data = await result.single()
+            count = data["total"] if data else 0
+            logging.info(f"✅ Conexión {rel_type} creada. Total relaciones: {count}")
+
+    # ===============================================================
+    # 🔁 CONEXIÓN BIDIRECCIONAL
+    # ===============================================================
+    async def create_connection_two_way(self, source_id: str, target_id: str, tipo: str = "COLABORA_CON"):
+        """
+        Crea relaciones bidireccionales entre dos personas.
+        Ejemplo: (A)-[:COLABORA_CON]->(B) y (B)-[:COLABORA_CON]->(A)
+        """
+        rel_type = tipo.upper().replace(" ", "_")
+        logging.info(f"🔁 Creando conexión bidireccional: {source_id} <-> {target_id} ({rel_type})")
+
+        query = f"""
+        MATCH (a:Person {{id: $src}}), (b:Person {{id: $tgt}})
+        MERGE (a)-[r:{rel_type}]->(b)
+        MERGE (b)-[r2:{rel_type}]->(a)
+        RETURN COUNT(r) AS total
+        """
+
+        async with self.driver.session() as session:
+            result = await session.run(query, src=source_id, tgt=target_id)
+            data = await result.single()
+            count = data["total"] if data else 0
+            logging.info(f"✅ Conexión bidireccional {rel_type} creada. Total relaciones: {count}")
+
+    # ===============================================================
+    # 🌐 OBTENER RED DE CONEXIONES (con tipo)
+    # ===============================================================
+    async def get_network(self, person_id: str):
+        """
+        Devuelve las conexiones salientes con su tipo.
+        Ejemplo de salida:
+        [
+          {"targetId": "2", "nombre": "Jochi", "rol": "Developer", "tipo": "MENTORSHIP"},
+          {"targetId": "3", "nombre": "Lucas", "rol": "Analyst", "tipo": "COLABORA_CON"}
+        ]
+        """
+        query = """
+        MATCH (p:Person {id: $id})-[r]->(otro:Person)
+        RETURN otro.id AS targetId, otro.nombre AS nombre, otro.rol AS rol, type(r) AS tipo
+        """
+        async with self.driver.session() as session:
+            result = await session.run(query, id=person_id)
+            data = [dict(r) async for r in result]
+            logging.info(f"🌐 {len(data)} conexiones encontradas para {person_id}")
+            return data
+
+    # ===============================================================
+    # 💡 OBTENER RECOMENDACIONES (ejemplo futuro)
+    # ===============================================================
+    async def get_recommendations(self, person_id: str):
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MATCH (p:Person {id: $id})-[:POSEE_HABILIDAD]->(h:Habilidad)<-[:REQUERIMIENTO_DE]-(e:Empleo)
+                RETURN e.id AS empleoId, e.titulo AS titulo, COUNT(h) AS afinidad
+                ORDER BY afinidad DESC
+                LIMIT 5
+                """,
+                id=person_id
+            )
+            return [dict(r) async for r in result]
+
+    async def get_common_connections(self, person_id: str, other_id: str):
+        """
+        Devuelve las personas que están conectadas tanto con `person_id` como con `other_id`.
+        Ejemplo: (A)-[]->(C)<-[]-(B)
+        """
+        query = """
+        MATCH (a:Person {id: $id1})-[]->(common:Person)<-[]-(b:Person {id: $id2})
+        RETURN DISTINCT common.id AS id, common.nombre AS nombre, common.rol AS rol
+        """
+        async with self.driver.session() as session:
+            result = await session.run(query, id1=person_id, id2=other_id)
+            return [dict(r) async for r in result]
+    async def get_suggested_connections(self, person_id: str):
+        """
+        Devuelve personas sugeridas que no están conectadas directamente,
+        pero comparten al menos una conexión en común.
+        Ordenadas por relevancia (cantidad de amigos en común).
+        """
+        query = SUGGESTED_CONNECTIONS_QUERY
+        async with self.driver.session() as session:
+            result = await session.run(query, id=person_id)
+            return [dict(r) async for r in result]
+        
+
+    async def delete_connection(self, source_id: str, target_id: str, tipo: str = None):
+        """
+        Elimina una conexión (o todas) entre dos personas.
+        Si se pasa un tipo, borra solo esa relación.
+        Ejemplo:
+          - delete_connection(A, B) -> borra todas las relaciones A↔B
+          - delete_connection(A, B, "MENTORSHIP") -> borra solo las de ese tipo
+        """
+        try:
+            if tipo:
+                rel_type = tipo.upper().replace(" ", "_")
+                query = f"""
+                MATCH (a:Person {{id: $src}})-[r:{rel_type}]-(b:Person {{id: $tgt}})
+                DELETE r
+                RETURN COUNT(r) AS eliminadas
+                """
+            else:
+                query = """
+                MATCH (a:Person {id: $src})-[r]-(b:Person {id: $tgt})
+                DELETE r
+                RETURN COUNT(r) AS eliminadas
+                """
+
+            async with self.driver.session() as session:
+                result = await session.run(query, src=source_id, tgt=target_id)
+                data = await result.single()
+                count = data["eliminadas"] if data else 0
+
+                logging.info(f"🗑️ Eliminadas {count} relaciones entre {source_id} y {target_id}")
+                return count
+
+        except Exception as e:
+            logging.error(f"❌ Error eliminando conexión: {e}")
+            raise
+    
+    # ===============================================================
+    # 🔁 Métodos genéricos para crear/borrar relaciones entre nodos por id
+    # ===============================================================
+    async def create_relationship(self, source_id: str, target_id: str, rel_type: str):
+        """
+        Crea una relación del tipo `rel_type` entre dos nodos identificados por su propiedad id.
+        rel_type se normaliza a mayúsculas y sin espacios.
+        """
+        rel = rel_type.upper().replace(" ", "_")
+        logging.info(f"➡️ Creando relación {rel} entre {source_id} -> {target_id}")
+        query = relationship_query(rel)
+        async with self.driver.session() as session:
+            result = await session.run(query, src=source_id, tgt=target_id)
+            data = await result.single()
+            count = data["total"] if data else 0
+            logging.info(f"✅ Relación {rel} creada. Total: {count}")
+            return count
+
+    async def delete_relationship(self, source_id: str, target_id: str, rel_type: str | None = None):
+        """
+        Elimina relaciones entre dos nodos. Si `rel_type` es None, elimina todas las relaciones
+        entre los dos nodos; si se especifica rel_type, elimina solo las de ese tipo.
+        """
+        try:
+            if rel_type:
+                rel = rel_type.upper().replace(" ", "_")
+                query = f"""
+                MATCH (a {{id: $src}})-[r:{rel}]-(b {{id: $tgt}})
+                DELETE r
+                RETURN COUNT(r) AS eliminadas
+                """
+            else:
+                query = """
+                MATCH (a {id: $src})-[r]-(b {id: $tgt})
+                DELETE r
+                RETURN COUNT(r) AS eliminadas
+                """
+
+            async with self.driver.session() as session:
+                result = await session.run(query, src=source_id, tgt=target_id)
+                data = await result.single()
+                count = data["eliminadas"] if data else 0
+                logging.info(f"🗑️ Eliminadas {count} relaciones entre {source_id} y {target_id}")
+                return count
+        except Exception as e:
+            logging.error(f"❌ Error eliminando relación genérica: {e}")
+            raise
+
+    # ===============================================================
+    # 🏷️ Variantes con etiqueta (index seek por id; tipos en RELATIONSHIP_TYPES)
+    # ===============================================================
+    async def create_labelled_relationship(self, src_label: str, source_id: str,
+                                           tgt_label: str, target_id: str, rel_type: str):
+        """
+        Crea (MERGE) la relación (src_label)-[rel_type]->(tgt_label).
+        Ej.: create_labelled_relationship("Person", pid, "Job", jid, "OFERTA_DE")
+        """
+        rel = _normalize_rel(rel_type)
+        query = labelled_relationship_query(src_label, tgt_label, rel)
+        async with self.driver.session() as session:
+            result = await session.run(query, src=source_id, tgt=target_id)
+            data = await result.single()
+            count = data["total"] if data else 0
+            logging.info(f"✅ Relación {rel} ({src_label})->({tgt_label}) {source_id} -> {target_id}: {count}")
+            return count
+
+    async def delete_labelled_relationship(self, src_label: str, source_id: str,
+                                           tgt_label: str, target_id: str, rel_type: str | None = None):
+        """Elimina `rel_type` (o todas si es None) entre los dos nodos etiquetados."""
+        rel = _normalize_rel(rel_type) if rel_type else None
+        query = labelled_delete_query(src_label, tgt_label, rel)
+        async with self.driver.session() as session:
+            result = await session.run(query, src=source_id, tgt=target_id)
+            data = await result.single()
+            count = data["eliminadas"] if data else 0
+            logging.info(f"🗑️ Eliminadas {count} relaciones ({src_label})-({tgt_label}) entre {source_id} y {target_id}")
+            return count
+
+    async def set_application_state(self, person_id: str, job_id: str, rel_type: str,
+                                    company_id: str | None = None):
+        """
+        Cambio de estado de una postulación en una sola transacción:
+        borra las relaciones previas Person–Job, crea `rel_type` y, si viene
+        company_id (contratado), el vínculo laboral Person-[:TRABAJA_EN]->Company.
+        """
+        rel = _normalize_rel(rel_type)
+        delete_query = labelled_delete_query("Person", "Job")
+        create_query = labelled_relationship_query("Person", "Job", rel)
+
+        async def _write(tx):
+            await (await tx.run(delete_query, src=person_id, tgt=job_id)).consume()
+            await (await tx.run(create_query, src=person_id, tgt=job_id)).consume()
+            if company_id:
+                company_query = labelled_relationship_query("Person", "Company", "TRABAJA_EN")
+                await (await tx.run(company_query, src=person_id, tgt=company_id)).consume()
+
+        async with self.driver.session() as session:
+            await session.execute_write(_write)
+        logging.info(f"🔁 Postulación {person_id} -> {job_id} ahora {rel}")
+
+    # ===============================================================
+    # 🏢 CREAR NODO COMPANY
+    # ===============================================================
+    async def create_company_node(self, company_id: str, nombre: str, industria: str):
+        """
+        Crea (o actualiza) un nodo Company en Neo4j.
+        """
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MERGE (c:Company {id: $id})
+                SET c.nombre = $nombre, c.industria = $industria
+                """,
+                id=company_id,
+                nombre=nombre,
+                industria=industria,
+            )
+            await result.consume()
+        logging.info(f"🏢 Nodo Company creado o actualizado: {nombre} ({industria})")
+
+    # ===============================================================
+    # 🤝 RELACIÓN PERSONA ↔ COMPANY
+    # ===============================================================
+    async def link_person_to_company(self, person_id: str, company_id: str, role: str = "TRABAJA_EN"):
+        """
+        Crea una relación (Person)-[:TRABAJA_EN]->(Company).
+        """
+        rel_type = role.upper().replace(" ", "_")
+        logging.info(f"🧩 Vinculando persona {person_id} con empresa {company_id} ({rel_type})")
+
+        query = f"""
+        MATCH (p:Person {{id: $pid}}), (c:Company {{id: $cid}})
+        MERGE (p)-[r:{rel_type}]->(c)
+        RETURN COUNT(r) AS total
+        """
+
+        async with self.driver.session() as session:
+            res = await session.run(query, pid=person_id, cid=company_id)
+            total = (await res.single())["total"]
+            logging.info(f"✅ Relación {rel_type} creada. Total relaciones: {total}")
+
+    # ===============================================================
+    # 🧩 RELACIÓN ENTRE EMPRESAS
+    # ===============================================================
+    async def link_company_to_company(self, company_a: str, company_b: str, tipo: str = "PARTNER_DE"):
+        """
+        Crea una relación entre empresas (CompanyA)-[:PARTNER_DE]->(CompanyB)
+        """
+        rel_type = tipo.upper().replace(" ", "_")
+        logging.info(f"🏗️ Vinculando empresas {company_a} -[{rel_type}]-> {company_b}")
+
+        query = f"""
+        MATCH (a:Company {{id: $a}}), (b:Company {{id: $b}})
+        MERGE (a)-[r:{rel_type}]->(b)
+        RETURN COUNT(r) AS total
+        """
+
+        async with self.driver.session() as session:
+            res = await session.run(query, a=company_a, b=company_b)
+            total = (await res.single())["total"]
+            logging.info(f"✅ Relación {rel_type} creada entre empresas. Total: {total}")
+            
+    async def delete_node_by_id(self, node_id: str, label: str = "Company"):
+        async with self.driver.session() as session:
+            result = await session.run(f"MATCH (n:{label} {{id: $id}}) DETACH DELETE n", id=node_id)
+            await result.consume()
+            logging.info(f"🗑️ Nodo {label} eliminado: {node_id}")
+
+    # ===============================================================
+    # 💼 CREAR NODO JOB
+    # ===============================================================
+    async def create_job_node(self, job_id: str, titulo: str, empresa_id: str):
+        """
+        Crea un nodo Job y lo conecta con la empresa que lo publica.
+        """
+        # Usar MERGE para crear/actualizar el nodo Job; también asegurar
+        # que exista (o se cree) el nodo Company para poder conectar.
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MERGE (j:Job {id: $id})
+                SET j.titulo = $titulo
+                WITH j
+                MERGE (e:Company {id: $empresa_id})
+                MERGE (e)-[:PUBLICA]->(j)
+                """,
+                id=job_id,
+                titulo=titulo,
+                empresa_id=empresa_id
+            )
+            await result.consume()
+        logging.info(f"💼 Nodo Job creado/actualizado: {job_id} - {titulo}")
+
+    async def node_exists(self, label: str, node_id: str) -> bool:
+        """
+        Comprueba si existe un nodo con la etiqueta `label` y la propiedad id == node_id.
+        """
+        query = f"MATCH (n:{label} {{id: $id}}) RETURN COUNT(n) AS cnt"
+        async with self.driver.session() as session:
+            result = await session.run(query, id=node_id)
+            data = await result.single()
+            cnt = data["cnt"] if data and "cnt" in data else 0
+            return bool(cnt)
+
+    # ===============================================================
+    # 🧍 PERSONA POSTULA A JOB
+    # ===============================================================
+    async def apply_to_job(self, person_id: str, job_id: str):
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MATCH (p:Person {id: $pid}), (j:Job {id: $jid})
+                MERGE (p)-[:POSTULA_A]->(j)
+                """,
+                pid=person_id,
+                jid=job_id
+            )
+            await result.consume()
+
+    async def get_applicants_for_job(self, job_id: str):
+        """
+        Devuelve todas las personas que postularon a un Job.
+        """
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MATCH (p:Person)-[:POSTULA_A]->(j:Job {id: $jid})
+                RETURN p.id AS personId, p.nombre AS nombre, p.rol AS rol
+                """,
+                jid=job_id
+            )
+            return [dict(r) async for r in result]
+
+    # ===============================================================
+    # 🧭 OBTENER EMPLEOS A LOS QUE UNA PERSONA SE POSTULÓ
+    # ===============================================================
+    async def get_jobs_for_person(self, person_id: str):
+        """
+        Devuelve todos los empleos a los que una persona se postuló.
+        """
+        async with self.driver.session() as session:
+            result = await session.run(
+                """
+                MATCH (p:Person {id: $pid})-[:POSTULA_A]->(j:Job)
+                OPTIONAL MATCH (e:Company)-[:PUBLICA]->(j)
+                RETURN 
+                    j.id AS jobId,
+                    j.titulo AS titulo,
+                    j.descripcion AS descripcion,
+                    e.id AS empresaId,
+                    e.nombre AS empresaNombre
+                """,
+                pid=person_id
+            )
+            return [dict(r) async for r in result]
+
+    # ===============================================================
+    # 🧩 VINCULAR JOB A SKILLS (obligatorias o deseables)
+    # ===============================================================
+    async def link_job_to_skill(self, job_id: str, skill_name: str, tipo: str):
+        """
+        Crea o vincula una habilidad al Job según tipo de requisito.
+        tipo puede ser: 'REQUERIMIENTO_DE' o 'DESEA'
+        """
+        async with self.driver.session() as session:
+            result = await session.run(
+                f"""
+                MATCH (j:Job {{id: $job_id}})
+                MERGE (s:Skill {{nombre: $skill}})
+                MERGE (j)-[r:{tipo}]->(s)
+                """,
+                job_id=job_id,
+                skill=skill_name
+            )
+            await result.consume()
+
+    async def link_job_to_skills(self, job_id: str, obligatorios: list[str], deseables: list[str],
+                                 replace: bool = False):
+        """
+        Vincula todas las skills de un Job en una sola sentencia (UNWIND).
+        Los obligatorios se vinculan con REQUERIMIENTO_DE y los deseables con DESEA.
+        Si replace=True, primero elimina las relaciones previas dentro de la misma transacción.
+        """
+        skills = [{"nombre": s, "tipo": "REQUERIMIENTO_DE"} for s in obligatorios] + \
+                 [{"nombre": s, "tipo": "DESEA"} for s in deseables]
+        query = """
+        MATCH (j:Job {id: $jid})
+        OPTIONAL MATCH (j)-[old]->(:Skill)
+        WITH j, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH j
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre: skill.nombre})
+        FOREACH (_ IN CASE WHEN skill.tipo = 'REQUERIMIENTO_DE' THEN [1] ELSE [] END |
+            MERGE (j)-[:REQUERIMIENTO_DE]->(s))
+        FOREACH (_ IN CASE WHEN skill.tipo = 'DESEA' THEN [1] ELSE [] END |
+            MERGE (j)-[:DESEA]->(s))
+        """
+        async with self.driver.session() as session:
+            result = await session.run(query, jid=job_id, skills=skills, replace=replace)
+            await result.consume()
+        logging.info(f"🔗 Vinculadas {len(skills)} skills con job {job_id} (replace={replace})")
+
+    async def delete_job_skill_links(self, job_id: str):
+        """
+        Elimina las relaciones REQUERIMIENTO_DE / DESEA entre un job y sus skills.
+        """
+        q = "MATCH (:Job {id:$jid})-[r]->(:Skill) DELETE r"
+        async with self.driver.session() as session:
+            result = await session.run(q, jid=job_id)
+            await result.consume()
+        logging.info(f"🔗 Relaciones de skills eliminadas para job {job_id}")
+
+
+    async def get_job_recommendations(self, person_id: str, limit: int = 10):
+        """
+        Devuelve empleos compatibles con una persona según sus habilidades y nivel.
+        Soporta relaciones:
+          - (:Job)-[:REQUERIMIENTO_DE]->(:Skill)
+          - (:Job)-[:DESEA]->(:Skill)
+          - (:Person)-[:POSEE_HABILIDAD]->(:Skill)
+        Además devuelve las habilidades coincidentes.
+        """
+        query = JOB_RECOMMENDATIONS_QUERY
+        async with self.driver.session() as session:
+            result = await session.run(query, pid=person_id, limit=limit)
+            return [record.data() async for record in result]
+    
+    async def get_job_candidates(self, job_id: str, limit: int = 10):
+        """
+        Personas con afinidad hacia un empleo (misma fórmula que
+        get_job_recommendations, recorrida desde el Job), por score.
+        """
+        async with self.driver.session() as session:
+            result = await session.run(JOB_CANDIDATES_QUERY, jid=job_id, limit=limit)
+            return [record.data() async for record in result]
+
+    async def get_person_skills(self, person_id: str):
+        """
+        Devuelve todas las habilidades de una persona con su nivel.
+        Ejemplo:
+        [
+          {"nombre": "Python", "nivel": 5},
+          {"nombre": "Pytorch", "nivel": 4}
+        ]
+        """
+        query = """
+        MATCH (p:Person {id: $pid})-[r:POSEE_HABILIDAD]->(s:Skill)
+        RETURN s.nombre AS nombre, r.nivel AS nivel
+        ORDER BY r.nivel DESC
+        """
+        async with self.driver.session() as session:
+            result = await session.run(query, pid=person_id)
+            return [dict(r) async for r in result]
+
+    async def get_people_by_skill(self, skill_name: str, min_level: int = 1):
+        """
+        Devuelve todas las personas que poseen una habilidad (≥ nivel indicado).
+        Ejemplo:
+        [
+          {"personId": "68fab69cb39d7b7931f7ab12", "nombre": "Carla Gómez", "rol": "Data Scientist", "nivel": 5},
+          {"personId": "68fab69cb39d7b7931f7ab13", "nombre": "Rodrigo Alcaraz", "rol": "Backend Dev", "nivel": 3}
+        ]
+        """
+        query = """
+        MATCH (p:Person)-[r:POSEE_HABILIDAD]->(s:Skill {nombre: $skill})
+        WHERE r.nivel >= $min_level
+        RETURN p.id AS personId, p.nombre AS nombre, p.rol AS rol, r.nivel AS nivel
+        ORDER BY r.nivel DESC
+        """
+        async with self.driver.session() as session:
+            result = await session.run(query, skill=skill_name, min_level=min_level)
+            return [dict(r) async for r in result]
+
+
+    # ===============================================================
+    # 📚 MÉTODOS DE CURSOS (sin lambda, sin execute_write)
+    # ===============================================================
+
+    async def create_course_node(self, course_id: str, titulo: str, proveedor: str | None = None):
+        q = """
+        MERGE (c:Course {id:$id})
+        SET c.titulo=$titulo, c.proveedor=$proveedor
+        """
+        async with self.driver.session() as session:
+            result = await session.run(q, id=course_id, titulo=titulo, proveedor=proveedor)
+            await result.consume()
+
+    async def link_course_to_skill(self, course_id: str, skill_name: str, nivelMin: int | None = None):
+        q = """
+        MATCH (c:Course {id:$cid})
+        MERGE (s:Skill {nombre:$sname})
+        MERGE (c)-[r:ENSEÑA]->(s)
+        SET r.nivelMin=$nivelMin
+        """
+        async with self.driver.session() as session:
+            result = await session.run(q, cid=course_id, sname=skill_name, nivelMin=nivelMin)
+            await result.consume()
+
+    async def link_course_to_skills(self, course_id: str, skills: list[dict], replace: bool = False):
+        """
+        Vincula varias skills a un curso en una sola sentencia (UNWIND).
+        skills = [{"nombre": "Python", "nivelMin": 2}, ...]
+        """
+        q = """
+        MATCH (c:Course {id:$cid})
+        OPTIONAL MATCH (c)-[old:ENSEÑA]->(:Skill)
+        WITH c, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH c
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre:skill.nombre})
+        MERGE (c)-[r:ENSEÑA]->(s)
+        SET r.nivelMin=skill.nivelMin
+        """
+        async with self.driver.session() as session:
+            result = await session.run(q, cid=course_id, skills=skills, replace=replace)
+            await result.consume()
+
+    async def delete_course_skill_links(self, course_id: str):
+        q = "MATCH (:Course {id:$cid})-[r:ENSEÑA]->(:Skill) DELETE r"
+        async with self.driver.session() as session:
+            result = await session.run(q, cid=course_id)
+            await result.consume()
+        logging.info(f"🔗 Relaciones ENSEÑA eliminadas para course {course_id}")
+
+    async def link_person_to_course(self, person_id: str, course_id: str):
+        q = """
+        MATCH (p:Person {id:$pid}), (c:Course {id:$cid})
+        MERGE (p)-[:INSCRIPTO_EN]->(c)
+        """
+        async with self.driver.session() as session:
+            result = await session.run(q, pid=person_id, cid=course_id)
+            await result.consume()
+
+    async def delete_course_node(self, course_id: str):
+        q = "MATCH (c:Course {id:$id}) DETACH DELETE c"
+        async with self.driver.session() as session:
+            result = await session.run(q, id=course_id)
+            await result.consume()
+        logging.info(f"🗑️ Nodo Course eliminado: {course_id}")
+
+    # --- RELACIÓN DE INSCRIPCIÓN CON PROPIEDADES ---
+
+    # -- Crear/actualizar relación con props (una sola relación) --
+    async def upsert_inscripcion(self, person_id: str, course_id: str,
+                        progreso: int = 0, estado: str = "No empezó",
+                        nota: int | None = None, certificacionUrl: str | None = None):
+        q = """
+        MATCH (p:Person {id:$pid}), (c:Course {id:$cid})
+        MERGE (p)-[r:INSCRIPTO_EN]->(c)
+        SET r.progreso   = coalesce($progreso, r.progreso, 0),
+            r.estado     = coalesce($estado,   r.estado,   'No empezó'),
+            r.updatedAt  = datetime()
+        FOREACH (_ IN CASE WHEN $nota IS NULL THEN [] ELSE [1] END | SET r.nota = $nota)
+        FOREACH (_ IN CASE WHEN $certUrl IS NULL THEN [] ELSE [1] END | SET r.certificacionUrl = $certUrl)
+        """
+        async with self.driver.session() as session:
+            result = await session.run(q, pid=str(person_id), cid=str(course_id),
+                        progreso=int(progreso), estado=str(estado),
+                        nota=nota, certUrl=certificacionUrl)
+            await result.consume()
+
+    async def set_inscripcion_progreso(self, person_id: str, course_id: str, progreso: int):
+        q = """
+        MATCH (p:Person {id:$pid})-[r:INSCRIPTO_EN]->(c:Course {id:$cid})
+        SET r.progreso  = $progreso,
+            r.estado    = CASE
+                            WHEN $progreso >= 100 THEN 'Completado'
+                            WHEN $progreso > 0 THEN 'Cursando'
+                            ELSE 'No empezó'
+                        END,
+            r.updatedAt = datetime()
+        """
+        async with self.driver.session() as session:
+            result = await session.run(q, pid=str(person_id), cid=str(course_id), progreso=int(progreso))
+            await result.consume()
+
+    async def set_inscripcion_completa(self, person_id: str, course_id: str,
+                                nota: int | None = None, certificacionUrl: str | None = None):
+        q = """
+        MATCH (p:Person {id:$pid})-[r:INSCRIPTO_EN]->(c:Course {id:$cid})
+        SET r.estado     = 'Completado',
+            r.progreso   = 100,
+            r.updatedAt  = datetime()
+        FOREACH (_ IN CASE WHEN $nota IS NULL THEN [] ELSE [1] END | SET r.nota = $nota)
+        FOREACH (_ IN CASE WHEN $certUrl IS NULL THEN [] ELSE [1] END | SET r.certificacionUrl = $certUrl)
+        """
+        async with self.driver.session() as session:
+            result = await session.run(q, pid=str(person_id), cid=str(course_id),
+                        nota=nota, certUrl=certificacionUrl)
+            await result.consume()
+
+    async def sync_all_person_names(self, people_list):
+        """
+        Sincroniza los nombres de todas las personas en Neo4j desde MongoDB.
+        people_list: lista de diccionarios con userId, nombre y rol
+        """
+        async with self.driver.session() as session:
+            for person in people_list:
+                person_id = person.get("userId") or person.get("_id")
+                nombre = person.get("datosPersonales", {}).get("nombre", "Desconocido")
+                rol = person.get("rol", "Usuario")
+                
+                if person_id:
+                    result = await session.run(
+                        """
+                        MERGE (p:Person {id: $pid})
+                        SET p.nombre = $nombre,
+                            p.rol = $rol
+                        """,
+                        pid=str(person_id),
+                        nombre=nombre,
+                        rol=rol
+                    )
+                    await result.consume()
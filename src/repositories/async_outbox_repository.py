@@ -0,0 +1,119 @@
+import os
+from src.config.database import get_async_mongo_db
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+from datetime import datetime, timedelta
+
+# Hash Redis donde el worker publica sus métricas (lag_ms, procesados, reintentos, fallidos)
+OUTBOX_METRICS_KEY = "outbox:metrics"
+# Las transacciones requieren replica set o mongos; "false" solo para un mongod standalone de desarrollo
+MONGO_TRANSACTIONS = os.getenv("MONGO_TRANSACTIONS", "true").lower() in ("1", "true", "yes")
+
+T = TypeVar("T")
+
+
+def graph_op(op: str, **args: Any) -> Dict[str, Any]:
+    """Describe una llamada a AsyncNeo4jRepository: graph_op("create_job_node", job_id=..., ...)."""
+    return {"op": op, "args": args}
+
+
+class AsyncOutboxRepository:
+    """
+    Outbox transaccional en la colección `outbox` de MongoDB.
+    Los servicios agregan un evento (lista de operaciones de grafo) en la misma
+    transacción que su escritura en Mongo (ver `transaction`); el worker
+    src/workers/graph_projector.py los proyecta en Neo4j en orden de _id.
+    """
+
+    def __init__(self):
+        db = get_async_mongo_db()
+        self.col = db["outbox"]
+
+    # ===============================================================
+    # ✍️ Productores (servicios)
+    # ===============================================================
+    async def transaction(self, callback: Callable[[Any], Awaitable[T]]) -> T:
+        """
+        Ejecuta `callback(session)` en una transacción de Mongo: la escritura de
+        negocio y el append al outbox se confirman juntos o no se confirma ninguno.
+        El callback puede reintentarse (errores transitorios): solo debe escribir
+        en Mongo con `session`; cachés y demás efectos van después.
+
+            async def _write(session):
+                job = await self.repo.create(payload, session=session)
+                await self.outbox.append(ops, clave=f"job:{job['_id']}", session=session)
+                return job
+            job = await self.outbox.transaction(_write)
+        """
+        if not MONGO_TRANSACTIONS:
+            return await callback(None)
+        async with await self.col.database.client.start_session() as session:
+            return await session.with_transaction(callback)
+
+    async def append(self, ops: List[Dict[str, Any]], clave: Optional[str] = None,
+                     session=None) -> Optional[str]:
+        """
+        Encola las operaciones de grafo. `clave` identifica la entidad (p. ej. "job:<id>");
+        con `session` el evento se escribe dentro de esa transacción.
+        """
+        if not ops:
+            return None
+        now = datetime.utcnow()
+        res = await self.col.insert_one({
+            "ops": ops,
+            "clave": clave,
+            "estado": "pendiente",
+            "intentos": 0,
+            "ultimoError": None,
+            "creadoEn": now,
+            "disponibleEn": now,
+        }, session=session)
+        return str(res.inserted_id)
+
+    # ===============================================================
+    # 🔄 Consumidor (worker)
+    # ===============================================================
+    async def next_batch(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Eventos pendientes más antiguos, en orden de inserción. Se omiten las
+        claves con un evento en backoff: solo esa entidad espera, no toda la cola.
+        """
+        bloqueadas = await self.col.distinct(
+            "clave", {"estado": "pendiente", "disponibleEn": {"$gt": datetime.utcnow()}})
+        query: Dict[str, Any] = {"estado": "pendiente"}
+        if bloqueadas:
+            query["clave"] = {"$nin": bloqueadas}
+        cursor = self.col.find(query).sort("_id", 1).limit(limit)
+        return [d async for d in cursor]
+
+    async def mark_done(self, ids: List[Any]) -> int:
+        if not ids:
+            return 0
+        res = await self.col.delete_many({"_id": {"$in": ids}})
+        return res.deleted_count
+
+    async def mark_retry(self, _id: Any, intentos: int, error: str, delay_seconds: float):
+        await self.col.update_one({"_id": _id}, {"$set": {
+            "intentos": intentos,
+            "ultimoError": error,
+            "disponibleEn": datetime.utcnow() + timedelta(seconds=delay_seconds),
+        }})
+
+    async def mark_failed(self, _id: Any, intentos: int, error: str):
+        """Saca el evento de la cola (queda como 'fallido' para inspección/reproceso manual)."""
+        await self.col.update_one({"_id": _id}, {"$set": {
+            "estado": "fallido",
+            "intentos": intentos,
+            "ultimoError": error,
+            "falloEn": datetime.utcnow(),
+        }})
+
+    # ===============================================================
+    # 📈 Métricas
+    # ===============================================================
+    async def stats(self) -> Dict[str, Any]:
+        """Pendientes, fallidos y lag (segundos) del evento pendiente más antiguo."""
+        pendientes = await self.col.count_documents({"estado": "pendiente"})
+        fallidos = await self.col.count_documents({"estado": "fallido"})
+        oldest = await self.col.find_one({"estado": "pendiente"}, sort=[("_id", 1)], projection={"creadoEn": 1})
+        lag = (datetime.utcnow() - oldest["creadoEn"]).total_seconds() if oldest else 0.0
+        return {"pendientes": pendientes, "fallidos": fallidos, "lag_seconds": round(lag, 3)}
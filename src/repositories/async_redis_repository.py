@@ -0,0 +1,277 @@
+from src.config.database import get_async_redis_client
+from src.utils.ndjson import json_default
+from bson import json_util
+import os
+import json
+import time
+import uuid
+from typing import Optional, Dict, Any, Iterable, List
+
+# TTL de la caché de perfiles (segundos)
+PERSON_CACHE_TTL_SECONDS = int(os.getenv("PERSON_CACHE_TTL_SECONDS", 600))
+# TTL de las recomendaciones precalculadas (red de seguridad: se refrescan por eventos)
+RECS_TTL_SECONDS = int(os.getenv("RECS_TTL_SECONDS", 86400))
+
+# Inserta un job en el top-K de una persona solo si ya está precalculado y el
+# score supera al último (desplazándolo). Atómico y en un solo round trip.
+# KEYS: zset, meta, índice inverso del job — ARGV: jobId, score, meta JSON, K, personId
+# (el índice inverso del job desplazado se arma en el script: match:job:{jid}:recommended_to)
+MERGE_RECOMMENDATION_LUA = """
+if redis.call('EXISTS', KEYS[2]) == 0 then return 0 end
+local k = tonumber(ARGV[4])
+if redis.call('ZCARD', KEYS[1]) >= k and redis.call('ZSCORE', KEYS[1], ARGV[1]) == false then
+    local low = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    if tonumber(ARGV[2]) <= tonumber(low[2]) then return 0 end
+    redis.call('ZREM', KEYS[1], low[1])
+    redis.call('HDEL', KEYS[2], low[1])
+    redis.call('SREM', 'match:job:' .. low[1] .. ':recommended_to', ARGV[5])
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('SADD', KEYS[3], ARGV[5])
+return 1
+"""
+
+# Compare-and-delete: KEYS[1]=lock, ARGV[1]=token del dueño
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+return redis.call('DEL', KEYS[1])
+"""
+
+# Cola de refrescos de recomendaciones (la drena src/workers/recs_refresher.py).
+# SETs: un mismo id encolado varias veces se refresca una sola vez.
+RECS_QUEUE_KEYS = {
+    "personas": "recs:cola:personas",
+    "jobs": "recs:cola:jobs",
+    "jobs_borrados": "recs:cola:jobs_borrados",
+}
+
+
+class AsyncRedisRepository:
+    """
+    Contraparte async (redis.asyncio) de RedisRepository.
+    Mantiene métodos de caché y ranking.
+    """
+
+    def __init__(self):
+        # 🔗 Cliente redis.asyncio compartido
+        self.client = get_async_redis_client()
+
+    # ===============================================================
+    # 🧍 Caching de personas
+    # ===============================================================
+    # Contadores por proceso, compartidos por todas las instancias
+    person_cache_hits = 0
+    person_cache_misses = 0
+
+    @staticmethod
+    def _person_keys(*ids: Any) -> list[str]:
+        return [f"cache:person:{i}" for i in dict.fromkeys(str(i) for i in ids if i)]
+
+    async def cache_person(self, data: Dict[str, Any], ttl_seconds: Optional[int] = None):
+        """
+        Guarda el perfil (Extended JSON) bajo su _id y su userId, así cualquiera de
+        los dos ids resuelve con un solo GET. json_util conserva datetime/ObjectId:
+        un hit devuelve los mismos tipos que la lectura desde Mongo.
+        """
+        if not data:
+            return
+        keys = self._person_keys(data.get("_id"), data.get("userId"))
+        if not keys:
+            return
+        ttl = ttl_seconds or PERSON_CACHE_TTL_SECONDS
+        payload = json_util.dumps(data)
+        async with self.client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.setex(key, ttl, payload)
+            await pipe.execute()
+
+    async def get_cached_person(self, person_id: str) -> Optional[Dict[str, Any]]:
+        """Obtiene el perfil cacheado (por _id o userId), o None si expiró."""
+        cached = await self.client.get(f"cache:person:{person_id}")
+        if cached:
+            AsyncRedisRepository.person_cache_hits += 1
+            return json_util.loads(cached)
+        AsyncRedisRepository.person_cache_misses += 1
+        return None
+
+    async def invalidate_person(self, *person_ids: Any):
+        """Elimina la caché de una persona (pasar _id y userId)."""
+        keys = self._person_keys(*person_ids)
+        if keys:
+            await self.client.delete(*keys)
+
+    @classmethod
+    def person_cache_stats(cls) -> Dict[str, Any]:
+        total = cls.person_cache_hits + cls.person_cache_misses
+        return {
+            "hits": cls.person_cache_hits,
+            "misses": cls.person_cache_misses,
+            "hit_ratio": round(cls.person_cache_hits / total, 3) if total else 0.0,
+            "ttl_seconds": PERSON_CACHE_TTL_SECONDS,
+        }
+
+    # ===============================================================
+    # 🧠 Rankings por empleo (ZSET)
+    # ===============================================================
+    async def get_job_ranking(self, job_id: str, top_k: int = 10) -> list[dict]:
+        """Obtiene el top-K de candidatos para un empleo desde un ZSET."""
+        key = f"match:job:{job_id}:top"
+        ranking_data = await self.client.zrevrange(key, 0, top_k - 1, withscores=True)
+
+        return [
+            {"persona_id": pid, "affinity_score": score}
+            for pid, score in ranking_data
+        ]
+
+    async def set_job_ranking(self, job_id: str, ranking_dict: Dict[str, float], ttl_minutes: int = 15,
+                              stale_minutes: int = 0):
+        """
+        Reemplaza el ranking de afinidad del ZSET. La marca `match:job:{id}:top:calculado`
+        guarda el vencimiento blando (epoch, a `ttl_minutes`) y distingue un ranking
+        vacío de uno nunca calculado; ZSET y marca viven `stale_minutes` más, para
+        seguir sirviendo el ranking vencido mientras se recalcula.
+        """
+        key = f"match:job:{job_id}:top"
+        ttl = ttl_minutes * 60
+        hard_ttl = ttl + stale_minutes * 60
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(key)
+            if ranking_dict:
+                pipe.zadd(key, ranking_dict)
+                pipe.expire(key, hard_ttl)
+            pipe.set(f"{key}:calculado", time.time() + ttl, ex=hard_ttl)
+            await pipe.execute()
+
+    async def get_job_ranking_with_ttl(self, job_id: str, top_k: int = 10) -> tuple[Optional[list[dict]], float]:
+        """
+        Top-K y segundos hasta el vencimiento blando, en un round trip
+        (negativo: ranking vencido que todavía se puede servir).
+        Devuelve (None, 0) si el ranking nunca se calculó o ya expiró del todo.
+        """
+        key = f"match:job:{job_id}:top"
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(key, 0, top_k - 1, withscores=True)
+            pipe.get(f"{key}:calculado")
+            ranking_data, soft_expiry = await pipe.execute()
+        if soft_expiry is None:
+            return None, 0
+        ranking = [{"persona_id": pid, "affinity_score": score} for pid, score in ranking_data]
+        return ranking, float(soft_expiry) - time.time()
+
+    async def delete_job_ranking(self, job_id: str):
+        key = f"match:job:{job_id}:top"
+        await self.client.delete(key, f"{key}:calculado")
+
+    async def try_lock(self, key: str, ttl_ms: int) -> Optional[str]:
+        """Lock best-effort entre procesos (SET NX PX); expira solo. Devuelve el token del dueño o None."""
+        token = uuid.uuid4().hex
+        return token if await self.client.set(key, token, nx=True, px=ttl_ms) else None
+
+    async def release_lock(self, key: str, token: str):
+        """Libera el lock solo si sigue siendo de `token` (no borra el de otro proceso tras expirar)."""
+        await self.client.register_script(RELEASE_LOCK_LUA)(keys=[key], args=[token])
+
+    # ===============================================================
+    # 🎯 Recomendaciones de empleo precalculadas por persona (ZSET)
+    # ===============================================================
+    # match:person:{pid}:jobs        ZSET jobId → score (top-K)
+    # match:person:{pid}:jobs:meta   HASH jobId → JSON {titulo, descripcion, habilidadesCoincidentes}
+    #                                (+ "_calculadoEn": existe aunque no haya recomendaciones)
+    # match:job:{jid}:recommended_to SET de personas cuyo top-K incluye al job
+    @staticmethod
+    def _recs_keys(person_id: str) -> tuple[str, str]:
+        return f"match:person:{person_id}:jobs", f"match:person:{person_id}:jobs:meta"
+
+    @staticmethod
+    def _recs_meta(rec: Dict[str, Any]) -> str:
+        return json.dumps({
+            "titulo": rec.get("titulo"),
+            "descripcion": rec.get("descripcion"),
+            "habilidadesCoincidentes": rec.get("habilidadesCoincidentes", []),
+        }, default=json_default)
+
+    async def get_person_recommendations(self, person_id: str, top_k: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Top-K precalculado (mismo formato que la consulta del grafo), o None si no está calculado."""
+        zkey, mkey = self._recs_keys(person_id)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zrevrange(zkey, 0, top_k - 1, withscores=True)
+            pipe.hgetall(mkey)
+            ranking, meta = await pipe.execute()
+        if not meta:
+            return None
+        recs = []
+        for job_id, score in ranking:
+            info = json.loads(meta.get(job_id) or "{}")
+            recs.append({"jobId": job_id, **info, "score": score})
+        return recs
+
+    async def set_person_recommendations(self, person_id: str, recs: List[Dict[str, Any]],
+                                         ttl_seconds: Optional[int] = None):
+        """Reemplaza el top-K de una persona y mantiene el índice inverso por job."""
+        zkey, mkey = self._recs_keys(person_id)
+        ttl = ttl_seconds or RECS_TTL_SECONDS
+        previos = await self.client.zrange(zkey, 0, -1)
+        nuevos = {r["jobId"]: r["score"] for r in recs}
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.delete(zkey, mkey)
+            if nuevos:
+                pipe.zadd(zkey, nuevos)
+                pipe.expire(zkey, ttl)
+            pipe.hset(mkey, mapping={"_calculadoEn": time.time(),
+                                     **{r["jobId"]: self._recs_meta(r) for r in recs}})
+            pipe.expire(mkey, ttl)
+            for job_id in set(previos) - set(nuevos):
+                pipe.srem(f"match:job:{job_id}:recommended_to", person_id)
+            for job_id in nuevos:
+                pipe.sadd(f"match:job:{job_id}:recommended_to", person_id)
+            await pipe.execute()
+
+    async def invalidate_person_recommendations(self, *person_ids: str):
+        """Descarta el top-K (se recalcula en la próxima lectura)."""
+        keys = [k for pid in person_ids for k in self._recs_keys(pid)]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def pop_job_recommended_to(self, job_id: str) -> List[str]:
+        """Devuelve y borra las personas cuyo top-K incluía al job."""
+        key = f"match:job:{job_id}:recommended_to"
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.smembers(key)
+            pipe.delete(key)
+            members, _ = await pipe.execute()
+        return list(members)
+
+    async def enqueue_recs_refresh(self, **ids: Iterable[str]):
+        """enqueue_recs_refresh(personas=[...], jobs=[...], jobs_borrados=[...])"""
+        async with self.client.pipeline(transaction=False) as pipe:
+            for kind, members in ids.items():
+                members = list(members)
+                if members:
+                    pipe.sadd(RECS_QUEUE_KEYS[kind], *members)
+            await pipe.execute()
+
+    async def pop_recs_refresh(self, kind: str, count: int) -> List[str]:
+        return list(await self.client.spop(RECS_QUEUE_KEYS[kind], count) or [])
+
+    async def merge_job_recommendation(self, job_id: str, scored: Iterable[Dict[str, Any]],
+                                       top_k: int, chunk_size: int = 500) -> int:
+        """
+        Ofrece el job a cada persona de `scored` ({personId, score, ...}):
+        entra a su top-K solo si ya está precalculado y el score alcanza.
+        Devuelve en cuántos top-K quedó.
+        """
+        script = self.client.register_script(MERGE_RECOMMENDATION_LUA)
+        reverse_key = f"match:job:{job_id}:recommended_to"
+        merged = 0
+        batch = list(scored)
+        for i in range(0, len(batch), chunk_size):
+            async with self.client.pipeline(transaction=False) as pipe:
+                for rec in batch[i:i + chunk_size]:
+                    zkey, mkey = self._recs_keys(rec["personId"])
+                    await script(keys=[zkey, mkey, reverse_key],
+                                 args=[job_id, rec["score"], self._recs_meta(rec), top_k, rec["personId"]],
+                                 client=pipe)
+                merged += sum(await pipe.execute())
+        return merged
+
@@ -0,0 +1,30 @@
+from datetime import datetime
+from src.config.database import get_async_mongo_db
+
+
+class AsyncUserRepository:
+    """Contraparte async (motor) de UserRepository."""
+
+    def __init__(self):
+        db = get_async_mongo_db()
+        self.collection = db["users"]
+
+    async def find_by_username(self, username: str):
+        return await self.collection.find_one({"username": username})
+
+    async def create(self, username: str, password_hash: str) -> str:
+        doc = {
+            "username": username,
+            "password_hash": password_hash,
+            "created_at": datetime.utcnow(),
+        }
+        res = await self.collection.insert_one(doc)
+        return str(res.inserted_id)
+
+    async def update_password_hash(self, user_id, old_hash: str, new_hash: str) -> bool:
+        """Reemplaza el hash solo si sigue siendo `old_hash` (rehash-on-login sin pisar un cambio concurrente)."""
+        res = await self.collection.update_one(
+            {"_id": user_id, "password_hash": old_hash},
+            {"$set": {"password_hash": new_hash}},
+        )
+        return res.modified_count == 1
@@ -1,8 +1,67 @@
 from src.config.database import get_mongo_db
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 
+# ===============================================================
+# 📑 Paginación por keyset (bookmark _id o creadoEn+_id)
+# ===============================================================
+KEYSET_FIELDS = ("_id", "creadoEn")
+
+
+def _as_object_id(value: str) -> ObjectId:
+    try:
+        return ObjectId(value)
+    except Exception:
+        raise ValueError(f"bookmark inválido: {value!r}")
+
+
+def keyset_query(query: Dict[str, Any], after: Optional[str], sort_field: str = "_id",
+                 descending: bool = False) -> Tuple[Dict[str, Any], List[Tuple[str, int]]]:
+    """
+    Devuelve (filtro, sort) para leer la página que sigue al bookmark `after`.
+    - sort_field="_id":      after = "<_id>"
+    - sort_field="creadoEn": after = "<creadoEn ISO>|<_id>" (el _id desempata)
+    """
+    if sort_field not in KEYSET_FIELDS:
+        raise ValueError(f"sort_field debe ser uno de {KEYSET_FIELDS}")
+    direction = -1 if descending else 1
+    op = "$lt" if descending else "$gt"
+    sort = [("_id", direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    if not after:
+        return query, sort
+
+    if sort_field == "_id":
+        bookmark = {"_id": {op: _as_object_id(after)}}
+    else:
+        ts, _, last_id = after.partition("|")
+        try:
+            ts = datetime.fromisoformat(ts)
+        except ValueError:
+            raise ValueError(f"bookmark inválido: {after!r} (se espera '<creadoEn ISO>|<_id>')")
+        bookmark = {"$or": [
+            {sort_field: {op: ts}},
+            {sort_field: ts, "_id": {op: _as_object_id(last_id)}},
+        ]}
+    return ({"$and": [query, bookmark]} if query else bookmark), sort
+
+
+def next_cursor(items: List[Dict[str, Any]], limit: Optional[int], sort_field: str = "_id") -> Optional[str]:
+    """
+    Bookmark para pedir la página siguiente, o None si no hay más.
+    `items` se lee con limit + 1: el documento extra solo indica que hay otra
+    página (el llamador devuelve items[:limit]).
+    """
+    if not limit or len(items) <= limit:
+        return None
+    last = items[limit - 1]
+    if sort_field == "_id":
+        return str(last["_id"])
+    ts = last.get(sort_field)
+    ts = ts.isoformat() if isinstance(ts, datetime) else str(ts)
+    return f"{ts}|{last['_id']}"
+
 
 class MongoRepository:
     def __init__(self, collection_name: str):
@@ -37,26 +96,66 @@ class MongoRepository:
                     pass  # si no convierte, lo deja como vino (Mongo también acepta str como _id)
 
             self.col.replace_one({"_id": _id}, data, upsert=True)
-            created = self.col.find_one({"_id": _id})
-            return self._stringify_id(created)
+            # el documento guardado es exactamente `data`: no hace falta releerlo
+            return self._stringify_id(dict(data))
 
-    # 👇 Sin _id → insert normal
-        res = self.col.insert_one(data)
-        created = self.col.find_one({"_id": res.inserted_id})
-        return self._stringify_id(created)
+        # 👇 Sin _id → insert normal (insert_one completa data["_id"])
+        self.col.insert_one(data)
+        return self._stringify_id(dict(data))
 
 
     def find_one(self, _id: str) -> Optional[Dict[str, Any]]:
         doc = self.col.find_one({"_id": ObjectId(_id)})
         return self._stringify_id(doc) if doc else None
 
-    def find(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
-        return [self._stringify_id(d) for d in self.col.find(query)]
+    def find(self, query: Dict[str, Any], limit: Optional[int] = None,
+             sort: Optional[List[Tuple[str, int]]] = None,
+             projection: Optional[Dict[str, Any]] = None,
+             after: Optional[str] = None, sort_field: str = "_id",
+             skip: int = 0) -> List[Dict[str, Any]]:
+        """
+        Busca documentos. Sin parámetros extra se comporta como antes.
+        - limit/skip/projection/sort: se pasan al cursor de Mongo
+        - after: bookmark de keyset (ver keyset_query); ordena por sort_field
+        """
+        if after and sort:
+            raise ValueError("after (keyset) no se combina con sort: el orden lo fija sort_field")
+        if after or (limit and not sort):
+            query, sort = keyset_query(query, after, sort_field)
+        cursor = self.col.find(query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [self._stringify_id(d) for d in cursor]
 
-    def update(self, _id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def update_by_id(self, _id: str, change: Dict[str, Any], return_doc: bool = True,
+                     extra_filter: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Aplica un update con operadores ($set/$push/$addToSet...) en un round trip.
+        `extra_filter` condiciona el update (p. ej. evitar duplicados en un arreglo).
+        Devuelve el documento resultante, o matched_count con return_doc=False.
+        """
+        filtro = {"_id": ObjectId(_id), **(extra_filter or {})}
+        if not return_doc:
+            res = self.col.update_one(filtro, change)
+            return res.matched_count
+        doc = self.col.find_one_and_update(filtro, change, return_document=ReturnDocument.AFTER)
+        return self._stringify_id(doc)
+
+    def update(self, _id: str, updates: Dict[str, Any], return_doc: bool = True) -> Any:
+        """
+        $set de `updates` en un solo round trip (find_one_and_update, AFTER).
+        Con return_doc=False no se transfiere el documento: devuelve matched_count.
+        """
         updates["actualizadoEn"] = datetime.utcnow()
-        self.col.update_one({"_id": ObjectId(_id)}, {"$set": updates})
-        doc = self.col.find_one({"_id": ObjectId(_id)})
+        if not return_doc:
+            return self.col.update_one({"_id": ObjectId(_id)}, {"$set": updates}).matched_count
+        doc = self.col.find_one_and_update(
+            {"_id": ObjectId(_id)}, {"$set": updates}, return_document=ReturnDocument.AFTER
+        )
         return self._stringify_id(doc)
     
     def delete(self, _id: str) -> int:
@@ -71,21 +170,21 @@ class MongoRepository:
             res = self.col.delete_one({"_id": _id})
             return getattr(res, "deleted_count", 0)
     
-    def add_to_array(self, _id: str, field: str, value: Any) -> Optional[Dict[str, Any]]:
+    def add_to_array(self, _id: str, field: str, value: Any, return_doc: bool = True) -> Any:
         """
         Agrega un elemento a un arreglo en el documento identificado por _id.
-        Devuelve el documento actualizado (stringificando _id) o None si no existe.
+        Devuelve el documento actualizado (stringificando _id) o None si no existe;
+        con return_doc=False devuelve matched_count.
         """
         updates = {"actualizadoEn": datetime.utcnow()}
         try:
-            res = self.col.update_one({"_id": ObjectId(_id)}, {"$push": {field: value}, "$set": updates})
+            filtro = {"_id": ObjectId(_id)}
         except Exception:
             # fallback si _id no es ObjectId (documentos con _id string)
-            res = self.col.update_one({"_id": _id}, {"$push": {field: value}, "$set": updates})
-
-        if res.matched_count:
-            doc = self.col.find_one({"_id": ObjectId(_id)}) if isinstance(_id, str) and len(_id) == 24 else self.col.find_one({"_id": _id})
-            return self._stringify_id(doc)
-        return None
-    
+            filtro = {"_id": _id}
+        change = {"$push": {field: value}, "$set": updates}
 
+        if not return_doc:
+            return self.col.update_one(filtro, change).matched_count
+        doc = self.col.find_one_and_update(filtro, change, return_document=ReturnDocument.AFTER)
+        return self._stringify_id(doc) if doc else None
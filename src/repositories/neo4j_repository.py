@@ -1,9 +1,185 @@
 import logging
+from functools import lru_cache
 from src.config.database import get_neo4j_driver
 
 # Configuración global de logs
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# ===============================================================
+# 🗂️ Esquema del grafo
+# Las constraints de unicidad crean además el índice que usan MATCH/MERGE
+# por id y evitan nodos duplicados ante MERGEs concurrentes.
+# ===============================================================
+GRAPH_SCHEMA = [
+    "CREATE CONSTRAINT person_id_unique IF NOT EXISTS FOR (n:Person) REQUIRE n.id IS UNIQUE",
+    "CREATE CONSTRAINT job_id_unique IF NOT EXISTS FOR (n:Job) REQUIRE n.id IS UNIQUE",
+    "CREATE CONSTRAINT company_id_unique IF NOT EXISTS FOR (n:Company) REQUIRE n.id IS UNIQUE",
+    "CREATE CONSTRAINT course_id_unique IF NOT EXISTS FOR (n:Course) REQUIRE n.id IS UNIQUE",
+    "CREATE CONSTRAINT skill_nombre_unique IF NOT EXISTS FOR (n:Skill) REQUIRE n.nombre IS UNIQUE",
+]
+
+# ===============================================================
+# 📜 Consultas compartidas (repos sync/async y verificación con EXPLAIN)
+# ===============================================================
+# Anclada en las skills de la persona: expande POSEE_HABILIDAD y luego
+# REQUERIMIENTO_DE|DESEA en una sola pasada (nunca recorre todos los Job).
+# Una skill requerida y deseada a la vez cuenta como requerida (x2).
+JOB_RECOMMENDATIONS_QUERY = """
+    // 1️⃣ Desde las skills de la persona hacia los trabajos que las piden
+    MATCH (p:Person {id: $pid})-[r:POSEE_HABILIDAD]->(s:Skill)<-[req:REQUERIMIENTO_DE|DESEA]-(job:Job)
+
+    // 2️⃣ Tipo de requisito por (trabajo, skill)
+    WITH job, s,
+         COALESCE(r.nivel, 1) AS nivelPersona,
+         COLLECT(type(req)) AS tipos
+
+    // 3️⃣ Calcular score total por trabajo
+    WITH job,
+         COLLECT(s.nombre) AS habilidadesCoincidentes,
+         SUM(
+             nivelPersona * CASE
+                 WHEN 'REQUERIMIENTO_DE' IN tipos THEN 2.0
+                 ELSE 1.0
+             END
+         ) AS afinidad,
+         COUNT(s) AS cantidadSkills
+
+    // 4️⃣ Devolver resultados ordenados por afinidad
+    RETURN job.id AS jobId,
+           job.titulo AS titulo,
+           job.descripcion AS descripcion,
+           habilidadesCoincidentes,
+           ROUND(afinidad * (1.0 + cantidadSkills/10.0), 2) AS score
+    ORDER BY score DESC
+    LIMIT $limit
+    """
+
+# Inverso de JOB_RECOMMENDATIONS_QUERY: desde un Job hacia las personas que
+# tienen alguna de sus skills, con la misma fórmula de score
+JOB_CANDIDATES_QUERY = """
+    MATCH (job:Job {id: $jid})-[req:REQUERIMIENTO_DE|DESEA]->(s:Skill)<-[r:POSEE_HABILIDAD]-(p:Person)
+    WITH job, p, s, COALESCE(r.nivel, 1) AS nivelPersona, COLLECT(type(req)) AS tipos
+    WITH job, p,
+         COLLECT(s.nombre) AS habilidadesCoincidentes,
+         SUM(
+             nivelPersona * CASE
+                 WHEN 'REQUERIMIENTO_DE' IN tipos THEN 2.0
+                 ELSE 1.0
+             END
+         ) AS afinidad,
+         COUNT(s) AS cantidadSkills
+    RETURN p.id AS personId,
+           p.nombre AS nombre,
+           job.titulo AS titulo,
+           job.descripcion AS descripcion,
+           habilidadesCoincidentes,
+           ROUND(afinidad * (1.0 + cantidadSkills/10.0), 2) AS score
+    ORDER BY score DESC
+    LIMIT $limit
+    """
+
+SUGGESTED_CONNECTIONS_QUERY = """
+    MATCH (p:Person {id: $id})-[]->(amigo:Person)-[]->(sugerido:Person)
+    WHERE NOT (p)-[]-(sugerido) AND p <> sugerido
+    WITH sugerido, COUNT(DISTINCT amigo) AS amigosEnComun
+    RETURN sugerido.id AS id, 
+           sugerido.nombre AS nombre, 
+           sugerido.rol AS rol,
+           amigosEnComun
+    ORDER BY amigosEnComun DESC
+    LIMIT 10
+    """
+
+
+def relationship_query(rel: str) -> str:
+    """MERGE de una relación `rel` entre dos nodos identificados por id."""
+    return f"""
+    MATCH (a {{id: $src}}), (b {{id: $tgt}})
+    MERGE (a)-[r:{rel}]->(b)
+    RETURN COUNT(r) AS total
+    """
+
+
+# ===============================================================
+# 🔐 Relaciones con etiqueta: tipos permitidos por (origen, destino)
+# Con un conjunto cerrado de tipos, el texto Cypher generado es finito y el
+# planner reutiliza el plan cacheado en vez de re-planificar cada variante.
+# ===============================================================
+RELATIONSHIP_TYPES = {
+    ("Person", "Job"): {"POSTULA_A", "EN_ENTREVISTA_CON", "EVALUADO_PARA", "OFERTA_DE",
+                        "TRABAJA_EN", "RECHAZADO_EN", "EN_PROCESO"},
+    ("Person", "Company"): {"TRABAJA_EN"},
+}
+
+
+def _normalize_rel(rel_type: str) -> str:
+    return rel_type.upper().replace(" ", "_")
+
+
+def _check_labels(src_label: str, tgt_label: str, rel: str | None) -> None:
+    allowed = RELATIONSHIP_TYPES.get((src_label, tgt_label))
+    if allowed is None:
+        raise ValueError(f"Par de etiquetas no soportado: ({src_label})->({tgt_label})")
+    if rel is not None and rel not in allowed:
+        raise ValueError(f"Tipo de relación no permitido entre {src_label} y {tgt_label}: {rel}")
+
+
+@lru_cache(maxsize=None)
+def labelled_relationship_query(src_label: str, tgt_label: str, rel: str) -> str:
+    """MERGE de `rel` entre (src_label {id}) y (tgt_label {id}); usa las constraints por id."""
+    _check_labels(src_label, tgt_label, rel)
+    return f"""
+    MATCH (a:{src_label} {{id: $src}})
+    MATCH (b:{tgt_label} {{id: $tgt}})
+    MERGE (a)-[r:{rel}]->(b)
+    RETURN COUNT(r) AS total
+    """
+
+
+@lru_cache(maxsize=None)
+def labelled_delete_query(src_label: str, tgt_label: str, rel: str | None = None) -> str:
+    """Borra `rel` (o todas si es None) entre (src_label {id}) y (tgt_label {id})."""
+    _check_labels(src_label, tgt_label, rel)
+    rel_pattern = f"[r:{rel}]" if rel else "[r]"
+    return f"""
+    MATCH (a:{src_label} {{id: $src}})-{rel_pattern}-(b:{tgt_label} {{id: $tgt}})
+    DELETE r
+    RETURN COUNT(r) AS eliminadas
+    """
+
+
+# Lookups que deben resolverse con index seeks: nombre → (consulta, parámetros de ejemplo)
+EXPLAIN_CHECKS = {
+    "get_job_recommendations": (JOB_RECOMMENDATIONS_QUERY, {"pid": "explain", "limit": 10}),
+    "get_job_candidates": (JOB_CANDIDATES_QUERY, {"jid": "explain", "limit": 10}),
+    "get_suggested_connections": (SUGGESTED_CONNECTIONS_QUERY, {"id": "explain"}),
+    "create_relationship": (relationship_query("EXPLAIN_CHECK"), {"src": "explain", "tgt": "explain"}),
+    "create_labelled_relationship": (labelled_relationship_query("Person", "Job", "POSTULA_A"),
+                                     {"src": "explain", "tgt": "explain"}),
+}
+SCAN_OPERATORS = {"AllNodesScan", "NodeByLabelScan"}
+
+
+def plan_operators(plan) -> list[str]:
+    """Aplana el plan de EXPLAIN (summary.plan) en la lista de operadores."""
+    if not plan:
+        return []
+    op = plan.get("operatorType", "").split("@")[0]
+    ops = [op] if op else []
+    for child in plan.get("children", []):
+        ops.extend(plan_operators(child))
+    return ops
+
+
+def check_plan(name: str, plan) -> dict:
+    """Resume un plan: seeks usados y scans (label/all nodes) que habría que evitar."""
+    ops = plan_operators(plan)
+    seeks = [op for op in ops if "Seek" in op]
+    scans = [op for op in ops if op in SCAN_OPERATORS]
+    if scans:
+        logging.warning(f"🐢 {name}: el plan usa {scans}")
+    return {"query": name, "operators": ops, "seeks": seeks, "scans": scans, "ok": bool(seeks) and not scans}
+
 
 class Neo4jRepository:
     """
@@ -13,6 +189,29 @@ class Neo4jRepository:
     def __init__(self):
         self.driver = get_neo4j_driver()
 
+    # ===============================================================
+    # 🗂️ Esquema: constraints + verificación de planes
+    # ===============================================================
+    def ensure_schema(self):
+        """Crea las constraints de GRAPH_SCHEMA (idempotente: IF NOT EXISTS)."""
+        with self.driver.session() as session:
+            for statement in GRAPH_SCHEMA:
+                try:
+                    session.run(statement).consume()
+                except Exception as e:
+                    # p. ej. nodos duplicados previos impiden crear la constraint
+                    logging.error(f"❌ No se pudo aplicar '{statement}': {e}")
+        logging.info("🗂️ Esquema de Neo4j verificado")
+
+    def explain_lookups(self) -> list[dict]:
+        """Corre EXPLAIN sobre EXPLAIN_CHECKS e informa si usan index seeks."""
+        report = []
+        with self.driver.session() as session:
+            for name, (query, params) in EXPLAIN_CHECKS.items():
+                summary = session.run("EXPLAIN " + query, **params).consume()
+                report.append(check_plan(name, summary.plan))
+        return report
+
     # ===============================================================
     # 👤 Crear nodo Person y vincular habilidades
     # ===============================================================
@@ -53,6 +252,58 @@ class Neo4jRepository:
             )
             print(f"🔗 Vinculada habilidad '{skill_name}' (nivel {nivel}) con persona {person_id}")
 
+    def link_person_to_skills(self, person_id: str, skills: list[dict], replace: bool = False):
+        """
+        Vincula varias habilidades a una persona en una sola sentencia (UNWIND).
+        skills = [{"nombre": "Python", "nivel": 5}, ...]
+        Si replace=True, primero elimina las relaciones POSEE_HABILIDAD previas
+        dentro de la misma transacción.
+        """
+        query = """
+        MATCH (p:Person {id: $pid})
+        OPTIONAL MATCH (p)-[old:POSEE_HABILIDAD]->(:Skill)
+        WITH p, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH p
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre: skill.nombre})
+        MERGE (p)-[r:POSEE_HABILIDAD]->(s)
+        SET r.nivel = skill.nivel
+        """
+        with self.driver.session() as session:
+            session.run(query, pid=person_id, skills=skills, replace=replace).consume()
+        logging.info(f"🔗 Vinculadas {len(skills)} habilidades con persona {person_id} (replace={replace})")
+
+    def upsert_person_graph(self, person_id: str, nombre: str | None, rol: str | None,
+                            skills: list[dict], replace_skills: bool = False):
+        """
+        Proyecta una persona completa en una sola transacción de escritura:
+        MERGE del nodo Person (nombre/rol), borrado opcional de POSEE_HABILIDAD
+        previas y vinculación de `skills` ([{"nombre", "nivel"}]) con UNWIND.
+        Si nombre/rol vienen en None se conservan los valores actuales del nodo.
+        """
+        query = """
+        MERGE (p:Person {id: $pid})
+        SET p.nombre = coalesce($nombre, p.nombre, 'Desconocido'),
+            p.rol = coalesce($rol, p.rol, 'Sin Rol')
+        WITH p
+        OPTIONAL MATCH (p)-[old:POSEE_HABILIDAD]->(:Skill)
+        WITH p, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH p
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre: skill.nombre})
+        MERGE (p)-[r:POSEE_HABILIDAD]->(s)
+        SET r.nivel = skill.nivel
+        """
+
+        def _write(tx):
+            tx.run(query, pid=person_id, nombre=nombre, rol=rol,
+                   skills=skills, replace=replace_skills).consume()
+
+        with self.driver.session() as session:
+            session.execute_write(_write)
+        logging.info(f"👤 Persona {person_id} sincronizada en Neo4j ({len(skills)} skills, replace={replace_skills})")
 
     def delete_person_skills(self, person_id: str):
         """
@@ -173,17 +424,7 @@ class Neo4jRepository:
         pero comparten al menos una conexión en común.
         Ordenadas por relevancia (cantidad de amigos en común).
         """
-        query = """
-        MATCH (p:Person {id: $id})-[]->(amigo:Person)-[]->(sugerido:Person)
-        WHERE NOT (p)-[]-(sugerido) AND p <> sugerido
-        WITH sugerido, COUNT(DISTINCT amigo) AS amigosEnComun
-        RETURN sugerido.id AS id, 
-               sugerido.nombre AS nombre, 
-               sugerido.rol AS rol,
-               amigosEnComun
-        ORDER BY amigosEnComun DESC
-        LIMIT 10
-        """
+        query = SUGGESTED_CONNECTIONS_QUERY
         with self.driver.session() as session:
             result = session.run(query, id=person_id)
             return [dict(r) for r in result]
@@ -234,11 +475,7 @@ class Neo4jRepository:
         """
         rel = rel_type.upper().replace(" ", "_")
         logging.info(f"➡️ Creando relación {rel} entre {source_id} -> {target_id}")
-        query = f"""
-        MATCH (a {{id: $src}}), (b {{id: $tgt}})
-        MERGE (a)-[r:{rel}]->(b)
-        RETURN COUNT(r) AS total
-        """
+        query = relationship_query(rel)
         with self.driver.session() as session:
             result = session.run(query, src=source_id, tgt=target_id)
             data = result.single()
@@ -275,6 +512,57 @@ class Neo4jRepository:
         except Exception as e:
             logging.error(f"❌ Error eliminando relación genérica: {e}")
             raise
+
+    # ===============================================================
+    # 🏷️ Variantes con etiqueta (index seek por id; tipos en RELATIONSHIP_TYPES)
+    # ===============================================================
+    def create_labelled_relationship(self, src_label: str, source_id: str,
+                                     tgt_label: str, target_id: str, rel_type: str):
+        """
+        Crea (MERGE) la relación (src_label)-[rel_type]->(tgt_label).
+        Ej.: create_labelled_relationship("Person", pid, "Job", jid, "OFERTA_DE")
+        """
+        rel = _normalize_rel(rel_type)
+        query = labelled_relationship_query(src_label, tgt_label, rel)
+        with self.driver.session() as session:
+            data = session.run(query, src=source_id, tgt=target_id).single()
+            count = data["total"] if data else 0
+            logging.info(f"✅ Relación {rel} ({src_label})->({tgt_label}) {source_id} -> {target_id}: {count}")
+            return count
+
+    def delete_labelled_relationship(self, src_label: str, source_id: str,
+                                     tgt_label: str, target_id: str, rel_type: str | None = None):
+        """Elimina `rel_type` (o todas si es None) entre los dos nodos etiquetados."""
+        rel = _normalize_rel(rel_type) if rel_type else None
+        query = labelled_delete_query(src_label, tgt_label, rel)
+        with self.driver.session() as session:
+            data = session.run(query, src=source_id, tgt=target_id).single()
+            count = data["eliminadas"] if data else 0
+            logging.info(f"🗑️ Eliminadas {count} relaciones ({src_label})-({tgt_label}) entre {source_id} y {target_id}")
+            return count
+
+    def set_application_state(self, person_id: str, job_id: str, rel_type: str,
+                              company_id: str | None = None):
+        """
+        Cambio de estado de una postulación en una sola transacción:
+        borra las relaciones previas Person–Job, crea `rel_type` y, si viene
+        company_id (contratado), el vínculo laboral Person-[:TRABAJA_EN]->Company.
+        """
+        rel = _normalize_rel(rel_type)
+        delete_query = labelled_delete_query("Person", "Job")
+        create_query = labelled_relationship_query("Person", "Job", rel)
+
+        def _write(tx):
+            tx.run(delete_query, src=person_id, tgt=job_id).consume()
+            tx.run(create_query, src=person_id, tgt=job_id).consume()
+            if company_id:
+                company_query = labelled_relationship_query("Person", "Company", "TRABAJA_EN")
+                tx.run(company_query, src=person_id, tgt=company_id).consume()
+
+        with self.driver.session() as session:
+            session.execute_write(_write)
+        logging.info(f"🔁 Postulación {person_id} -> {job_id} ahora {rel}")
+
     # ===============================================================
     # 🏢 CREAR NODO COMPANY
     # ===============================================================
@@ -455,6 +743,32 @@ class Neo4jRepository:
                 skill=skill_name
             )
 
+    def link_job_to_skills(self, job_id: str, obligatorios: list[str], deseables: list[str],
+                           replace: bool = False):
+        """
+        Vincula todas las skills de un Job en una sola sentencia (UNWIND).
+        Los obligatorios se vinculan con REQUERIMIENTO_DE y los deseables con DESEA.
+        Si replace=True, primero elimina las relaciones previas dentro de la misma transacción.
+        """
+        skills = [{"nombre": s, "tipo": "REQUERIMIENTO_DE"} for s in obligatorios] + \
+                 [{"nombre": s, "tipo": "DESEA"} for s in deseables]
+        query = """
+        MATCH (j:Job {id: $jid})
+        OPTIONAL MATCH (j)-[old]->(:Skill)
+        WITH j, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH j
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre: skill.nombre})
+        FOREACH (_ IN CASE WHEN skill.tipo = 'REQUERIMIENTO_DE' THEN [1] ELSE [] END |
+            MERGE (j)-[:REQUERIMIENTO_DE]->(s))
+        FOREACH (_ IN CASE WHEN skill.tipo = 'DESEA' THEN [1] ELSE [] END |
+            MERGE (j)-[:DESEA]->(s))
+        """
+        with self.driver.session() as session:
+            session.run(query, jid=job_id, skills=skills, replace=replace).consume()
+        logging.info(f"🔗 Vinculadas {len(skills)} skills con job {job_id} (replace={replace})")
+
     def delete_job_skill_links(self, job_id: str):
         """
         Elimina las relaciones REQUERIMIENTO_DE / DESEA entre un job y sus skills.
@@ -474,44 +788,20 @@ class Neo4jRepository:
           - (:Person)-[:POSEE_HABILIDAD]->(:Skill)
         Además devuelve las habilidades coincidentes.
         """
-        query = """
-        // 1️⃣ Encontrar los trabajos que tienen skills en común con la persona
-        MATCH (p:Person {id: $pid})-[r:POSEE_HABILIDAD]->(s:Skill)
-        MATCH (job:Job)
-        WHERE EXISTS((job)-[:REQUERIMIENTO_DE|DESEA]->(s))
-        
-        // 2️⃣ Calcular coincidencias por tipo de requisito
-        WITH p, job, s, 
-             COALESCE(r.nivel, 1) AS nivelPersona,
-             EXISTS((job)-[:REQUERIMIENTO_DE]->(s)) AS esRequerida,
-             EXISTS((job)-[:DESEA]->(s)) AS esDeseada
-             
-        // 3️⃣ Calcular score total por trabajo
-        WITH job,
-             COLLECT(DISTINCT s.nombre) AS habilidadesCoincidentes,
-             SUM(
-                 nivelPersona * CASE 
-                     WHEN esRequerida THEN 2.0
-                     WHEN esDeseada THEN 1.0
-                     ELSE 0
-                 END
-             ) AS afinidad,
-             COUNT(DISTINCT s) as cantidadSkills
-        WHERE cantidadSkills > 0
-        
-        // 4️⃣ Devolver resultados ordenados por afinidad
-        RETURN job.id AS jobId,
-               job.titulo AS titulo,
-               job.descripcion AS descripcion,
-               habilidadesCoincidentes,
-               ROUND(afinidad * (1.0 + cantidadSkills/10.0), 2) AS score
-        ORDER BY score DESC
-        LIMIT $limit
-        """
+        query = JOB_RECOMMENDATIONS_QUERY
         with self.driver.session() as session:
             result = session.run(query, pid=person_id, limit=limit)
             return [record.data() for record in result]
     
+    def get_job_candidates(self, job_id: str, limit: int = 10):
+        """
+        Personas con afinidad hacia un empleo (misma fórmula que
+        get_job_recommendations, recorrida desde el Job), por score.
+        """
+        with self.driver.session() as session:
+            result = session.run(JOB_CANDIDATES_QUERY, jid=job_id, limit=limit)
+            return [record.data() for record in result]
+
     def get_person_skills(self, person_id: str):
         """
         Devuelve todas las habilidades de una persona con su nivel.
@@ -572,6 +862,25 @@ class Neo4jRepository:
         with self.driver.session() as session:
             session.run(q, cid=course_id, sname=skill_name, nivelMin=nivelMin).consume()
 
+    def link_course_to_skills(self, course_id: str, skills: list[dict], replace: bool = False):
+        """
+        Vincula varias skills a un curso en una sola sentencia (UNWIND).
+        skills = [{"nombre": "Python", "nivelMin": 2}, ...]
+        """
+        q = """
+        MATCH (c:Course {id:$cid})
+        OPTIONAL MATCH (c)-[old:ENSEÑA]->(:Skill)
+        WITH c, COLLECT(old) AS previas
+        FOREACH (vieja IN CASE WHEN $replace THEN previas ELSE [] END | DELETE vieja)
+        WITH c
+        UNWIND $skills AS skill
+        MERGE (s:Skill {nombre:skill.nombre})
+        MERGE (c)-[r:ENSEÑA]->(s)
+        SET r.nivelMin=skill.nivelMin
+        """
+        with self.driver.session() as session:
+            session.run(q, cid=course_id, skills=skills, replace=replace).consume()
+
     def delete_course_skill_links(self, course_id: str):
         q = "MATCH (:Course {id:$cid})-[r:ENSEÑA]->(:Skill) DELETE r"
         with self.driver.session() as session:
@@ -662,3 +971,14 @@ class Neo4jRepository:
                         nombre=nombre,
                         rol=rol
                     )
+
+
+if __name__ == "__main__":
+    # python -m src.repositories.neo4j_repository  → constraints + reporte EXPLAIN
+    from dotenv import load_dotenv
+    load_dotenv()
+    repo = Neo4jRepository()
+    repo.ensure_schema()
+    for row in repo.explain_lookups():
+        estado = "ok" if row["ok"] else "SCAN"
+        print(f"{estado:5} {row['query']:28} {' > '.join(row['operators'])}")
@@ -1,6 +1,8 @@
 from src.config.database import get_redis_client
-import json
+import time
 from typing import Optional, Dict, Any
+from src.repositories.async_redis_repository import PERSON_CACHE_TTL_SECONDS
+from bson import json_util
 
 
 class RedisRepository:
@@ -10,28 +12,41 @@ class RedisRepository:
     Mantiene métodos de caché y ranking.
     """
 
-    def _init_(self):
+    def __init__(self):
         # 🔗 Conectarse a Redis usando la función global
         self.client = get_redis_client()
 
     # ===============================================================
     # 🧍 Caching de personas
     # ===============================================================
-    def cache_person(self, person_id: str, data: Dict[str, Any], ttl_minutes: int = 10):
-        """Guarda el perfil de una persona en caché (JSON) durante X minutos."""
-        key = f"cache:person:{person_id}"
-        self.client.setex(key, ttl_minutes * 60, json.dumps(data))
+    @staticmethod
+    def _person_keys(*ids: Any) -> list[str]:
+        return [f"cache:person:{i}" for i in dict.fromkeys(str(i) for i in ids if i)]
+
+    def cache_person(self, data: Dict[str, Any], ttl_seconds: Optional[int] = None):
+        """Guarda el perfil (Extended JSON, conserva datetime/ObjectId) bajo su _id y su userId."""
+        if not data:
+            return
+        keys = self._person_keys(data.get("_id"), data.get("userId"))
+        if not keys:
+            return
+        ttl = ttl_seconds or PERSON_CACHE_TTL_SECONDS
+        payload = json_util.dumps(data)
+        pipe = self.client.pipeline(transaction=False)
+        for key in keys:
+            pipe.setex(key, ttl, payload)
+        pipe.execute()
 
     def get_cached_person(self, person_id: str) -> Optional[Dict[str, Any]]:
-        """Obtiene el perfil cacheado, o None si expiró."""
-        key = f"cache:person:{person_id}"
-        cached = self.client.get(key)
-        return json.loads(cached) if cached else None
+        """Obtiene el perfil cacheado (por _id o userId), o None si expiró."""
+        cached = self.client.get(f"cache:person:{person_id}")
+        return json_util.loads(cached) if cached else None
 
-    def invalidate_person(self, person_id: str):
-        """Elimina manualmente la caché de una persona."""
-        key = f"cache:person:{person_id}"
-        self.client.delete(key)
+    def invalidate_person(self, *person_ids: Any):
+        """Elimina la caché de una persona (pasar _id y userId)."""
+        keys = self._person_keys(*person_ids)
+        if keys:
+            self.client.delete(*keys)
 
     # ===============================================================
     # 🧠 Rankings por empleo (ZSET)
@@ -46,8 +61,16 @@ class RedisRepository:
             for pid, score in ranking_data
         ]
 
-    def set_job_ranking(self, job_id: str, ranking_dict: Dict[str, float], ttl_minutes: int = 15):
-        """Guarda un ranking de afinidad en un ZSET (expira en X minutos)."""
+    def set_job_ranking(self, job_id: str, ranking_dict: Dict[str, float], ttl_minutes: int = 15,
+                        stale_minutes: int = 0):
+        """Reemplaza el ranking de afinidad del ZSET (vence en X minutos); ver AsyncRedisRepository."""
         key = f"match:job:{job_id}:top"
-        self.client.zadd(key, ranking_dict)
-        self.client.expire(key, ttl_minutes * 60)
\ No newline at end of file
+        ttl = ttl_minutes * 60
+        hard_ttl = ttl + stale_minutes * 60
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(key)
+        if ranking_dict:
+            pipe.zadd(key, ranking_dict)
+            pipe.expire(key, hard_ttl)
+        pipe.set(f"{key}:calculado", time.time() + ttl, ex=hard_ttl)
+        pipe.execute()
\ No newline at end of file
@@ -18,3 +18,10 @@ class UserRepository:
         }
         res = self.collection.insert_one(doc)
         return str(res.inserted_id)
+
+    def update_password_hash(self, user_id, old_hash: str, new_hash: str) -> bool:
+        res = self.collection.update_one(
+            {"_id": user_id, "password_hash": old_hash},
+            {"$set": {"password_hash": new_hash}},
+        )
+        return res.modified_count == 1
@@ -1,34 +1,42 @@
+import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from src.repositories.mongo_repository import MongoRepository
-from src.repositories.neo4j_repository import Neo4jRepository
-from src.repositories.mongo_repository import MongoRepository
+from src.repositories.async_mongo_repository import AsyncMongoRepository
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, graph_op
+from src.repositories.async_redis_repository import AsyncRedisRepository
 
 
 class ApplicationService:
     def __init__(self):
-        self.repo = MongoRepository("applications")
-        self.graph_repo = Neo4jRepository()
-        self.jobs_repo = MongoRepository("jobs")
-        self.people_repo = MongoRepository("people")
+        self.repo = AsyncMongoRepository("applications")
+        self.graph_repo = AsyncNeo4jRepository()
+        self.jobs_repo = AsyncMongoRepository("jobs")
+        self.people_repo = AsyncMongoRepository("people")
+        self.outbox = AsyncOutboxRepository()
+        self.redis_repo = AsyncRedisRepository()
 
     # ===============================================================
     # 📋 LISTADOS
     # ===============================================================
-    def get_by_person(self, person_id: str) -> List[Dict[str, Any]]:
+    async def get_by_person(self, person_id: str) -> List[Dict[str, Any]]:
         query = {"$or": [{"person_id": person_id}, {"person_user_id": person_id}]}
-        return self.repo.find(query)
+        return await self.repo.find(query)
 
-    def get_by_job(self, job_id: str) -> List[Dict[str, Any]]:
-        return self.repo.find({"job_id": job_id})
+    async def get_by_job(self, job_id: str) -> List[Dict[str, Any]]:
+        return await self.repo.find({"job_id": job_id})
 
-    def get(self, application_id: str) -> Optional[Dict[str, Any]]:
-        return self.repo.find_one(application_id)
+    def export(self, projection: Optional[Dict[str, Any]] = None, batch_size: int = 1000):
+        """Iterador async sobre toda la colección applications (para exportar en streaming)."""
+        return self.repo.stream({}, projection=projection, batch_size=batch_size)
+
+    async def get(self, application_id: str) -> Optional[Dict[str, Any]]:
+        return await self.repo.find_one(application_id)
 
     # ===============================================================
     # 🔁 ESTADOS + Neo4j Sync
     # ===============================================================
-    def update_estado(self, application_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def update_estado(self, application_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Actualiza el estado actual y lo refleja en Neo4j con relaciones.
         data = {"estado": "en entrevista", "observacion": "Primera entrevista con RRHH"}
@@ -44,91 +52,87 @@ class ApplicationService:
             "observacion": observacion
         }
 
-        # Buscar la postulación para obtener person_id y job_id
-        app_doc = self.repo.find_one(application_id)
-        if not app_doc:
-            raise Exception("No se encontró la postulación")
-
-        # En la colección applications guardamos tanto person_id (mongo _id)
-        # como person_user_id (userId usado para nodos Neo4j). Para sincronizar
-        # con Neo4j debemos preferir person_user_id cuando exista.
-        person_id = app_doc.get("person_id")
-        person_user_id = app_doc.get("person_user_id")
-        node_person_id = person_user_id or person_id
-        job_id = app_doc["job_id"]
-
-        # 1️⃣ Actualizar estado en Mongo
-        updated = self.repo.update(application_id, {
-            "estado_actual": estado,
-            "actualizadoEn": datetime.utcnow()
-        })
-
-        # 2️⃣ Agregar al historial
-        self.repo.add_to_array(application_id, "historial_estados", nuevo_estado)
-
-        # 3️⃣ Reflejar en Neo4j
-        try:
-            # Limpiar relaciones previas de proceso (opcional)
-            self.graph_repo.delete_relationship(node_person_id, job_id, rel_type=None)
-
-            estado_map = {
-                "en entrevista": "EN_ENTREVISTA_CON",
-                "evaluado": "EVALUADO_PARA",
-                "oferta": "OFERTA_DE",
-                "contratado": "TRABAJA_EN",
-                "rechazado": "RECHAZADO_EN",
-                "postulado": "POSTULA_A"
-            }
-
-            rel_type = estado_map.get(estado.lower(), "EN_PROCESO")
-
-            # Crear relación base Persona → Job (usar node_person_id)
-            self.graph_repo.create_relationship(node_person_id, job_id, rel_type)
-
-            # Si es contratado, crear vínculo laboral permanente TRABAJA_EN y guardar experiencia en Mongo
-            if estado.lower() == "contratado":
-                job_doc = self.jobs_repo.find_one(job_id)
-                empresa_id = job_doc.get("empresaId") if job_doc else None
-                if empresa_id:
-                    # Crear relación laboral permanente TRABAJA_EN hacia la empresa
-                    try:
-                        self.graph_repo.create_relationship(node_person_id, empresa_id, "TRABAJA_EN")
-                    except Exception:
-                        # No queremos que la falla en esta relación impida la respuesta principal
-                        pass
-
-                    # Actualizar experiencia en el documento people (MongoDB)
-                    try:
-                        # person_id (mongo) preferible para update
-                        pid = person_id or person_user_id
-                        person = self.people_repo.find_one(pid)
-                        if person is not None:
-                            experiencia = person.get("experiencia", [])
-                            # construir nuevo entry
-                            started = datetime.utcnow().isoformat()
-                            role = None
-                            if job_doc:
-                                role = job_doc.get("titulo")
-                            entry = {"companyId": empresa_id, "rol": role, "startedAt": started}
-                            # evitar duplicados simples (mismo companyId y rol)
-                            exists = any((e.get("companyId") == empresa_id and e.get("rol") == role) for e in experiencia)
-                            if not exists:
-                                experiencia.append(entry)
-                                self.people_repo.update(pid, {"experiencia": experiencia})
-                    except Exception as e:
-                        print(f"⚠️ Error actualizando experiencia en Mongo: {e}")
-
-        except Exception as e:
-            print(f"⚠️ Error sincronizando estado en Neo4j: {e}")
+        estado_map = {
+            "en entrevista": "EN_ENTREVISTA_CON",
+            "evaluado": "EVALUADO_PARA",
+            "oferta": "OFERTA_DE",
+            "contratado": "TRABAJA_EN",
+            "rechazado": "RECHAZADO_EN",
+            "postulado": "POSTULA_A"
+        }
+        rel_type = estado_map.get(estado.lower(), "EN_PROCESO")
+        contratado = estado.lower() == "contratado"
+
+        async def _write(session):
+            # 1️⃣ Estado + historial en un único update atómico (devuelve el documento final)
+            updated = await self.repo.update_by_id(application_id, {
+                "$set": {"estado_actual": estado, "actualizadoEn": datetime.utcnow()},
+                "$push": {"historial_estados": nuevo_estado},
+            }, session=session)
+            if not updated:
+                raise Exception("No se encontró la postulación")
+
+            # En la colección applications guardamos tanto person_id (mongo _id)
+            # como person_user_id (userId usado para nodos Neo4j). Para sincronizar
+            # con Neo4j debemos preferir person_user_id cuando exista.
+            node_person_id = updated.get("person_user_id") or updated.get("person_id")
+            job_id = updated["job_id"]
+
+            # Si es contratado, vínculo laboral permanente TRABAJA_EN (y experiencia en Mongo, abajo)
+            empresa_id = role = None
+            if contratado:
+                empresa_id = updated.get("empresa_id")
+                role = updated.get("job_titulo")
+                if not empresa_id:
+                    # postulaciones anteriores a guardar empresa_id: buscar el job
+                    job_doc = await self.jobs_repo.find_one(job_id, session=session)
+                    empresa_id = job_doc.get("empresaId") if job_doc else None
+                    role = job_doc.get("titulo") if job_doc else None
+
+            # 2️⃣ Reflejar en Neo4j (vía outbox, misma transacción): el swap de relaciones
+            #    es una sola transacción en el projector
+            await self.outbox.append([
+                graph_op("set_application_state", person_id=node_person_id, job_id=job_id,
+                         rel_type=rel_type, company_id=empresa_id),
+            ], clave=f"person:{node_person_id}", session=session)
+            return updated, empresa_id, role
+
+        updated, empresa_id, role = await self.outbox.transaction(_write)
+        person_id = updated.get("person_id")
+        person_user_id = updated.get("person_user_id")
+
+        # 3️⃣ Experiencia en el perfil (best-effort, fuera de la transacción)
+        if contratado and empresa_id and (person_id or person_user_id):
+            try:
+                if not person_id:
+                    # postulaciones que solo guardaron el userId: resolver la persona
+                    found = await self.people_repo.find({"userId": person_user_id}, limit=1,
+                                                        projection={"_id": 1})
+                    person_id = found[0]["_id"] if found else None
+                if not person_id:
+                    raise LookupError(f"no hay persona con userId {person_user_id}")
+                entry = {"companyId": empresa_id, "rol": role, "startedAt": datetime.utcnow().isoformat()}
+                # push condicionado: no duplica (companyId, rol) aunque startedAt difiera
+                added = await self.people_repo.update_by_id(
+                    person_id,
+                    {"$push": {"experiencia": entry}, "$set": {"actualizadoEn": datetime.utcnow()}},
+                    return_doc=False,
+                    extra_filter={"experiencia": {"$not": {"$elemMatch": {"companyId": empresa_id, "rol": role}}}},
+                )
+                if added:
+                    # mantener coherente la caché de perfiles
+                    await self.redis_repo.invalidate_person(person_id, person_user_id)
+            except Exception as e:
+                logging.warning(f"⚠️ Error actualizando experiencia en Mongo: {e}")
 
         return updated
 
     # ===============================================================
     # 💬 FEEDBACK
     # ===============================================================
-    def agregar_feedback(self, application_id: str, feedback: Dict[str, Any]) -> Dict[str, Any]:
+    async def agregar_feedback(self, application_id: str, feedback: Dict[str, Any]) -> Dict[str, Any]:
         feedback["fecha"] = datetime.utcnow()
-        updated = self.repo.add_to_array(application_id, "feedback", feedback)
+        updated = await self.repo.add_to_array(application_id, "feedback", feedback)
         if not updated:
             raise Exception("Error al agregar feedback")
         return updated
@@ -136,32 +140,30 @@ class ApplicationService:
     # ===============================================================
     # 💼 OFERTA
     # ===============================================================
-    def enviar_oferta(self, application_id: str, datos_oferta: Dict[str, Any]) -> Dict[str, Any]:
+    async def enviar_oferta(self, application_id: str, datos_oferta: Dict[str, Any]) -> Dict[str, Any]:
         datos_oferta["fecha_envio"] = datetime.utcnow()
-        updated = self.repo.update(application_id, {
-            "oferta": datos_oferta,
-            "estado_actual": "oferta",
-            "actualizadoEn": datetime.utcnow()
-        })
-
-        # Agregar al historial y reflejar en Neo4j
-        self.repo.add_to_array(application_id, "historial_estados", {
-            "estado": "oferta",
-            "fecha": datetime.utcnow(),
-            "observacion": "Oferta enviada al candidato"
-        })
 
-        try:
-            app_doc = self.repo.find_one(application_id)
+        async def _write(session):
+            # Oferta + estado + historial en un único update (devuelve el documento final)
+            app_doc = await self.repo.update_by_id(application_id, {
+                "$set": {"oferta": datos_oferta, "estado_actual": "oferta", "actualizadoEn": datetime.utcnow()},
+                "$push": {"historial_estados": {
+                    "estado": "oferta",
+                    "fecha": datetime.utcnow(),
+                    "observacion": "Oferta enviada al candidato"
+                }},
+            }, session=session)
+
             if app_doc:
-                person_user_id = app_doc.get("person_user_id")
-                person_id = app_doc.get("person_id")
-                node_person_id = person_user_id or person_id
-                job_id = app_doc["job_id"]
-                self.graph_repo.create_relationship(node_person_id, job_id, "OFERTA_DE")
-        except Exception as e:
-            print(f"⚠️ Error reflejando oferta en Neo4j: {e}")
+                node_person_id = app_doc.get("person_user_id") or app_doc.get("person_id")
+                await self.outbox.append([
+                    graph_op("create_labelled_relationship", src_label="Person", source_id=node_person_id,
+                             tgt_label="Job", target_id=app_doc["job_id"], rel_type="OFERTA_DE")
+                ], clave=f"person:{node_person_id}", session=session)
+            return app_doc
 
-        if not updated:
+        app_doc = await self.outbox.transaction(_write)
+
+        if not app_doc:
             raise Exception("Error al registrar oferta")
-        return updated
+        return app_doc
@@ -7,21 +7,17 @@ import logging
 
 from bson import ObjectId
 
-from src.repositories.mongo_repository import MongoRepository
-from src.repositories.neo4j_repository import Neo4jRepository
+from src.repositories.async_mongo_repository import AsyncMongoRepository
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, graph_op
 
 
 class CourseService:
     def __init__(self) -> None:
-        self.repo = MongoRepository("courses")
-        self.graph = Neo4jRepository()
-        # índice único por slug (ignora si ya existe)
-        try:
-            # muchos repos exponen .collection (pymongo)
-            if getattr(self.repo, "collection", None):
-                self.repo.collection.create_index("slug", unique=True)
-        except Exception:
-            pass
+        self.repo = AsyncMongoRepository("courses")
+        self.graph = AsyncNeo4jRepository()
+        self.outbox = AsyncOutboxRepository()
+        # el índice único por slug vive en src/config/indexes.py
 
     # -------------------- helpers internos --------------------
     def _now(self) -> str:
@@ -52,8 +48,16 @@ class CourseService:
             doc["id"] = str(doc.pop("_id"))
         return doc
 
+    def _graph_skills(self, skills: List[Any]) -> List[Dict[str, Any]]:
+        """Filtra skillsOtorgadas al formato [{nombre, nivelMin}] que espera Neo4j."""
+        return [
+            {"nombre": s["nombre"], "nivelMin": s.get("nivelMin")}
+            for s in skills
+            if isinstance(s, dict) and s.get("nombre")
+        ]
+
     # -------------------- CRUD --------------------
-    def create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         # 1) Normalizamos/validamos entrada
         course: Dict[str, Any] = {
             "titulo": payload["titulo"],
@@ -66,25 +70,26 @@ class CourseService:
             "updatedAt": self._now(),
         }
 
-        # 2) Persistimos en Mongo
-        inserted = self.repo.create(course)
-        course_id = self._extract_id(inserted)
-        course["id"] = course_id
-        course.pop("_id", None)  # blindaje contra ObjectId en respuesta
+        # 2) Persistimos en Mongo y encolamos los side-effects de Neo4j en la misma transacción
+        async def _write(session):
+            inserted = await self.repo.create(course, session=session)
+            course_id = self._extract_id(inserted)
 
-        # 3) Side-effects en Neo4j (no deben romper la API)
-        try:
+            # 3) Side-effects en Neo4j vía outbox (los proyecta el worker)
             proveedor = (course.get("metadata") or {}).get("proveedor")
-            self.graph.create_course_node(course_id, course["titulo"], proveedor)
-            for s in course.get("skillsOtorgadas", []):
-                if isinstance(s, dict) and s.get("nombre"):
-                    self.graph.link_course_to_skill(course_id, s["nombre"], s.get("nivelMin"))
-        except Exception as e:
-            logging.warning(f"[courses.create] Neo4j omitido por error: {e}")
+            ops = [graph_op("create_course_node", course_id=course_id, titulo=course["titulo"], proveedor=proveedor)]
+            skills = self._graph_skills(course.get("skillsOtorgadas", []))
+            if skills:
+                ops.append(graph_op("link_course_to_skills", course_id=course_id, skills=skills))
+            await self.outbox.append(ops, clave=f"course:{course_id}", session=session)
+            return course_id
+
+        course["id"] = await self.outbox.transaction(_write)
+        course.pop("_id", None)  # blindaje contra ObjectId en respuesta
 
         return course
 
-    def list(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    async def list(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         q: Dict[str, Any] = {}
         if filters:
             if filters.get("q"):
@@ -94,9 +99,16 @@ class CourseService:
             if filters.get("dificultad"):
                 q["metadata.dificultad"] = filters["dificultad"]
 
-        # Si tu repo.find no soporta limit/skip/sort por parámetros,
-        # igual funciona con solo el query.
-        items = self.repo.find(q)
+        # Paginación en Mongo: keyset (after) u offset; nunca se materializa la colección
+        limit, offset, after = 20, 0, None
+        if filters:
+            try:
+                limit = int(filters.get("limit", 20))
+                offset = int(filters.get("offset", 0))
+            except Exception:
+                pass
+            after = filters.get("after")
+        items = await self.repo.find(q, limit=limit, after=after, skip=0 if after else offset)
 
         # Normalizamos ids
         cleaned: List[Dict[str, Any]] = []
@@ -106,22 +118,13 @@ class CourseService:
                 it["id"] = str(it.pop("_id"))
             cleaned.append(it)
 
-        # Paginación simple (si la querés aplicar desde filtros)
-        if filters:
-            try:
-                offset = int(filters.get("offset", 0))
-                limit = int(filters.get("limit", 20))
-                cleaned = cleaned[offset: offset + limit]
-            except Exception:
-                pass
-
         return cleaned
 
-    def get(self, course_id: str) -> Optional[Dict[str, Any]]:
-        doc = self.repo.find_one(course_id)
+    async def get(self, course_id: str) -> Optional[Dict[str, Any]]:
+        doc = await self.repo.find_one(course_id)
         return self._clean_doc(doc)
 
-    def update(self, course_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def update(self, course_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         updates = dict(updates or {})
         updates["updatedAt"] = self._now()
 
@@ -129,43 +132,39 @@ class CourseService:
         # ✅ Ahora: enviamos un update con operador
         mongo_update = {"$set": updates}
 
-        # si tu repo tiene update_by_id, usalo; si no, usa update tal cual
-        if hasattr(self.repo, "update_by_id"):
-            doc = self.repo.update_by_id(course_id, mongo_update)
-        else:
-            doc = self.repo.update(course_id, mongo_update)
+        async def _write(session):
+            doc = await self.repo.update_by_id(course_id, mongo_update, session=session)
+            out = self._clean_doc(doc)
+            if not out:
+                return None
 
-        out = self._clean_doc(doc)
-        if not out:
-            return None
-
-        # ---- Sincronía Neo4j (best-effort) ----
-        try:
+            # ---- Sincronía Neo4j (eventual, vía outbox, misma transacción) ----
+            ops: List[Dict[str, Any]] = []
             # refrescar nodo solo si cambió titulo o proveedor
             if "titulo" in updates or "metadata" in updates:
                 titulo = updates.get("titulo", out.get("titulo"))
                 proveedor = (updates.get("metadata") or out.get("metadata") or {}).get("proveedor") \
                             if isinstance(updates.get("metadata") or out.get("metadata"), dict) else None
                 if titulo is not None:
-                    self.graph.create_course_node(course_id, titulo, proveedor)
+                    ops.append(graph_op("create_course_node", course_id=course_id, titulo=titulo, proveedor=proveedor))
 
             # si cambiaron las skills, refrescar relaciones
             if "skillsOtorgadas" in updates and isinstance(out.get("skillsOtorgadas"), list):
-                self.graph.delete_course_skill_links(course_id)
-                for s in out["skillsOtorgadas"]:
-                    if isinstance(s, dict) and s.get("nombre"):
-                        self.graph.link_course_to_skill(course_id, s["nombre"], s.get("nivelMin"))
-        except Exception as e:
-            logging.warning(f"[courses.update] Neo4j omitido por error: {e}")
-
-        return out
-
-
-    def delete(self, course_id: str) -> bool:
-        # Borramos primero en Neo4j (DETACH borra relaciones)
-        try:
-            self.graph.delete_course_node(course_id)
-        except Exception as e:
-            logging.warning(f"[courses.delete] Neo4j omitido por error: {e}")
-        # Luego en Mongo
-        return bool(self.repo.delete(course_id))
+                ops.append(graph_op("link_course_to_skills", course_id=course_id,
+                                    skills=self._graph_skills(out["skillsOtorgadas"]), replace=True))
+            await self.outbox.append(ops, clave=f"course:{course_id}", session=session)
+            return out
+
+        return await self.outbox.transaction(_write)
+
+
+    async def delete(self, course_id: str) -> bool:
+        # Borramos en Mongo y encolamos el borrado en Neo4j (DETACH borra relaciones)
+        async def _write(session):
+            deleted = bool(await self.repo.delete(course_id, session=session))
+            if deleted:
+                await self.outbox.append([graph_op("delete_course_node", course_id=course_id)],
+                                         clave=f"course:{course_id}", session=session)
+            return deleted
+
+        return await self.outbox.transaction(_write)
@@ -4,28 +4,35 @@
 from typing import Any, Dict, List, Optional
 from datetime import datetime
 import logging
-from bson import ObjectId
 
-from src.repositories.mongo_repository import MongoRepository
-from src.repositories.neo4j_repository import Neo4jRepository
+from pymongo.errors import DuplicateKeyError
+
+from src.repositories.async_mongo_repository import AsyncMongoRepository
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, graph_op
+from src.repositories.async_redis_repository import AsyncRedisRepository
 
 
 class EnrollmentService:
         def __init__(self):
-            self.repo = MongoRepository("enrollments")
-            self.people = MongoRepository("people")
-            self.courses = MongoRepository("courses")
-            self.graph = Neo4jRepository()
-            try:
-                # índices útiles (si ya existen, ignora)
-                self.repo.col.create_index([("personId", 1), ("courseId", 1)], unique=True)
-                self.repo.col.create_index("personId")
-            except Exception:
-                pass
+            self.repo = AsyncMongoRepository("enrollments")
+            self.people = AsyncMongoRepository("people")
+            self.courses = AsyncMongoRepository("courses")
+            self.graph = AsyncNeo4jRepository()
+            self.outbox = AsyncOutboxRepository()
+            self.redis_repo = AsyncRedisRepository()
+            # índices (personId+courseId único): ver src/config/indexes.py
 
         def _now(self) -> str:
             return datetime.utcnow().isoformat()
 
+        async def _node_person_id(self, doc: Dict[str, Any], session=None) -> str:
+            """Id del nodo Person: personUserId del enrollment (o, en los anteriores, el userId de people)."""
+            if doc.get("personUserId"):
+                return doc["personUserId"]
+            person = await self.people.find_one(doc["personId"], session=session)
+            return (person or {}).get("userId") or doc["personId"]
+
         def _clean(self, doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
             if not doc:
                 return None
@@ -35,18 +42,54 @@ class EnrollmentService:
                 d["id"] = str(d.pop("_id"))
             return d
 
+        async def _set_person_curso(self, person_id: str, course_id: str,
+                                    fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            """
+            Actualiza (o agrega) la entrada de `course_id` en people.cursos sin
+            reescribir el arreglo: $set posicional si existe, si no $push
+            condicionado a que no exista (seguro ante llamadas concurrentes).
+            Devuelve el documento de la persona (None si no existe) y refresca la caché.
+            """
+            now = datetime.utcnow()
+            positional = {f"cursos.$.{k}": v for k, v in fields.items()}
+            positional["actualizadoEn"] = now
+            for _ in range(2):
+                doc = await self.people.update_by_id(person_id, {"$set": positional},
+                                                     extra_filter={"cursos.cursoId": course_id})
+                if doc:
+                    break
+                entry = {"cursoId": course_id, "certificacion": None, **fields}
+                doc = await self.people.update_by_id(
+                    person_id,
+                    {"$push": {"cursos": entry}, "$set": {"actualizadoEn": now}},
+                    extra_filter={"cursos.cursoId": {"$ne": course_id}},
+                )
+                if doc:
+                    break
+                # o la persona no existe, o otra request agregó el curso entre medio: reintentar el $set
+            if doc:
+                # mantener coherente la caché de perfiles
+                await self.redis_repo.cache_person(doc)
+            return doc
+
         # -------------------- API --------------------
 
-        def enroll(self, person_id: str, course_id: str) -> Dict[str, Any]:
-            # Validaciones mínimas (existencia)
-            person_doc = self.people.find_one(person_id)
+        async def enroll(self, person_id: str, course_id: str,
+                         person_doc: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+            # Validaciones mínimas (existencia); `person_doc` ya resuelto evita releer la persona
+            if person_doc is None:
+                person_doc = await self.people.find_one(person_id)
             if not person_doc:
                 raise ValueError("Person no existe")
-            if not self.courses.find_one(course_id):
+            if not await self.courses.find_one(course_id):
                 raise ValueError("Course no existe")
 
+            # Determinar el id del nodo Person en Neo4j: preferimos userId (si existe);
+            # queda guardado en el enrollment para no releer la persona en progress/complete
+            node_person_id = person_doc.get("userId") or person_id
             payload = {
                 "personId": person_id,
+                "personUserId": person_doc.get("userId"),
                 "courseId": course_id,
                 "estado": "No empezó",
                 "progreso": 0,
@@ -55,52 +98,40 @@ class EnrollmentService:
                 "updatedAt": self._now(),
             }
 
+            async def _write(session):
+                created = await self.repo.create(payload, session=session)
+                # Neo4j: una sola relación INSCRIPTO_EN con props (vía outbox, misma transacción),
+                # upsert con progreso=0 y estado "No empezó"
+                await self.outbox.append([
+                    graph_op("upsert_inscripcion", person_id=node_person_id, course_id=course_id,
+                             progreso=0, estado="No empezó")
+                ], clave=f"person:{node_person_id}", session=session)
+                return created
+
             try:
-                created = self.repo.create(payload)  # tu repo suele devolver el doc
+                created = await self.outbox.transaction(_write)
                 out = self._clean(created) or payload
-            except Exception:
-                # Si hay duplicado (índice único personId+courseId), devolvemos el existente
-                doc = self.repo.col.find_one({"personId": person_id, "courseId": course_id})
+            except DuplicateKeyError:
+                # Ya inscripto (índice único personId+courseId): devolvemos el existente
+                doc = await self.repo.col.find_one({"personId": person_id, "courseId": course_id})
                 out = self._clean(doc) or {}
 
             # --- Actualizar el modelo people en MongoDB ---
             try:
-                # Buscar persona
-                person_doc = self.people.find_one(person_id)
-                if person_doc is not None:
-                    cursos = person_doc.get("cursos", [])
-                    # Buscar si ya existe el curso
-                    found = False
-                    for c in cursos:
-                        if c.get("cursoId") == course_id:
-                            c["estado"] = payload["estado"]
-                            found = True
-                            break
-                    if not found:
-                        cursos.append({"cursoId": course_id, "estado": payload["estado"], "certificacion": None})
-                    self.people.update(person_id, {"cursos": cursos})
+                await self._set_person_curso(person_id, course_id, {"estado": payload["estado"]})
             except Exception as e:
                 logging.warning(f"[enroll] No se pudo actualizar cursos en people: {e}")
 
-            # Neo4j: una sola relación INSCRIPTO_EN con props (best-effort)
-            try:
-                # Determinar el id del nodo Person en Neo4j: preferimos userId (si existe)
-                node_person_id = person_doc.get("userId") or person_id
-                # upsert con progreso=0 y estado "No empezó"
-                self.graph.upsert_inscripcion(node_person_id, course_id, progreso=0, estado="No empezó")
-            except Exception as e:
-                logging.warning(f"[enroll] Neo4j omitido por error: {e}")
-
             return out
 
 
-        def list_by_person(self, person_id: str) -> List[Dict[str, Any]]:
-            items = self.repo.find({"personId": person_id})
+        async def list_by_person(self, person_id: str) -> List[Dict[str, Any]]:
+            items = await self.repo.find({"personId": person_id})
             # si querés orden: items = list(self.repo.col.find({"personId": person_id}).sort("createdAt", -1))
             return [self._clean(i) for i in items if i]
 
 
-        def update_progress(self, enr_id: str, progreso: int, nota: Optional[int] = None) -> Dict[str, Any]:
+        async def update_progress(self, enr_id: str, progreso: int, nota: Optional[int] = None) -> Dict[str, Any]:
             progreso = int(progreso)
             if not (0 <= progreso <= 100):
                 raise ValueError("progreso debe estar entre 0 y 100")
@@ -116,59 +147,36 @@ class EnrollmentService:
             if nota is not None:
                 set_fields["nota"] = int(nota)
 
-            # Mongo: $set + $push (historial)
-            self.repo.col.update_one(
-                {"_id": ObjectId(enr_id)},
-                {
+            async def _write(session):
+                # Mongo: $set + $push (historial) en un round trip, devolviendo el documento
+                doc = await self.repo.update_by_id(enr_id, {
                     "$set": set_fields,
                     "$push": {"historial": {"ts": self._now(), "tipo": "progress", "detalle": f"{progreso}%"}},
-                },
-            )
-            doc = self.repo.find_one(enr_id)
-            if not doc:
-                raise ValueError("Enrollment no existe")
-
-            # Neo4j: actualizar progreso/estado en la MISMA relación INSCRIPTO_EN (best-effort)
+                }, session=session)
+                if not doc:
+                    raise ValueError("Enrollment no existe")
+
+                # Neo4j: actualizar progreso/estado en la MISMA relación INSCRIPTO_EN (vía outbox)
+                node_person_id = await self._node_person_id(doc, session=session)
+                await self.outbox.append([
+                    graph_op("set_inscripcion_progreso", person_id=node_person_id,
+                             course_id=doc["courseId"], progreso=progreso)
+                ], clave=f"person:{node_person_id}", session=session)
+                return doc
+
+            doc = await self.outbox.transaction(_write)
+
+            # --- Actualizar el atributo 'cursos' en el documento de la persona (best-effort) ---
+            # doc["personId"] almacena el _id de Mongo
             try:
-                # doc["personId"] almacena el _id de Mongo; traducir a node id si existe userId
-                person_mongo_id = doc.get("personId")
-                person_doc = self.people.find_one(person_mongo_id)
-                node_person_id = (person_doc.get("userId") if person_doc else None) or person_mongo_id
-                self.graph.set_inscripcion_progreso(node_person_id, doc["courseId"], progreso)
-            except Exception as e:
-                logging.warning(f"[progress] Neo4j omitido por error: {e}")
-
-            # --- Actualizar el atributo 'cursos' en el documento de la persona ---
-            try:
-                person_mongo_id = doc.get("personId")
-                if person_mongo_id:
-                    pdoc = self.people.find_one(person_mongo_id)
-                    if pdoc is not None:
-                        cursos = pdoc.get("cursos", [])
-                        found = False
-                        for c in cursos:
-                            if c.get("cursoId") == doc.get("courseId"):
-                                # actualizar sólo el estado, manteniendo la certificación si existe
-                                c["estado"] = estado
-                                found = True
-                                break
-                        if not found:
-                            cursos.append({"cursoId": doc.get("courseId"), "estado": estado, "certificacion": None})
-                        self.people.update(person_mongo_id, {"cursos": cursos})
+                await self._set_person_curso(doc.get("personId"), doc.get("courseId"), {"estado": estado})
             except Exception as e:
                 logging.warning(f"[progress] No se pudo actualizar cursos en people: {e}")
 
             return self._clean(doc) or {}
 
 
-        def complete(self, enr_id: str, nota: Optional[int] = None, certificacionUrl: Optional[str] = None) -> Dict[str, Any]:
-            # Leemos doc para obtener personId/courseId
-            curr = self.repo.find_one(enr_id)
-            if not curr:
-                raise ValueError("Enrollment no existe")
-            person_mongo_id = curr["personId"]
-            course_id = curr["courseId"]
-
+        async def complete(self, enr_id: str, nota: Optional[int] = None, certificacionUrl: Optional[str] = None) -> Dict[str, Any]:
             set_fields: Dict[str, Any] = {
                 "estado": "Completado",
                 "progreso": 100,
@@ -179,97 +187,81 @@ class EnrollmentService:
             if certificacionUrl:
                 set_fields["certificacionUrl"] = certificacionUrl
 
-            # Mongo: $set + $push (historial)
-            self.repo.col.update_one(
-                {"_id": ObjectId(enr_id)},
-                {
+            async def _write(session):
+                # Mongo: $set + $push (historial); el documento devuelto trae personId/courseId
+                doc = await self.repo.update_by_id(enr_id, {
                     "$set": set_fields,
                     "$push": {"historial": {"ts": self._now(), "tipo": "complete", "detalle": "curso completado"}},
-                },
-            )
-
-            # Neo4j: marcar completado en la MISMA relación INSCRIPTO_EN (best-effort)
-            try:
-                person_doc = self.people.find_one(person_mongo_id)
-                node_person_id = (person_doc.get("userId") if person_doc else None) or person_mongo_id
-                # Marcar completado en la relación INSCRIPTO_EN
-                self.graph.set_inscripcion_completa(
-                    node_person_id, course_id,
-                    nota=set_fields.get("nota"),
-                    certificacionUrl=set_fields.get("certificacionUrl"),
-                )
+                }, session=session)
+                if not doc:
+                    raise ValueError("Enrollment no existe")
+                course_id = doc["courseId"]
+
+                # El curso se lee una sola vez: skills otorgadas + datos de la certificación
+                course_doc = await self.courses.find_one(course_id, session=session)
+
+                # Neo4j: marcar completado en la MISMA relación INSCRIPTO_EN (vía outbox, misma transacción)
+                node_person_id = await self._node_person_id(doc, session=session)
+                ops = [graph_op("set_inscripcion_completa", person_id=node_person_id, course_id=course_id,
+                                nota=set_fields.get("nota"), certificacionUrl=set_fields.get("certificacionUrl"))]
+                person_skills = self._skills_otorgadas(course_doc)
+                if person_skills:
+                    # link_person_to_skills hace MERGE de los nodos Skill en una sola sentencia
+                    ops.append(graph_op("link_person_to_skills", person_id=node_person_id, skills=person_skills))
+                await self.outbox.append(ops, clave=f"person:{node_person_id}", session=session)
+                return doc, course_doc
+
+            doc, course_doc = await self.outbox.transaction(_write)
+
+            # construir objeto de certificación a insertar en el curso
+            # prioridad: certificacionUrl pasada en el request; si no existe, intentar extraer del course_doc
+            cert_url = set_fields.get("certificacionUrl")
+            cert_obj = None
+            if cert_url:
+                cert_obj = {"nombre": (course_doc.get("titulo") if course_doc else "Certificado"), "url": cert_url, "nota": set_fields.get("nota"), "emitidoEn": self._now()}
+            elif course_doc:
+                cinfo = course_doc.get("certificaciones") or (course_doc.get("metadata") or {}).get("certificaciones")
+                if cinfo:
+                    # tomar la primera certificación si existe
+                    first = cinfo[0]
+                    if isinstance(first, dict):
+                        cert_obj = {"nombre": first.get("nombre") or course_doc.get("titulo"), "url": first.get("url"), "nota": set_fields.get("nota"), "emitidoEn": self._now()}
+                    elif isinstance(first, str):
+                        cert_obj = {"nombre": first, "url": None, "nota": set_fields.get("nota"), "emitidoEn": self._now()}
 
-                # --- NUEVO: agregar las skills que otorga el curso a la persona ---
-                try:
-                    course_doc = self.courses.find_one(course_id)
-                    if course_doc:
-                        skills = course_doc.get("skillsOtorgadas") or []
-                        for s in skills:
-                            # soporta formato dict {"nombre":..., "nivelMin":...} o string
-                            if isinstance(s, dict):
-                                skill_name = s.get("nombre") or s.get("name")
-                                nivel = s.get("nivelMin") or s.get("nivel") or 1
-                            elif isinstance(s, str):
-                                skill_name = s
-                                nivel = 1
-                            else:
-                                continue
-
-                            if not skill_name:
-                                continue
-
-                            try:
-                                # link_person_to_skill hace MERGE del nodo Skill si hace falta
-                                self.graph.link_person_to_skill(node_person_id, skill_name, nivel=int(nivel))
-                            except Exception as e:
-                                logging.warning(f"[complete] fallo vinculando skill '{skill_name}' a persona {node_person_id}: {e}")
-                except Exception as e:
-                    logging.warning(f"[complete] No se pudieron asignar skills del curso en Neo4j: {e}")
-            except Exception as e:
-                logging.warning(f"[complete] Neo4j omitido por error: {e}")
-
-            doc = self.repo.find_one(enr_id)
             # --- Actualizar el atributo 'cursos' en el documento de la persona (estado = Completado) ---
+            curso_fields: Dict[str, Any] = {"estado": "Completado"}
+            if cert_obj:
+                curso_fields["certificacion"] = cert_obj
             try:
-                p = self.people.find_one(person_mongo_id)
-                if p is not None:
-                    cursos = p.get("cursos", [])
-                    found = False
-                    # construir objeto de certificación a insertar en el curso
-                    cert_url = set_fields.get("certificacionUrl")
-                    cert_obj = None
-                    try:
-                        course_doc = self.courses.find_one(course_id)
-                        # prioridad: certificacionUrl pasada en el request; si no existe, intentar extraer del course_doc
-                        if cert_url:
-                            cert_obj = {"nombre": (course_doc.get("titulo") if course_doc else "Certificado"), "url": cert_url, "nota": set_fields.get("nota"), "emitidoEn": self._now()}
-                        else:
-                            # intentar extraer una certificación desde el documento del curso
-                            if course_doc:
-                                cinfo = course_doc.get("certificaciones") or (course_doc.get("metadata") or {}).get("certificaciones")
-                                if cinfo:
-                                    # tomar la primera certificación si existe
-                                    first = cinfo[0]
-                                    if isinstance(first, dict):
-                                        cert_obj = {"nombre": first.get("nombre") or course_doc.get("titulo"), "url": first.get("url"), "nota": set_fields.get("nota"), "emitidoEn": self._now()}
-                                    elif isinstance(first, str):
-                                        cert_obj = {"nombre": first, "url": None, "nota": set_fields.get("nota"), "emitidoEn": self._now()}
-                    except Exception:
-                        cert_obj = cert_obj
-
-                    for c in cursos:
-                        if c.get("cursoId") == course_id:
-                            c["estado"] = "Completado"
-                            # insertar certificación dentro del curso
-                            if cert_obj:
-                                c["certificacion"] = cert_obj
-                            found = True
-                            break
-                    if not found:
-                        entry = {"cursoId": course_id, "estado": "Completado", "certificacion": cert_obj}
-                        cursos.append(entry)
-                    self.people.update(person_mongo_id, {"cursos": cursos})
+                await self._set_person_curso(doc["personId"], doc["courseId"], curso_fields)
             except Exception as e:
                 logging.warning(f"[complete] No se pudo actualizar cursos en people: {e}")
 
-            return self._clean(doc) or {}
\ No newline at end of file
+            return self._clean(doc) or {}
+
+        @staticmethod
+        def _skills_otorgadas(course_doc: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            """Skills que otorga el curso, normalizadas a [{"nombre", "nivel"}]."""
+            person_skills = []
+            for s in (course_doc or {}).get("skillsOtorgadas") or []:
+                # soporta formato dict {"nombre":..., "nivelMin":...} o string
+                if isinstance(s, dict):
+                    skill_name = s.get("nombre") or s.get("name")
+                    nivel = s.get("nivelMin") or s.get("nivel") or 1
+                elif isinstance(s, str):
+                    skill_name = s
+                    nivel = 1
+                else:
+                    continue
+
+                if not skill_name:
+                    continue
+                try:
+                    nivel = int(nivel)
+                except (TypeError, ValueError):
+                    # un nivel mal cargado en el curso no debe abortar el complete
+                    logging.warning(f"[complete] nivel inválido para skill {skill_name!r}: {nivel!r}")
+                    continue
+                person_skills.append({"nombre": skill_name, "nivel": nivel})
+            return person_skills
@@ -1,56 +1,67 @@
 from typing import Dict, Any, List, Optional
 from datetime import datetime
-from src.repositories.mongo_repository import MongoRepository
-from src.repositories.neo4j_repository import Neo4jRepository
-from src.utils.redis_stats import record_application
+from src.repositories.async_mongo_repository import AsyncMongoRepository
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, graph_op
+from src.services.people_service import PeopleService
+from src.utils.async_redis_stats import record_application
 
 
 class JobService:
-    def __init__(self):
-        self.repo = MongoRepository("jobs")
-        self.graph_repo = Neo4jRepository()
-        self.applications_repo = MongoRepository("applications")
+    def __init__(self, people: Optional[PeopleService] = None):
+        self.repo = AsyncMongoRepository("jobs")
+        self.graph_repo = AsyncNeo4jRepository()
+        self.applications_repo = AsyncMongoRepository("applications")
+        self.outbox = AsyncOutboxRepository()
+        # compartir la instancia del proceso cuando se inyecta (src/api/dependencies.py)
+        self.people = people or PeopleService()
+
+    @staticmethod
+    def _skill_ops(job_id: str, requisitos: Any, replace: bool = False) -> List[Dict[str, Any]]:
+        obligatorios = requisitos.get("obligatorios", []) if isinstance(requisitos, dict) else []
+        deseables = requisitos.get("deseables", []) if isinstance(requisitos, dict) else []
+        if not (obligatorios or deseables or replace):
+            return []
+        return [graph_op("link_job_to_skills", job_id=job_id, obligatorios=obligatorios,
+                         deseables=deseables, replace=replace)]
 
     # ===============================================================
     # 🏗️ CREATE
     # ===============================================================
-    def create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        job = self.repo.create(payload)
-        job_id = str(job["_id"])
-        try:
-            # 1️⃣ Crear nodo Job
-            self.graph_repo.create_job_node(
-                job_id=job_id,
-                titulo=payload["titulo"],
-                empresa_id=payload["empresaId"]
+    async def create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        async def _write(session):
+            job = await self.repo.create(payload, session=session)
+            job_id = str(job["_id"])
+            # Nodo Job + relaciones con Skills, proyectados en Neo4j por el worker del outbox
+            await self.outbox.append(
+                [graph_op("create_job_node", job_id=job_id, titulo=payload["titulo"], empresa_id=payload["empresaId"])]
+                + self._skill_ops(job_id, payload.get("requisitos", {})),
+                clave=f"job:{job_id}", session=session
             )
-            # 2️⃣ Crear relaciones con Skills
-            requisitos = payload.get("requisitos", {})
-            obligatorios = requisitos.get("obligatorios", []) if isinstance(requisitos, dict) else []
-            deseables = requisitos.get("deseables", []) if isinstance(requisitos, dict) else []
-            for skill in obligatorios:
-                self.graph_repo.link_job_to_skill(job_id, skill, tipo="REQUERIMIENTO_DE")
-            for skill in deseables:
-                self.graph_repo.link_job_to_skill(job_id, skill, tipo="DESEA")
-        except Exception as e:
-            print(f"⚠️ Error creando nodo Job y relaciones en Neo4j: {e}")
-        job["_id"] = job_id
-        return job
+            job["_id"] = job_id
+            return job
+
+        return await self.outbox.transaction(_write)
 
     # ===============================================================
     # 📋 LIST
     # ===============================================================
-    def list(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        jobs = self.repo.find(filters or {})
+    async def list(self, filters: Optional[Dict[str, Any]] = None, limit: Optional[int] = None,
+                   after: Optional[str] = None) -> List[Dict[str, Any]]:
+        jobs = await self.repo.find(filters or {}, limit=limit, after=after)
         for j in jobs:
             j["_id"] = str(j["_id"])
         return jobs
 
+    def export(self, projection: Optional[Dict[str, Any]] = None, batch_size: int = 1000):
+        """Iterador async sobre toda la colección jobs (para exportar en streaming)."""
+        return self.repo.stream({}, projection=projection, batch_size=batch_size)
+
     # ===============================================================
     # 🔎 GET BY ID
     # ===============================================================
-    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
-        job = self.repo.find_one(job_id)
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await self.repo.find_one(job_id)
         if job:
             job["_id"] = str(job["_id"])
         return job
@@ -58,80 +69,61 @@ class JobService:
     # ===============================================================
     # ✏️ UPDATE
     # ===============================================================
-    def update(self, job_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        updated = self.repo.update(job_id, updates)
-        if not updated:
-            return None
+    async def update(self, job_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async def _write(session):
+            updated = await self.repo.update(job_id, updates, session=session)
+            if not updated:
+                return None
 
-        updated["_id"] = str(updated["_id"])
+            updated["_id"] = str(updated["_id"])
 
-        # Sincronizar requisitos con Neo4j si cambiaron
-        try:
+            # Encolar la sincronización de requisitos con Neo4j si cambiaron
             if "requisitos" in updates:
-                self.graph_repo.delete_job_skill_links(job_id)
-                requisitos = updated.get("requisitos", {})
-                obligatorios = requisitos.get("obligatorios", []) if isinstance(requisitos, dict) else []
-                deseables = requisitos.get("deseables", []) if isinstance(requisitos, dict) else []
-                for skill in obligatorios:
-                    self.graph_repo.link_job_to_skill(job_id, skill, tipo="REQUERIMIENTO_DE")
-                for skill in deseables:
-                    self.graph_repo.link_job_to_skill(job_id, skill, tipo="DESEA")
-        except Exception as e:
-            print(f"⚠️ Error sincronizando Job en Neo4j: {e}")
+                await self.outbox.append(
+                    self._skill_ops(job_id, updated.get("requisitos", {}), replace=True),
+                    clave=f"job:{job_id}", session=session
+                )
+            return updated
 
-        return updated
+        return await self.outbox.transaction(_write)
 
     # ===============================================================
     # 🗑️ DELETE
     # ===============================================================
-    def delete(self, job_id: str) -> bool:
-        deleted = self.repo.delete(job_id)
-        if deleted:
-            try:
-                self.graph_repo.delete_node_by_id(job_id, label="Job")
-            except Exception:
-                pass
-        return bool(deleted)
+    async def delete(self, job_id: str) -> bool:
+        async def _write(session):
+            deleted = await self.repo.delete(job_id, session=session)
+            if deleted:
+                await self.outbox.append([graph_op("delete_node_by_id", node_id=job_id, label="Job")],
+                                         clave=f"job:{job_id}", session=session)
+            return bool(deleted)
+
+        return await self.outbox.transaction(_write)
 
-    def get_applicants(self, job_id: str):
+    async def get_applicants(self, job_id: str):
         try:
-            return self.graph_repo.get_applicants_for_job(job_id)
+            return await self.graph_repo.get_applicants_for_job(job_id)
         except Exception as e:
             raise Exception(f"Error obteniendo applicants desde Neo4j: {e}")
 
     # ===============================================================
     # 🧍 POSTULACIÓN (Person -> Job)
     # ===============================================================
-    def apply(self, person_id: str, job_id: str) -> Dict[str, Any]:
+    async def apply(self, person_id: str, job_id: str,
+                    person_doc: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
-        Crea la relación SE_POSTULO en Neo4j y un registro de Application en MongoDB.
+        Registra la Application en MongoDB y encola la relación POSTULA_A para Neo4j.
+        `person_doc` (p. ej. de get_current_person_ref) evita volver a buscar la persona.
         """
         try:
             # 🔹 1) Validar existencia del Job
-            if not self.graph_repo.node_exists("Job", job_id):
-                job_doc = self.repo.find_one(job_id)
-                if not job_doc:
-                    raise Exception("Job no encontrado en MongoDB")
-                self.graph_repo.create_job_node(
-                    job_id=job_id,
-                    titulo=job_doc.get("titulo", "Sin Título"),
-                    empresa_id=job_doc.get("empresaId")
-                )
+            job_doc = await self.repo.find_one(job_id)
+            if not job_doc:
+                raise Exception("Job no encontrado en MongoDB")
 
-            # 🔹 2) Localizar persona en Mongo (aceptamos person_id como userId o como _id)
-            people_repo = MongoRepository("people")
-            person_doc = None
-            try:
-                # 1) Intentar como _id (find_one espera _id)
-                person_doc = people_repo.find_one(person_id)
-            except Exception:
-                person_doc = None
-
-            if not person_doc:
-                # 2) Intentar encontrar por userId
-                found = people_repo.find({"userId": person_id})
-                if found:
-                    person_doc = found[0]
+            # 🔹 2) Localizar persona (caché → Mongo; aceptamos person_id como userId o como _id)
+            if person_doc is None:
+                person_doc = await self.people.find_person(person_id)
 
             if not person_doc:
                 raise Exception("Persona no encontrada en MongoDB")
@@ -141,14 +133,7 @@ class JobService:
             nombre = person_doc.get("datosPersonales", {}).get("nombre", "Desconocido")
             rol = person_doc.get("rol", "Sin Rol")
 
-            # Si el nodo Person no existe en Neo4j, crearlo
-            if not self.graph_repo.node_exists("Person", node_person_id):
-                self.graph_repo.create_person_node(person_id=node_person_id, nombre=nombre, rol=rol)
-
-            # 🔹 3) Crear relación SE_POSTULO en Neo4j usando el node id
-            self.graph_repo.apply_to_job(node_person_id, job_id)
-
-            # 🔹 4) Registrar la postulación en MongoDB usando el person _id (string)
+            # 🔹 3) Registrar la postulación en MongoDB usando el person _id (string)
             #    y también guardar el person_user_id (userId) si existe. Mantener ambos
             #    campos evita romper consultas y facilita migraciones.
             person_mongo_id = str(person_doc.get("_id"))
@@ -157,16 +142,33 @@ class JobService:
                 "person_id": person_mongo_id,
                 "person_user_id": person_user_id,
                 "job_id": job_id,
+                # desnormalizado para el paso a "contratado" (evita releer el job)
+                "empresa_id": job_doc.get("empresaId"),
+                "job_titulo": job_doc.get("titulo"),
                 "estado": "postulado",
                 "creadoEn": datetime.utcnow(),
                 "actualizadoEn": datetime.utcnow()
             }
-            application = self.applications_repo.create(data)
+            # 🔹 4) Encolar para Neo4j: nodos Job/Person (MERGE, por si aún no existen)
+            #    y la relación POSTULA_A usando el node id
+            ops = [graph_op("create_person_node", person_id=node_person_id, nombre=nombre, rol=rol),
+                   graph_op("apply_to_job", person_id=node_person_id, job_id=job_id)]
+            if job_doc.get("empresaId"):
+                ops.insert(0, graph_op("create_job_node", job_id=job_id,
+                                       titulo=job_doc.get("titulo", "Sin Título"),
+                                       empresa_id=job_doc.get("empresaId")))
+
+            async def _write(session):
+                application = await self.applications_repo.create(data, session=session)
+                await self.outbox.append(ops, clave=f"person:{node_person_id}", session=session)
+                return application
+
+            application = await self.outbox.transaction(_write)
 
             # Record statistics in Redis (applications per job/person)
             try:
                 stats_person_id = person_user_id or person_mongo_id
-                record_application(stats_person_id, job_id)
+                await record_application(stats_person_id, job_id)
             except Exception:
                 pass
 
@@ -1,35 +1,51 @@
+import logging
 from typing import Dict, Any, List, Optional
-from src.repositories.mongo_repository import MongoRepository
-from src.repositories.neo4j_repository import Neo4jRepository
-from src.repositories.redis_repository import RedisRepository
-from src.utils.redis_stats import record_connection, record_profile_view
+from bson import ObjectId
+from src.api.middleware.session_resolver import session_resolver
+from src.repositories.async_mongo_repository import AsyncMongoRepository
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_redis_repository import AsyncRedisRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, graph_op
+from src.services.recommendation_service import RecommendationService
+from src.utils.async_redis_stats import record_connection, record_profile_view
 
 
 class PeopleService:
     def __init__(self):
-        self.repo = MongoRepository("people")
-        self.graph_repo = Neo4jRepository()
-        self.redis_repo = RedisRepository()
+        self.repo = AsyncMongoRepository("people")
+        self.graph_repo = AsyncNeo4jRepository()
+        self.redis_repo = AsyncRedisRepository()
+        self.outbox = AsyncOutboxRepository()
+        self.recs = RecommendationService()
+
+    @staticmethod
+    def _normalize_skills(habilidades: List[Any]) -> List[Dict[str, Any]]:
+        """
+        Normaliza habilidades a [{"nombre": ..., "nivel": ...}].
+        Acepta tanto ["Python", "Cassandra"] como [{"nombre": "python", "nivel": 5}, ...]
+        """
+        skills = []
+        for skill in habilidades:
+            if isinstance(skill, str):
+                skills.append({"nombre": skill, "nivel": 1})
+            elif isinstance(skill, dict) and skill.get("nombre"):
+                skills.append({"nombre": skill["nombre"], "nivel": skill.get("nivel", 1)})
+        return skills
 
     # ==============================================
     # 👤 CRUD
     # ==============================================
     
-    def create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def create(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
-        Crea una persona en MongoDB y refleja su nodo + habilidades en Neo4j.
+        Crea una persona en MongoDB y encola su nodo + habilidades para Neo4j (outbox).
         Soporta:
           - "habilidades": ["Python", "Cassandra"]
           - "perfil.skills": [{"nombre": "python", "nivel": 5}, ...]
         """
-        person = self.repo.create(payload)
         # Prefer using provided userId (set by middleware/route) as the canonical person id
         # This keeps compatibility with auth register flow where Neo4j node id == user_id
         provided_user_id = payload.get("userId")
-        if provided_user_id:
-            person_id = str(provided_user_id)
-        else:
-            person_id = str(person["_id"])
     
         # 🧠 Extraer habilidades en ambos formatos
         habilidades = []
@@ -41,146 +57,203 @@ class PeopleService:
             # Formato con nivel: [{"nombre": "python", "nivel": 5}, ...]
             habilidades = payload["perfil"]["skills"]
     
-        try:
-            # 1️⃣ Crear nodo Persona
-            nombre = payload.get("datosPersonales", {}).get("nombre", "Desconocido")
-            rol = payload.get("rol", "Sin Rol")
-    
-            self.graph_repo.create_person_node(
-                person_id=person_id,
-                nombre=nombre,
-                rol=rol
-            )
-    
-            # 2️⃣ Vincular habilidades en Neo4j
-            if habilidades:
-                print(f"🧠 Vinculando habilidades: {habilidades}")
-                for skill in habilidades:
-                    if isinstance(skill, str):
-                        # Si la lista es simple ["Python", "Cassandra"]
-                        self.graph_repo.link_person_to_skill(
-                            person_id=person_id,
-                            skill_name=skill,
-                            nivel=1
-                        )
-                    elif isinstance(skill, dict):
-                        # Si viene como {"nombre": "python", "nivel": 5}
-                        nombre_skill = skill.get("nombre")
-                        nivel = skill.get("nivel", 1)
-                        if nombre_skill:
-                            self.graph_repo.link_person_to_skill(
-                                person_id=person_id,
-                                skill_name=nombre_skill,
-                                nivel=nivel
-                            )
-    
-        except Exception as e:
-            print(f"⚠️ Error sincronizando persona y habilidades en Neo4j: {e}")
-    
+        # Nodo Persona + habilidades en una sola transacción, proyectado por el worker
+        nombre = (payload.get("datosPersonales") or {}).get("nombre", "Desconocido")
+        rol = payload.get("rol", "Sin Rol")
+
+        async def _write(session):
+            person = await self.repo.create(payload, session=session)
+            person_id = str(provided_user_id) if provided_user_id else str(person["_id"])
+            await self.outbox.append([
+                graph_op("upsert_person_graph", person_id=person_id, nombre=nombre, rol=rol,
+                         skills=self._normalize_skills(habilidades), replace_skills=False)
+            ], clave=f"person:{person_id}", session=session)
+            return person
+
+        person = await self.outbox.transaction(_write)
         person["habilidades"] = habilidades
+        await self._cache(person)
+        if provided_user_id:
+            # sesiones abiertas antes de tener persona: apuntarlas al nuevo _id
+            await self._sync_sessions(str(provided_user_id), str(person["_id"]))
         return person
 
 
 
-    def list(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        return self.repo.find(filters)
+    async def list(self, filters: Dict[str, Any], limit: Optional[int] = None,
+                   after: Optional[str] = None) -> List[Dict[str, Any]]:
+        return await self.repo.find(filters, limit=limit, after=after)
+
+    def export(self, projection: Optional[Dict[str, Any]] = None, batch_size: int = 1000):
+        """Iterador async sobre toda la colección people (para exportar en streaming)."""
+        return self.repo.stream({}, projection=projection, batch_size=batch_size)
+
+    async def find_person(self, person_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Resuelve una persona por _id o por userId (read-through: Redis → Mongo).
+        No registra vistas de perfil.
+        """
+        try:
+            cached = await self.redis_repo.get_cached_person(person_id)
+            if cached:
+                return cached
+        except Exception:
+            pass
 
-    def get(self, person_id: str) -> Optional[Dict[str, Any]]:
         person = None
         # 1) Intentar buscar por _id (find_one). Puede fallar si el id no es ObjectId.
         try:
-            person = self.repo.find_one(person_id)
+            person = await self.repo.find_one(person_id)
         except Exception:
             person = None
 
         # 2) Si no existe, intentar buscar por userId dentro del documento people
         if not person:
-            try:
-                found = self.repo.find({"userId": person_id})
-                if found:
-                    person = found[0]
-            except Exception:
-                person = None
+            person = await self._find_by_user_id(person_id)
+
+        if person:
+            await self._cache(person)
+        return person
+
+    async def get_by_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Persona vinculada a un userId (read-through: Redis → Mongo)."""
+        try:
+            cached = await self.redis_repo.get_cached_person(user_id)
+            if cached:
+                return cached
+        except Exception:
+            pass
+
+        person = await self._find_by_user_id(user_id)
+        if person:
+            await self._cache(person)
+        return person
+
+    async def get_current(self, user_id: str, person_id: Optional[str] = None,
+                          projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Persona de la sesión (ver src/api/dependencies.get_current_person).
+        Redis primero; si no está, un find_one por _id (la sesión lo trae) y, si
+        no aparece, por userId. Con `projection` Mongo devuelve solo esos campos
+        y el resultado parcial no se cachea; sin ella el documento completo queda
+        en caché.
+        """
+        try:
+            cached = await self.redis_repo.get_cached_person(person_id or user_id)
+            if cached:
+                return cached
+        except Exception:
+            pass
+
+        person = None
+        if person_id and ObjectId.is_valid(person_id):
+            found = await self.repo.find({"_id": ObjectId(person_id)}, limit=1, projection=projection)
+            person = found[0] if found else None
+        if not person:
+            # sesión sin persona, con un _id inválido o de una persona ya borrada/recreada
+            found = await self.repo.find({"userId": user_id}, limit=1, projection=projection)
+            person = found[0] if found else None
+        if person and not projection:
+            await self._cache(person)
+        return person
+
+    async def _find_by_user_id(self, user_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            found = await self.repo.find({"userId": user_id}, limit=1)
+            return found[0] if found else None
+        except Exception:
+            return None
+
+    async def _sync_sessions(self, user_id: str, person_id: Optional[str]):
+        """Reescribe la persona guardada en las sesiones del usuario (best-effort)."""
+        try:
+            await session_resolver.set_person(user_id, person_id)
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudieron actualizar las sesiones de {user_id}: {e}")
+
+    async def _cache(self, person: Dict[str, Any]):
+        try:
+            await self.redis_repo.cache_person(person)
+        except Exception:
+            pass
+
+    async def get(self, person_id: str, viewer_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        person = await self.find_person(person_id)
 
         if person:
-            # Record profile view in Redis stats (use userId when available)
+            # Record profile view in Redis stats (use userId when available);
+            # viewer_id (userId de la sesión) alimenta el conteo de viewers únicos
             try:
                 stats_id = person.get("userId") or str(person.get("_id"))
-                record_profile_view(stats_id)
-            except Exception:
-                pass
-            # Cache person data
-            try:
-                self.redis_repo.cache_person(str(person.get("_id")), person)
+                await record_profile_view(stats_id, viewer_id)
             except Exception:
                 pass
 
         return person
 
-    def update(self, person_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        updated = self.repo.update(person_id, updates)
+    async def update(self, person_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Nombre y rol solo si cambiaron: None conserva el valor actual del nodo
+        nombre = (updates.get("datosPersonales") or {}).get("nombre")
+        rol = updates.get("rol")
 
-        # Sincronizar cambios relevantes con Neo4j (si corresponde)
-        try:
+        # Reconstruir habilidades si se enviaron en la actualización.
+        # Como antes, una lista vacía (o null) no borra las skills del grafo.
+        if "habilidades" in updates:
+            habilidades = updates.get("habilidades") or []
+        else:
+            habilidades = (updates.get("perfil") or {}).get("skills") or []
+
+        async def _write(session):
+            updated = await self.repo.update(person_id, updates, session=session)
             if not updated:
                 return updated
 
+            # Encolar los cambios relevantes para Neo4j (misma transacción que el update)
             # Determinar id de nodo en Neo4j: preferimos userId si existe
             node_id = updated.get("userId") or updated.get("_id")
-            if node_id:
+            if node_id and (nombre or rol or habilidades):
                 node_id = str(node_id)
+                # nodo + reemplazo de relaciones previas en la misma transacción
+                await self.outbox.append([
+                    graph_op("upsert_person_graph", person_id=node_id, nombre=nombre, rol=rol,
+                             skills=self._normalize_skills(habilidades),
+                             replace_skills=bool(habilidades))
+                ], clave=f"person:{node_id}", session=session)
+            return updated
 
-                # Actualizar propiedades básicas del nodo
-                # Obtener el nombre actual o el actualizado
-                nombre = None
-                if "datosPersonales" in updates and "nombre" in updates["datosPersonales"]:
-                    nombre = updates["datosPersonales"]["nombre"]
-                elif "datosPersonales" in updated and "nombre" in updated["datosPersonales"]:
-                    nombre = updated["datosPersonales"]["nombre"]
-                
-                # Obtener el rol actual o actualizado
-                rol = updates.get("rol") or updated.get("rol")
-                
-                # Siempre actualizar el nodo si hay cambios en nombre o rol
-                if nombre or rol:
-                    self.graph_repo.create_person_node(
-                        person_id=node_id, 
-                        nombre=nombre or "Desconocido", 
-                        rol=rol or "Sin Rol"
-                    )
-
-                # Reconstruir habilidades si se enviaron en la actualización
-                habilidades = []
-                if "habilidades" in updates:
-                    habilidades = updates.get("habilidades", [])
-                elif "perfil" in updates and "skills" in updates["perfil"]:
-                    habilidades = updates["perfil"]["skills"]
-
-                if habilidades:
-                    # eliminar relaciones previas y volver a vincular
-                    try:
-                        self.graph_repo.delete_person_skills(node_id)
-                    except Exception:
-                        pass
-
-                    for skill in habilidades:
-                        if isinstance(skill, str):
-                            self.graph_repo.link_person_to_skill(person_id=node_id, skill_name=skill, nivel=1)
-                        elif isinstance(skill, dict):
-                            nombre_skill = skill.get("nombre")
-                            nivel = skill.get("nivel", 1)
-                            if nombre_skill:
-                                self.graph_repo.link_person_to_skill(person_id=node_id, skill_name=nombre_skill, nivel=nivel)
+        updated = await self.outbox.transaction(_write)
+        if updated:
+            # Write-through: reemplaza la entrada cacheada (por _id y userId) con el doc nuevo
+            await self._cache(updated)
+        return updated
 
-        except Exception as e:
-            print(f"⚠️ Error sincronizando actualización en Neo4j: {e}")
+    async def delete(self, person_id: str) -> bool:
+        person = await self.repo.find_one(person_id)
+        if not person:
+            return False
+        node_id = str(person.get("userId") or person.get("_id"))
 
-        return updated
+        async def _write(session):
+            deleted = await self.repo.delete(person_id, session=session)
+            if deleted:
+                await self.outbox.append([graph_op("delete_node_by_id", node_id=node_id, label="Person")],
+                                         clave=f"person:{node_id}", session=session)
+            return deleted
+
+        deleted = await self.outbox.transaction(_write)
+        if deleted:
+            try:
+                await self.redis_repo.invalidate_person(person.get("_id"), person.get("userId"))
+            except Exception:
+                pass
+            if person.get("userId"):
+                await self._sync_sessions(person["userId"], None)
+        return bool(deleted)
 
     # ==============================================
     # 🔗 CONEXIONES
     # ==============================================
-    def connect(self, source_id: str, target_id: str, tipo: str = "amistad", direction: str = "two-way"):
+    async def connect(self, source_id: str, target_id: str, tipo: str = "amistad", direction: str = "two-way"):
         """
         Crea una conexión entre dos personas.
         - direction="one-way"  → (A)-[:TIPO]->(B)
@@ -188,9 +261,9 @@ class PeopleService:
         """
         try:
             if direction == "one-way":
-                self.graph_repo.create_connection_one_way(source_id, target_id, tipo)
+                await self.graph_repo.create_connection_one_way(source_id, target_id, tipo)
             else:
-                self.graph_repo.create_connection_two_way(source_id, target_id, tipo)
+                await self.graph_repo.create_connection_two_way(source_id, target_id, tipo)
             
             # Record connection in Redis stats under userIds
             try:
@@ -199,14 +272,14 @@ class PeopleService:
                 # resolve target: if target_id corresponds to a people _id, map to its userId
                 target_user = target_id
                 try:
-                    found = self.repo.find_one(target_id)
+                    found = await self.repo.find_one(target_id)
                     if found and found.get("userId"):
                         target_user = found.get("userId")
                 except Exception:
                     # not a mongo _id or not found; assume it's already a userId
                     pass
 
-                record_connection(source_user, target_user)
+                await record_connection(source_user, target_user)
             except Exception:
                 pass
 
@@ -219,30 +292,30 @@ class PeopleService:
         except Exception as e:
             raise Exception(f"Error al conectar personas: {e}")
 
-    def get_network(self, person_id: str):
+    async def get_network(self, person_id: str):
         try:
-            return self.graph_repo.get_network(person_id)
+            return await self.graph_repo.get_network(person_id)
         except Exception as e:
             raise Exception(f"Error obteniendo red de conexiones: {e}")
 
-    def get_common_connections(self, person_id: str, other_id: str):
+    async def get_common_connections(self, person_id: str, other_id: str):
         try:
-            return self.graph_repo.get_common_connections(person_id, other_id)
+            return await self.graph_repo.get_common_connections(person_id, other_id)
         except Exception as e:
             raise Exception(f"Error obteniendo conexiones en común: {e}")
 
-    def get_suggested_connections(self, person_id: str):
+    async def get_suggested_connections(self, person_id: str):
         try:
-            return self.graph_repo.get_suggested_connections(person_id)
+            return await self.graph_repo.get_suggested_connections(person_id)
         except Exception as e:
             raise Exception(f"Error obteniendo sugerencias: {e}")
 
-    def delete_connection(self, source_id: str, target_id: str, tipo: str = None):
+    async def delete_connection(self, source_id: str, target_id: str, tipo: str = None):
         """
         Elimina una relación (o todas) entre dos personas.
         """
         try:
-            deleted = self.graph_repo.delete_connection(source_id, target_id, tipo)
+            deleted = await self.graph_repo.delete_connection(source_id, target_id, tipo)
             if deleted == 0:
                 return {"message": "No se encontraron relaciones para eliminar"}
             return {
@@ -253,39 +326,40 @@ class PeopleService:
         except Exception as e:
             raise Exception(f"Error al eliminar conexión: {e}")
 
-    def get_applications(self, person_id: str):
+    async def get_applications(self, person_id: str):
         """
         Devuelve todos los empleos a los que una persona se postuló.
         """
         try:
-            return self.graph_repo.get_jobs_for_person(person_id)
+            return await self.graph_repo.get_jobs_for_person(person_id)
         except Exception as e:
             raise Exception(f"Error obteniendo empleos postulados: {e}")
     
-    def get_recommendations(self, person_id: str):
+    async def get_recommendations(self, person_id: str):
         """
         Devuelve empleos recomendados según las habilidades de la persona.
         """
         try:
-            return self.graph_repo.get_job_recommendations(person_id)
+            # top-K precalculado en Redis (ver RecommendationService)
+            return await self.recs.get_for_person(person_id)
         except Exception as e:
             raise Exception(f"Error obteniendo recomendaciones de empleos: {e}")
 
-    def get_skills(self, person_id: str):
+    async def get_skills(self, person_id: str):
         """
         Devuelve las habilidades y niveles de una persona desde Neo4j.
         """
         try:
-            return self.graph_repo.get_person_skills(person_id)
+            return await self.graph_repo.get_person_skills(person_id)
         except Exception as e:
             raise Exception(f"Error obteniendo habilidades: {e}")
 
-    def get_people_by_skill(self, skill_name: str, min_level: int = 1):
+    async def get_people_by_skill(self, skill_name: str, min_level: int = 1):
         """
         Devuelve las personas que tienen una habilidad con un nivel mínimo.
         """
         try:
-            return self.graph_repo.get_people_by_skill(skill_name, min_level)
+            return await self.graph_repo.get_people_by_skill(skill_name, min_level)
         except Exception as e:
             raise Exception(f"Error obteniendo personas por habilidad: {e}")
     
@@ -0,0 +1,181 @@
+# src/services/recommendation_service.py
+"""
+Recomendaciones de empleo precalculadas por persona.
+
+Lectura: top-K desde el ZSET match:person:{pid}:jobs (O(log n)); si no está
+calculado se consulta el grafo una vez y se guarda.
+
+Refresco incremental: el worker src/workers/graph_projector.py solo encola
+(SETs en Redis) lo afectado por cada evento proyectado, y el worker
+src/workers/recs_refresher.py lo recalcula fuera del camino de proyección:
+- cambian las skills de una persona → se recalcula su top-K;
+- cambian los requisitos de un job → se descartan los top-K que lo incluían
+  (se recalculan en la próxima lectura) y se ofrece el job, con su nuevo score,
+  a los top-K ya calculados de las personas con skills en común.
+
+Ranking de candidatos por job (GET /jobs/{id}/candidates): ZSET
+match:job:{id}:top con vencimiento blando (CANDIDATES_TTL_MINUTES) y duro
+(+ CANDIDATES_STALE_MINUTES). Cerca del vencimiento blando, o ya vencido, se
+sirve igual desde Redis y se recalcula en segundo plano (un solo proceso, por
+lock). Solo un ranking sin calcular consulta el grafo en la petición, también
+bajo el lock: el resto espera el resultado en vez de repetir la consulta.
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_redis_repository import AsyncRedisRepository
+
+# Tamaño del top-K precalculado por persona
+RECS_TOP_K = int(os.getenv("RECS_TOP_K", 50))
+# Tope de personas a las que se ofrece un job modificado (las de mayor score)
+RECS_JOB_FANOUT = int(os.getenv("RECS_JOB_FANOUT", 2000))
+
+# Ranking de candidatos por job: tamaño, TTL y margen de refresco anticipado
+CANDIDATES_TOP_K = int(os.getenv("CANDIDATES_TOP_K", 100))
+CANDIDATES_TTL_MINUTES = int(os.getenv("CANDIDATES_TTL_MINUTES", 15))
+CANDIDATES_REFRESH_AHEAD_SECONDS = int(os.getenv("CANDIDATES_REFRESH_AHEAD_SECONDS", 120))
+# Cuánto más se sirve un ranking vencido mientras se recalcula
+CANDIDATES_STALE_MINUTES = int(os.getenv("CANDIDATES_STALE_MINUTES", 60))
+# Espera máxima de una petición por un ranking que otro proceso está calculando
+CANDIDATES_COLD_WAIT_SECONDS = float(os.getenv("CANDIDATES_COLD_WAIT_SECONDS", 5))
+CANDIDATES_LOCK_MS = 30000
+
+# Operaciones del outbox que cambian las skills de una persona / los requisitos de un job
+# (create_person_node / create_job_node no tocan skills: se encolan en cada postulación)
+PERSON_OPS = {"upsert_person_graph", "link_person_to_skills"}
+JOB_OPS = {"link_job_to_skills"}
+
+
+class RecommendationService:
+    def __init__(self):
+        self.graph_repo = AsyncNeo4jRepository()
+        self.redis_repo = AsyncRedisRepository()
+        # refs a los refrescos en segundo plano (evita que el GC los cancele)
+        self._background: set = set()
+
+    # ===============================================================
+    # 📖 Lectura
+    # ===============================================================
+    async def get_for_person(self, person_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        recs = await self.redis_repo.get_person_recommendations(person_id, limit)
+        if recs is not None:
+            return recs
+        recs = await self.refresh_person(person_id)
+        return recs[:limit]
+
+    async def get_job_candidates(self, job_id: str, top: int = 10) -> List[Dict[str, Any]]:
+        """Top candidatos de un job desde el ZSET; solo un ranking sin calcular consulta el grafo."""
+        ranking, ttl = await self.redis_repo.get_job_ranking_with_ttl(job_id, top)
+        if ranking is None:
+            return await self._cold_job_candidates(job_id, top)
+        if ttl < CANDIDATES_REFRESH_AHEAD_SECONDS:
+            # por vencer o vencido: se sirve igual y se recalcula en segundo plano
+            self._schedule(self._refresh_job_candidates_locked(job_id))
+        return ranking
+
+    async def _cold_job_candidates(self, job_id: str, top: int) -> List[Dict[str, Any]]:
+        lock = f"match:job:{job_id}:top:refrescando"
+        token = await self.redis_repo.try_lock(lock, ttl_ms=CANDIDATES_LOCK_MS)
+        if token:
+            try:
+                await self.refresh_job_candidates(job_id)
+            finally:
+                await self.redis_repo.release_lock(lock, token)
+        else:
+            # otro proceso lo está calculando: esperar su resultado
+            deadline = time.monotonic() + CANDIDATES_COLD_WAIT_SECONDS
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.1)
+                ranking, _ = await self.redis_repo.get_job_ranking_with_ttl(job_id, top)
+                if ranking is not None:
+                    return ranking
+        ranking, _ = await self.redis_repo.get_job_ranking_with_ttl(job_id, top)
+        return ranking or []
+
+    # ===============================================================
+    # 🔄 Refresco incremental
+    # ===============================================================
+    async def refresh_person(self, person_id: str) -> List[Dict[str, Any]]:
+        recs = await self.graph_repo.get_job_recommendations(person_id, limit=RECS_TOP_K)
+        await self.redis_repo.set_person_recommendations(person_id, recs)
+        return recs
+
+    async def refresh_job_candidates(self, job_id: str, scored: List[Dict[str, Any]] | None = None):
+        if scored is None:
+            scored = await self.graph_repo.get_job_candidates(job_id, limit=CANDIDATES_TOP_K)
+        ranking = {r["personId"]: r["score"] for r in scored[:CANDIDATES_TOP_K]}
+        await self.redis_repo.set_job_ranking(job_id, ranking, ttl_minutes=CANDIDATES_TTL_MINUTES,
+                                              stale_minutes=CANDIDATES_STALE_MINUTES)
+
+    async def _refresh_job_candidates_locked(self, job_id: str):
+        lock = f"match:job:{job_id}:top:refrescando"
+        token = await self.redis_repo.try_lock(lock, ttl_ms=CANDIDATES_LOCK_MS)
+        if not token:
+            return  # otro proceso ya lo está recalculando
+        try:
+            await self.refresh_job_candidates(job_id)
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo refrescar el ranking de candidatos del job {job_id}: {e}")
+        finally:
+            await self.redis_repo.release_lock(lock, token)
+
+    def _schedule(self, coro):
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def refresh_job(self, job_id: str, deleted: bool = False):
+        # Quien ya lo tenía en su top-K puede haber cambiado de orden: recalcular al leer
+        previos = await self.redis_repo.pop_job_recommended_to(job_id)
+        if previos:
+            await self.redis_repo.invalidate_person_recommendations(*previos)
+        if deleted:
+            await self.redis_repo.delete_job_ranking(job_id)
+            return
+        scored = await self.graph_repo.get_job_candidates(job_id, limit=RECS_JOB_FANOUT)
+        merged = await self.redis_repo.merge_job_recommendation(job_id, scored, RECS_TOP_K)
+        # la misma consulta (ordenada por score) deja listo el ranking de candidatos
+        await self.refresh_job_candidates(job_id, scored)
+        logging.info(f"🎯 Job {job_id}: {len(previos)} top-K invalidados, entró en {merged} de {len(scored)}")
+
+    async def on_graph_ops(self, ops: List[Dict[str, Any]]):
+        """Encola lo afectado por eventos del outbox ya proyectados en Neo4j (no recalcula)."""
+        personas, jobs, borrados = set(), set(), set()
+        for step in ops:
+            op, args = step.get("op"), step.get("args") or {}
+            if op in PERSON_OPS:
+                personas.add(args["person_id"])
+            elif op in JOB_OPS:
+                jobs.add(args["job_id"])
+            elif op == "delete_node_by_id" and args.get("label") == "Job":
+                borrados.add(args["node_id"])
+            elif op == "delete_node_by_id" and args.get("label") == "Person":
+                await self.redis_repo.invalidate_person_recommendations(args["node_id"])
+
+        await self.redis_repo.enqueue_recs_refresh(personas=personas, jobs=jobs - borrados,
+                                                   jobs_borrados=borrados)
+
+    async def drain_refresh_queue(self, limit: int = 100) -> int:
+        """Recalcula hasta `limit` entradas de cada cola. Devuelve cuántas procesó."""
+        procesados = 0
+        for person_id in await self.redis_repo.pop_recs_refresh("personas", limit):
+            await self._refresh_safely(self.refresh_person(person_id), f"persona {person_id}")
+            procesados += 1
+        for job_id in await self.redis_repo.pop_recs_refresh("jobs", limit):
+            await self._refresh_safely(self.refresh_job(job_id), f"job {job_id}")
+            procesados += 1
+        for job_id in await self.redis_repo.pop_recs_refresh("jobs_borrados", limit):
+            await self._refresh_safely(self.refresh_job(job_id, deleted=True), f"job {job_id}")
+            procesados += 1
+        return procesados
+
+    @staticmethod
+    async def _refresh_safely(coro, label: str):
+        try:
+            await coro
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudieron refrescar las recomendaciones de {label}: {e}")
@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional
+from src.config.database import get_async_redis_client
+from src.utils.leaderboard import incr_with_bucket
+from src.utils.unique_viewers import UNIQUE_VIEWER_METRICS, add_viewer, unique_viewers_key
+from src.utils.view_buffer import view_buffer
+
+
+# Contraparte async de src/utils/redis_stats.py (mismas claves y ZSETs).
+# Cada escritura y cada lectura es un solo round trip: las escrituras van en
+# MULTI/EXEC (atómicas) y las lecturas en un pipeline. Cada incremento
+# también suma al bucket horario de su leaderboard (src/utils/leaderboard.py);
+# las vistas con viewer conocido alimentan además un HyperLogLog de únicos
+# (src/utils/unique_viewers.py).
+
+# métrica expuesta → ZSET
+PERSON_METRICS = {
+    "applications": "applications_by_person",
+    "connections": "connections_count",
+    "profile_views": "profile_views",
+}
+JOB_METRICS = {
+    "applications": "applications_by_job",
+    "views": "job_views",
+}
+STATS_KINDS = {"person": PERSON_METRICS, "job": JOB_METRICS}
+
+
+async def record_application(person_id: str, job_id: str):
+    r = get_async_redis_client()
+    async with r.pipeline(transaction=True) as pipe:
+        # increment job ranking
+        incr_with_bucket(pipe, "applications_by_job", job_id)
+        # increment person ranking for applications
+        incr_with_bucket(pipe, "applications_by_person", person_id)
+        await pipe.execute()
+
+
+async def record_connection(person_a: str, person_b: str):
+    r = get_async_redis_client()
+    async with r.pipeline(transaction=True) as pipe:
+        # increment connection counts for both
+        incr_with_bucket(pipe, "connections_count", person_a)
+        incr_with_bucket(pipe, "connections_count", person_b)
+        await pipe.execute()
+
+
+async def _record_view(zset: str, member: str, viewer_id: Optional[str]):
+    # write-behind: con el buffer activo (app) la vista no cuesta round trip
+    if view_buffer.running:
+        view_buffer.add(zset, member, viewer=viewer_id)
+        return
+    r = get_async_redis_client()
+    async with r.pipeline(transaction=True) as pipe:
+        incr_with_bucket(pipe, zset, member)
+        if viewer_id:
+            add_viewer(pipe, zset, member, viewer_id)
+        await pipe.execute()
+
+
+async def record_profile_view(person_id: str, viewer_id: Optional[str] = None):
+    await _record_view("profile_views", person_id, viewer_id)
+
+
+async def record_job_view(job_id: str, viewer_id: Optional[str] = None):
+    await _record_view("job_views", job_id, viewer_id)
+
+
+def _as_int(score) -> int:
+    return int(float(score or 0))
+
+
+async def stats_many(ids: List[str], kind: str = "person") -> Dict[str, Dict[str, int]]:
+    """
+    Contadores de muchas personas o jobs en un round trip (un ZMSCORE por
+    métrica + un PFCOUNT de viewers únicos por id).
+    Devuelve {id: {métrica: valor}}.
+    """
+    metrics = STATS_KINDS[kind]
+    unique_name, views_zset = UNIQUE_VIEWER_METRICS[kind]
+    if not ids:
+        return {}
+    r = get_async_redis_client()
+    async with r.pipeline(transaction=False) as pipe:
+        for zset in metrics.values():
+            pipe.zmscore(zset, ids)
+        for _id in ids:
+            pipe.pfcount(unique_viewers_key(views_zset, _id))
+        results = await pipe.execute()
+    columns, uniques = results[:len(metrics)], results[len(metrics):]
+    return {
+        _id: {
+            **{name: _as_int(column[i]) for name, column in zip(metrics, columns)},
+            unique_name: uniques[i],
+        }
+        for i, _id in enumerate(ids)
+    }
+
+
+async def person_stats(person_id: str) -> dict:
+    stats = (await stats_many([person_id], "person"))[person_id]
+    return {"person_id": person_id, **stats}
+
+
+async def job_stats(job_id: str) -> dict:
+    return (await stats_many([job_id], "job"))[job_id]
@@ -0,0 +1,89 @@
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from src.config.database import get_async_redis_client
+
+# Leaderboards aproximados en tiempo real sobre los ZSETs de redis_stats.
+#
+# Cada incremento se suma al ZSET total (p. ej. job_views) y a un bucket
+# horario ({zset}:h:{AAAAMMDDHH}, con TTL). Una ventana (24h, 7d...) es el
+# ZUNIONSTORE de sus buckets en lb:{zset}:{horas}h, recalculado como mucho
+# una vez cada LEADERBOARD_REFRESH_SECONDS: leer un top-K es un ZREVRANGE.
+
+LEADERBOARD_METRICS = {
+    "applications_by_job",
+    "applications_by_person",
+    "job_views",
+    "profile_views",
+    "connections_count",
+}
+LEADERBOARD_MAX_WINDOW_HOURS = int(os.getenv("LEADERBOARD_MAX_WINDOW_HOURS", 168))
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", 60))
+# los buckets viven lo justo para cubrir la ventana más larga
+BUCKET_TTL_SECONDS = (LEADERBOARD_MAX_WINDOW_HOURS + 1) * 3600
+
+
+def bucket_key(zset: str, when: Optional[datetime] = None) -> str:
+    return f"{zset}:h:{(when or datetime.utcnow()):%Y%m%d%H}"
+
+
+def incr_with_bucket(pipe, zset: str, member: str, amount: float = 1):
+    """Encola en `pipe` (sync o async) el ZINCRBY total + el del bucket de la hora actual."""
+    pipe.zincrby(zset, amount, member)
+    if zset in LEADERBOARD_METRICS:
+        key = bucket_key(zset)
+        pipe.zincrby(key, amount, member)
+        pipe.expire(key, BUCKET_TTL_SECONDS)
+
+
+def parse_window(window: str) -> Optional[int]:
+    """'24h' → 24, '7d' → 168, 'all' → None (total histórico)."""
+    window = (window or "").strip().lower()
+    if window == "all":
+        return None
+    try:
+        if window.endswith("h"):
+            hours = int(window[:-1])
+        elif window.endswith("d"):
+            hours = int(window[:-1]) * 24
+        else:
+            raise ValueError
+    except ValueError:
+        raise ValueError("window debe ser 'all' o del tipo '24h' / '7d'")
+    if not 1 <= hours <= LEADERBOARD_MAX_WINDOW_HOURS:
+        raise ValueError(f"window debe estar entre 1h y {LEADERBOARD_MAX_WINDOW_HOURS}h")
+    return hours
+
+
+async def _rebuild_window(r, zset: str, hours: int, window_key: str):
+    now = datetime.utcnow()
+    buckets = [bucket_key(zset, now - timedelta(hours=h)) for h in range(hours)]
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.delete(window_key)
+        pipe.zunionstore(window_key, buckets)
+        # la ventana sigue sirviendo (algo vieja) mientras otro proceso la recalcula
+        pipe.expire(window_key, LEADERBOARD_REFRESH_SECONDS * 10)
+        pipe.set(f"{window_key}:calculado", time.time(), ex=LEADERBOARD_REFRESH_SECONDS)
+        await pipe.execute()
+
+
+async def leaderboard(zset: str, top: int = 10, window: str = "24h") -> List[Dict[str, Any]]:
+    """Top-K de `zset` en la ventana pedida: [{"id", "score"}] ordenado por score."""
+    if zset not in LEADERBOARD_METRICS:
+        raise ValueError(f"metric debe ser una de {sorted(LEADERBOARD_METRICS)}")
+    hours = parse_window(window)
+    r = get_async_redis_client()
+    key = zset if hours is None else f"lb:{zset}:{hours}h"
+
+    if hours is not None and not await r.exists(f"{key}:calculado"):
+        # un solo proceso recalcula; el resto sirve la ventana anterior
+        if await r.set(f"{key}:lock", 1, nx=True, px=10000):
+            try:
+                await _rebuild_window(r, zset, hours, key)
+            finally:
+                await r.delete(f"{key}:lock")
+
+    ranking = await r.zrevrange(key, 0, top - 1, withscores=True)
+    return [{"id": member, "score": int(score)} for member, score in ranking]
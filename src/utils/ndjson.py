@@ -0,0 +1,43 @@
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+
+def json_default(value: Any) -> Any:
+    # datetimes en ISO (igual que la respuesta de FastAPI); ObjectId u otros → str
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Dict[str, int]]:
+    """'a,b.c' → {"a": 1, "b.c": 1} (proyección de Mongo); None/'' → sin proyección."""
+    if not fields:
+        return None
+    names = [f.strip() for f in fields.split(",") if f.strip()]
+    return {name: 1 for name in names} or None
+
+
+async def _ndjson_chunks(docs: AsyncIterator[Dict[str, Any]], chunk_size: int) -> AsyncIterator[str]:
+    # Se agrupan varias líneas por chunk para no emitir un mensaje ASGI por documento;
+    # el primer documento sale solo, así el cliente recibe el primer byte sin esperar el chunk
+    buffer, first = [], True
+    async for doc in docs:
+        buffer.append(json.dumps(doc, default=json_default, ensure_ascii=False))
+        if first or len(buffer) >= chunk_size:
+            first = False
+            yield "\n".join(buffer) + "\n"
+            buffer = []
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def ndjson_response(docs: AsyncIterator[Dict[str, Any]], filename: str, chunk_size: int = 500) -> StreamingResponse:
+    """StreamingResponse NDJSON (un documento JSON por línea) a partir de un iterador async."""
+    return StreamingResponse(
+        _ndjson_chunks(docs, chunk_size),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,50 +1,74 @@
-from typing import Optional
+from typing import Dict, List, Optional
 from src.config.database import get_redis_client
+from src.utils.async_redis_stats import STATS_KINDS
+from src.utils.leaderboard import incr_with_bucket
+from src.utils.unique_viewers import UNIQUE_VIEWER_METRICS, add_viewer, unique_viewers_key
 
 
+# Cada escritura y cada lectura es un solo round trip (ver async_redis_stats.py).
+
 def record_application(person_id: str, job_id: str):
     r = get_redis_client()
+    pipe = r.pipeline(transaction=True)
     # increment job ranking
-    r.zincrby("applications_by_job", 1, job_id)
+    incr_with_bucket(pipe, "applications_by_job", job_id)
     # increment person ranking for applications
-    r.zincrby("applications_by_person", 1, person_id)
+    incr_with_bucket(pipe, "applications_by_person", person_id)
+    pipe.execute()
 
 
 def record_connection(person_a: str, person_b: str):
     r = get_redis_client()
+    pipe = r.pipeline(transaction=True)
     # increment connection counts for both
-    r.zincrby("connections_count", 1, person_a)
-    r.zincrby("connections_count", 1, person_b)
+    incr_with_bucket(pipe, "connections_count", person_a)
+    incr_with_bucket(pipe, "connections_count", person_b)
+    pipe.execute()
 
 
-def record_profile_view(person_id: str):
+def _record_view(zset: str, member: str, viewer_id: Optional[str]):
     r = get_redis_client()
-    r.zincrby("profile_views", 1, person_id)
+    pipe = r.pipeline(transaction=True)
+    incr_with_bucket(pipe, zset, member)
+    if viewer_id:
+        add_viewer(pipe, zset, member, viewer_id)
+    pipe.execute()
 
 
-def record_job_view(job_id: str):
-    r = get_redis_client()
-    r.zincrby("job_views", 1, job_id)
+def record_profile_view(person_id: str, viewer_id: Optional[str] = None):
+    _record_view("profile_views", person_id, viewer_id)
 
 
-def person_stats(person_id: str) -> dict:
+def record_job_view(job_id: str, viewer_id: Optional[str] = None):
+    _record_view("job_views", job_id, viewer_id)
+
+
+def stats_many(ids: List[str], kind: str = "person") -> Dict[str, Dict[str, int]]:
+    """Contadores de muchas personas o jobs en un round trip: {id: {métrica: valor}}."""
+    metrics = STATS_KINDS[kind]
+    unique_name, views_zset = UNIQUE_VIEWER_METRICS[kind]
+    if not ids:
+        return {}
     r = get_redis_client()
-    apps = r.zscore("applications_by_person", person_id) or 0
-    conns = r.zscore("connections_count", person_id) or 0
-    views = r.zscore("profile_views", person_id) or 0
+    pipe = r.pipeline(transaction=False)
+    for zset in metrics.values():
+        pipe.zmscore(zset, ids)
+    for _id in ids:
+        pipe.pfcount(unique_viewers_key(views_zset, _id))
+    results = pipe.execute()
+    columns, uniques = results[:len(metrics)], results[len(metrics):]
     return {
-        "person_id": person_id,
-        "applications": int(float(apps)),
-        "connections": int(float(conns)),
-        "profile_views": int(float(views)),
+        _id: {
+            **{name: int(float(column[i] or 0)) for name, column in zip(metrics, columns)},
+            unique_name: uniques[i],
+        }
+        for i, _id in enumerate(ids)
     }
 
 
+def person_stats(person_id: str) -> dict:
+    return {"person_id": person_id, **stats_many([person_id], "person")[person_id]}
+
+
 def job_stats(job_id: str) -> dict:
-    r = get_redis_client()
-    applications = r.zscore("applications_by_job", job_id) or 0
-    views = r.zscore("job_views", job_id) or 0
-    return {
-        "applications": int(float(applications)),
-        "views": int(float(views))
-    }
\ No newline at end of file
+    return stats_many([job_id], "job")[job_id]
@@ -1,9 +1,38 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
 # Usamos pbkdf2_sha256 para evitar dependencias binarias (bcrypt) en la imagen.
 # pbkdf2_sha256 es compatible, seguro y no tiene la limitación de 72 bytes.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+#
+# Factor de trabajo por entorno: PBKDF2_ROUNDS (29000 = default de passlib).
+# Es también el mínimo aceptado: un hash con menos rondas se regenera de forma
+# transparente en el siguiente login (CryptContext.needs_update).
+PBKDF2_ROUNDS = int(os.getenv("PBKDF2_ROUNDS", 29000))
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PBKDF2_ROUNDS,
+    pbkdf2_sha256__min_rounds=PBKDF2_ROUNDS,
+)
+
+# Pool dedicado para hash/verify: hashlib.pbkdf2_hmac libera el GIL, así que
+# los hilos escalan por core sin ocupar el threadpool de la API ni el event loop.
+# Con más de PASSWORD_HASH_MAX_PENDING operaciones en curso se rechaza en vez
+# de encolar sin límite (tormenta de logins).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 16))
+
+_hash_executor: Optional[ThreadPoolExecutor] = None
+_pending = 0
+
+
+class PasswordHashBusy(Exception):
+    """El pool de hashing tiene PASSWORD_HASH_MAX_PENDING operaciones en curso."""
 
 
 def hash_password(password: str) -> str:
@@ -15,3 +44,49 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return pwd_context.verify(plain_password, hashed_password)
     except Exception:
         return False
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(válida, hash_nuevo): hash_nuevo != None si el hash guardado debe actualizarse."""
+    try:
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+    except Exception:
+        return False, None
+
+
+# ===============================================================
+# 🧵 Pool de hashing
+# ===============================================================
+def _get_hash_executor() -> ThreadPoolExecutor:
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS,
+                                            thread_name_prefix="pwd-hash")
+    return _hash_executor
+
+
+async def _run_in_hash_pool(fn, *args):
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashBusy()
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_hash_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_in_hash_pool(verify_and_update, plain_password, hashed_password)
+
+
+def shutdown_hash_pool():
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=True)
+        _hash_executor = None
@@ -0,0 +1,21 @@
+# Viewers únicos (aproximados) por job y por perfil con HyperLogLog.
+#
+# Junto a cada ZSET de vistas crudas (job_views, profile_views) se guarda un
+# HLL por miembro en {zset}:uniq:{id}, alimentado con el userId de la sesión
+# (PFADD) y leído con PFCOUNT: ~12KB fijos por clave y ~0.81% de error,
+# frente a un SET exacto que crecería con cada viewer distinto.
+
+# métrica expuesta en stats → ZSET de vistas crudas al que acompaña
+UNIQUE_VIEWER_METRICS = {
+    "person": ("unique_profile_viewers", "profile_views"),
+    "job": ("unique_viewers", "job_views"),
+}
+
+
+def unique_viewers_key(zset: str, member: str) -> str:
+    return f"{zset}:uniq:{member}"
+
+
+def add_viewer(pipe, zset: str, member: str, viewer_id: str):
+    """Encola en `pipe` (sync o async) el PFADD del viewer."""
+    pipe.pfadd(unique_viewers_key(zset, member), viewer_id)
@@ -0,0 +1,141 @@
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set, Tuple
+
+from src.config.database import get_async_redis_client
+from src.utils.leaderboard import incr_with_bucket
+from src.utils.unique_viewers import unique_viewers_key
+
+
+class ViewCounterBuffer:
+    """
+    Write-behind para contadores de vistas (ZSETs job_views / profile_views).
+    - add() solo suma en memoria: una vista no cuesta ningún round trip.
+    - Una tarea de fondo vuelca los incrementos agregados por (zset, miembro)
+      cada `flush_interval_ms`, o antes si se acumulan `max_events`, como un
+      único pipeline de ZINCRBY (total + bucket horario del leaderboard),
+      más un PFADD por clave con los viewers únicos vistos en el intervalo.
+    - Con `max_keys` claves distintas pendientes (p. ej. Redis caído) las
+      vistas nuevas se descartan y se cuentan en `dropped`.
+    - stop() hace un último flush (shutdown de la app).
+    """
+
+    def __init__(self, flush_interval_ms: int = 500, max_events: int = 1000, max_keys: int = 50000):
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.max_events = max_events
+        self.max_keys = max_keys
+        self._pending: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._viewers: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self._events = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    # ===============================================================
+    # ➕ Acumular
+    # ===============================================================
+    def add(self, zset: str, member: str, amount: int = 1, viewer: Optional[str] = None):
+        key = (zset, member)
+        if key not in self._pending and len(self._pending) >= self.max_keys:
+            self.dropped += amount
+            return
+        self._pending[key] += amount
+        if viewer:
+            self._viewers[key].add(viewer)
+        self._events += amount
+        if self._events >= self.max_events:
+            self._wakeup.set()
+
+    def _requeue(self, batch: Dict[Tuple[str, str], int], viewers: Dict[Tuple[str, str], Set[str]]):
+        """Devuelve al buffer un lote que no se pudo volcar (respetando max_keys)."""
+        for key, amount in batch.items():
+            if key in self._pending or len(self._pending) < self.max_keys:
+                self._pending[key] += amount
+                self._events += amount
+                if key in viewers:
+                    self._viewers[key] |= viewers[key]
+            else:
+                self.dropped += amount
+
+    # ===============================================================
+    # 🚿 Volcado
+    # ===============================================================
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending, self._events = self._pending, defaultdict(int), 0
+        viewers, self._viewers = self._viewers, defaultdict(set)
+        try:
+            r = get_async_redis_client()
+            async with r.pipeline(transaction=False) as pipe:
+                for (zset, member), amount in batch.items():
+                    incr_with_bucket(pipe, zset, member, amount)
+                for (zset, member), ids in viewers.items():
+                    pipe.pfadd(unique_viewers_key(zset, member), *ids)
+                await pipe.execute()
+        except asyncio.CancelledError:
+            # cancelado en pleno volcado (stop): que lo vuelque el flush final
+            self._requeue(batch, viewers)
+            raise
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudieron volcar {len(batch)} contadores de vistas, se reintenta: {e}")
+            self._requeue(batch, viewers)
+            return 0
+        total = sum(batch.values())
+        self.flushed += total
+        self.flushes += 1
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        if not self.running:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._pending:
+            self.dropped += sum(self._pending.values())
+            logging.warning(f"⚠️ Shutdown: se descartaron {len(self._pending)} contadores de vistas sin volcar")
+            self._pending.clear()
+            self._viewers.clear()
+            self._events = 0
+
+    def stats(self) -> dict:
+        return {
+            "pending_keys": len(self._pending),
+            "pending_events": self._events,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+        }
+
+
+view_buffer = ViewCounterBuffer(
+    flush_interval_ms=int(os.getenv("VIEW_FLUSH_INTERVAL_MS", 500)),
+    max_events=int(os.getenv("VIEW_FLUSH_MAX_EVENTS", 1000)),
+    max_keys=int(os.getenv("VIEW_BUFFER_MAX_KEYS", 50000)),
+)
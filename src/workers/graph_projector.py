@@ -0,0 +1,243 @@
+# src/workers/graph_projector.py
+"""
+Worker que drena la colección `outbox` de MongoDB hacia Neo4j.
+
+    python -m src.workers.graph_projector
+
+- Procesa los eventos en orden de _id, en lotes de OUTBOX_BATCH_SIZE; cada
+  lote se aplica en UNA transacción de Neo4j. Si el lote falla se reprocesa
+  evento a evento para aislar el que falla.
+- Todas las operaciones de AsyncNeo4jRepository usadas son MERGE/SET,
+  así que reprocesar un evento (p. ej. tras una caída) es idempotente.
+- El orden se garantiza por `clave` (entidad): si un evento falla se reintenta
+  con backoff exponencial y solo los eventos de su misma clave esperan.
+  Después de OUTBOX_MAX_INTENTOS queda como 'fallido' y la clave sigue.
+- Un lock en Redis garantiza un único consumidor activo; se renueva por
+  evento y se verifica (fencing) antes de marcar el lote como hecho.
+- Métricas (lag, procesados, reintentos, fallidos) en el hash Redis `outbox:metrics`.
+- Tras proyectar un lote encola (SADD en Redis) las recomendaciones que
+  afecta; las recalcula src/workers/recs_refresher.py, fuera de este camino
+  (best-effort: un fallo ahí no reintenta el evento).
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from src.config.database import get_async_redis_client, cerrar_conexiones_async
+from src.config.indexes import ensure_mongo_indexes
+from src.repositories.async_neo4j_repository import AsyncNeo4jRepository
+from src.repositories.async_outbox_repository import AsyncOutboxRepository, OUTBOX_METRICS_KEY
+from src.services.recommendation_service import RecommendationService
+
+OUTBOX_LOCK_KEY = "outbox:worker:lock"
+
+# Renueva / libera el lock solo si sigue siendo de este worker (KEYS[1]=lock; ARGV: workerId, ttl ms)
+RENEW_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+"""
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+return redis.call('DEL', KEYS[1])
+"""
+
+# Operaciones de AsyncNeo4jRepository que un evento puede invocar
+ALLOWED_OPS = {
+    "upsert_person_graph",
+    "create_person_node",
+    "link_person_to_skills",
+    "create_job_node",
+    "link_job_to_skills",
+    "apply_to_job",
+    "create_company_node",
+    "delete_node_by_id",
+    "create_course_node",
+    "link_course_to_skills",
+    "delete_course_node",
+    "create_relationship",
+    "delete_relationship",
+    "create_labelled_relationship",
+    "delete_labelled_relationship",
+    "set_application_state",
+    "upsert_inscripcion",
+    "set_inscripcion_progreso",
+    "set_inscripcion_completa",
+}
+
+
+class GraphProjector:
+    def __init__(self, batch_size: int = 100, poll_interval: float = 0.5,
+                 max_intentos: int = 10, max_backoff: float = 300.0, lock_ttl_ms: int = 30000):
+        self.outbox = AsyncOutboxRepository()
+        self.graph = AsyncNeo4jRepository()
+        self.recs = RecommendationService()
+        self.redis = get_async_redis_client()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_intentos = max_intentos
+        self.max_backoff = max_backoff
+        self.lock_ttl_ms = lock_ttl_ms
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._renew = self.redis.register_script(RENEW_LOCK_LUA)
+        self._release = self.redis.register_script(RELEASE_LOCK_LUA)
+
+    # ===============================================================
+    # 🔒 Consumidor único
+    # ===============================================================
+    async def _hold_lock(self) -> bool:
+        if await self.redis.set(OUTBOX_LOCK_KEY, self.worker_id, nx=True, px=self.lock_ttl_ms):
+            return True
+        return await self._renew_lock()
+
+    async def _renew_lock(self) -> bool:
+        """Extiende el TTL si el lock sigue siendo nuestro (compare-and-pexpire atómico)."""
+        return bool(await self._renew(keys=[OUTBOX_LOCK_KEY], args=[self.worker_id, self.lock_ttl_ms]))
+
+    async def _release_lock(self):
+        await self._release(keys=[OUTBOX_LOCK_KEY], args=[self.worker_id])
+
+    # ===============================================================
+    # 🔁 Proyección
+    # ===============================================================
+    async def _apply(self, event: dict, graph: AsyncNeo4jRepository):
+        for step in event.get("ops", []):
+            op = step.get("op")
+            if op not in ALLOWED_OPS:
+                raise ValueError(f"Operación de grafo no permitida: {op}")
+            await getattr(graph, op)(**(step.get("args") or {}))
+
+    async def _apply_each(self, batch: list) -> tuple[list, list]:
+        """
+        Fallback de un lote fallido: un evento por transacción. Un evento que
+        falla bloquea su clave por el resto del lote (orden por entidad).
+        Devuelve (hechos, [(evento, error)]).
+        """
+        done, errores, bloqueadas = [], [], set()
+        for event in batch:
+            if event.get("clave") in bloqueadas:
+                continue
+            if not await self._renew_lock():
+                break
+            try:
+                async with self.graph.batch() as tx_graph:
+                    await self._apply(event, tx_graph)
+                done.append(event)
+            except Exception as e:
+                errores.append((event, e))
+                bloqueadas.add(event.get("clave"))
+        return done, errores
+
+    async def _enqueue_recommendations(self, events: list):
+        try:
+            await self.recs.on_graph_ops([step for event in events for step in event.get("ops", [])])
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudieron encolar refrescos de recomendaciones: {e}")
+
+    async def run_once(self) -> int:
+        """Procesa un lote. Devuelve la cantidad de eventos proyectados."""
+        batch = await self.outbox.next_batch(self.batch_size)
+        # next_batch ya excluye las claves en backoff; por si alguna entró entre medio
+        now = datetime.utcnow()
+        bloqueadas = {e.get("clave") for e in batch if e.get("disponibleEn") and e["disponibleEn"] > now}
+        batch = [e for e in batch if e.get("clave") not in bloqueadas]
+
+        done, errores = [], []
+        if batch:
+            try:
+                async with self.graph.batch() as tx_graph:
+                    for event in batch:
+                        await self._apply(event, tx_graph)
+                done = batch
+            except Exception as e:
+                logging.warning(f"⚠️ Lote del outbox falló ({e}); se reprocesa evento a evento")
+                done, errores = await self._apply_each(batch)
+
+        # Fencing: si otro worker tomó el lock, no tocamos la cola (reprocesar es idempotente)
+        if not await self._renew_lock():
+            logging.warning("⚠️ Lock del outbox perdido; el lote queda para el consumidor activo")
+            return 0
+
+        reintentos = fallidos = 0
+        for event, e in errores:
+            intentos = event.get("intentos", 0) + 1
+            if intentos >= self.max_intentos:
+                logging.error(f"❌ Evento outbox {event['_id']} descartado tras {intentos} intentos: {e}")
+                await self.outbox.mark_failed(event["_id"], intentos, str(e))
+                fallidos += 1
+                continue
+            delay = min(2 ** intentos, self.max_backoff)
+            logging.warning(f"⚠️ Evento outbox {event['_id']} falló (intento {intentos}), reintento en {delay}s: {e}")
+            await self.outbox.mark_retry(event["_id"], intentos, str(e), delay)
+            reintentos += 1
+
+        if done:
+            await self._enqueue_recommendations(done)
+        await self.outbox.mark_done([event["_id"] for event in done])
+        lag_ms = (datetime.utcnow() - done[-1]["creadoEn"]).total_seconds() * 1000 if done else None
+        await self._report(len(done), reintentos, fallidos, lag_ms)
+        return len(done)
+
+    async def _report(self, procesados: int, reintentos: int, fallidos: int, lag_ms: float | None):
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if procesados:
+                    pipe.hincrby(OUTBOX_METRICS_KEY, "procesados", procesados)
+                if reintentos:
+                    pipe.hincrby(OUTBOX_METRICS_KEY, "reintentos", reintentos)
+                if fallidos:
+                    pipe.hincrby(OUTBOX_METRICS_KEY, "fallidos", fallidos)
+                mapping = {"ultimo_ciclo": time.time(), "worker": self.worker_id}
+                if lag_ms is not None:
+                    mapping["lag_ms"] = round(lag_ms, 1)
+                pipe.hset(OUTBOX_METRICS_KEY, mapping=mapping)
+                await pipe.execute()
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudieron publicar métricas del outbox: {e}")
+        if procesados:
+            logging.info(f"📤 Outbox: {procesados} eventos proyectados en Neo4j (lag {lag_ms:.0f} ms)")
+
+    async def run(self):
+        await ensure_mongo_indexes(["outbox"])
+        # los MERGE del worker dependen de las constraints de unicidad
+        await self.graph.ensure_schema()
+        logging.info(f"🚀 Graph projector {self.worker_id} iniciado")
+        try:
+            while True:
+                try:
+                    if not await self._hold_lock():
+                        await asyncio.sleep(self.lock_ttl_ms / 3000)
+                        continue
+                    if await self.run_once() == 0:
+                        await asyncio.sleep(self.poll_interval)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.warning(f"⚠️ Error en el ciclo del outbox, reintentando: {e}")
+                    await asyncio.sleep(self.poll_interval)
+        finally:
+            await self._release_lock()
+
+
+async def main():
+    load_dotenv()
+    projector = GraphProjector(
+        batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", 100)),
+        poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", 0.5)),
+        max_intentos=int(os.getenv("OUTBOX_MAX_INTENTOS", 10)),
+    )
+    try:
+        await projector.run()
+    finally:
+        await cerrar_conexiones_async()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
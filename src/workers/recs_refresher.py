@@ -0,0 +1,64 @@
+# src/workers/recs_refresher.py
+"""
+Worker que recalcula las recomendaciones precalculadas encoladas por
+src/workers/graph_projector.py (SETs recs:cola:* en Redis).
+
+    python -m src.workers.recs_refresher
+
+- Saca hasta RECS_REFRESH_BATCH_SIZE ids de cada cola por ciclo (SPOP): un
+  id encolado varias veces entre ciclos se recalcula una sola vez.
+- Vive fuera del camino de proyección: un job con muchos candidatos no
+  retrasa el drenado del outbox.
+- Se pueden correr varias instancias (SPOP reparte los ids entre ellas).
+- Un fallo al recalcular se loguea y el id se descarta: las
+  recomendaciones tienen TTL y se recalculan en la próxima lectura.
+"""
+import os
+import asyncio
+import logging
+
+from dotenv import load_dotenv
+
+from src.config.database import cerrar_conexiones_async
+from src.services.recommendation_service import RecommendationService
+
+
+class RecsRefresher:
+    def __init__(self, batch_size: int = 100, poll_interval: float = 1.0):
+        self.recs = RecommendationService()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+
+    async def run(self):
+        logging.info("🚀 Recs refresher iniciado")
+        while True:
+            try:
+                procesados = await self.recs.drain_refresh_queue(self.batch_size)
+                if procesados:
+                    logging.info(f"🎯 Recomendaciones: {procesados} refrescos aplicados")
+                else:
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.warning(f"⚠️ Error en el ciclo de recomendaciones, reintentando: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+
+async def main():
+    load_dotenv()
+    refresher = RecsRefresher(
+        batch_size=int(os.getenv("RECS_REFRESH_BATCH_SIZE", 100)),
+        poll_interval=float(os.getenv("RECS_REFRESH_POLL_INTERVAL_SECONDS", 1.0)),
+    )
+    try:
+        await refresher.run()
+    finally:
+        await cerrar_conexiones_async()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass